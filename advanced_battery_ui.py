@@ -1,15 +1,34 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-import plotly.express as px
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
-import random
 import time
-import io
+import os
 from datetime import datetime, timedelta
 import json
 
+from alerts import AlertEngine, apply_status, limits_frame
+from analysis import DEFAULT_TARGET_POINTS, HistoryAnalyzer
+from bms_core import MAX_SESSION_HISTORY_ROWS, build_network, publish_network
+from cell_cards import PAGE_SIZES, page_count, page_rows, render_cards
+from cell_index import PREDICATE_OPS, SORTABLE_COLUMNS, CellIndex
+from cell_store import CELL_TYPES, STATUSES, CellStore
+from data_export import (CELL_EXPORT_COLUMNS, COMPRESSIONS, DEFAULT_EXPORT_ROWS, EXPORT_FORMATS,
+                         TASK_EXPORT_COLUMNS, ExportJob, iter_cell_chunks, iter_history_chunks,
+                         iter_task_chunks)
+from datasheet import DATASHEET_PAGE_SIZES, HISTORY_SORTABLE_COLUMNS, HistorySheet, cell_page
+from diagnostics import RerunProfiler, session_sizes, timed, timer
+from estimation import StateEstimator
+from history import HISTORY_COLUMNS, RESOLUTIONS, history_steps
+from log_import import (DEFAULT_IMPORT_ROWS, IMPORT_FIELDS, IMPORT_ROOT, REQUIRED_FIELDS, LogImporter, detect_format,
+                        guess_mapping, read_columns, resolve_import_path)
+from network_cache import CachedNetwork, NetworkCache, network_key
+from retention import TieredHistory
+from ring_buffer import MIN_CAPACITY as MIN_RING_CAPACITY, TelemetryRing
+from simulation import CAPACITY_AH, PackSimulator, SimulationClock, SimulationExecutor, task_current
+from task_scheduler import DEFAULT_TIME_SCALE, TASK_STATUSES, TaskScheduler
+from telemetry_store import TelemetryStore
+from topology import BALANCING_MODES, DEFAULT_BLEED_CURRENT, DEFAULT_TRANSFER_CURRENT, PackTopology, cell_state
+
 # Page configuration
 st.set_page_config(
     page_title="Advanced Battery Cell Management System",
@@ -18,8 +37,15 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+# Per-session profiler; every timer below records into the current rerun
+if 'profiler' not in st.session_state:
+    st.session_state.profiler = RerunProfiler()
+st.session_state.profiler.capture = st.session_state.get('profiler_capture', False)
+st.session_state.profiler.start_rerun()
+
 # Custom CSS for modern styling and animations
-st.markdown("""
+with timer("css"):
+    st.markdown("""
 <style>
     @import url('https://fonts.googleapis.com/css2?family=Inter:wght@300;400;500;600;700&display=swap');
     
@@ -267,70 +293,245 @@ st.markdown("""
         transform: translateY(-5px);
     }
 </style>
-""", unsafe_allow_html=True)
-
-# Initialize session state
-if 'cells_data' not in st.session_state:
-    st.session_state.cells_data = {}
-if 'tasks_data' not in st.session_state:
-    st.session_state.tasks_data = {}
-if 'cell_list' not in st.session_state:
-    st.session_state.cell_list = []
-if 'historical_data' not in st.session_state:
-    st.session_state.historical_data = []
-
-def create_cell_data(cell_type, idx):
-    """Create cell data with random parameters and timestamps"""
-    voltage = 3.2 if cell_type.lower() == "lfp" else 3.6
-    min_voltage = 2.8 if cell_type.lower() == "lfp" else 3.2
-    max_voltage = 3.6 if cell_type.lower() == "lfp" else 4.0
-    current = round(random.uniform(0.5, 2.5), 2)
-    temp = round(random.uniform(25, 40), 1)
-    capacity = round(voltage * current, 2)
-    soc = round(random.uniform(20, 100), 1)  # State of Charge
-    health = round(random.uniform(85, 100), 1)  # Battery Health
-    
-    return {
-        "voltage": voltage,
-        "current": current,
-        "temp": temp,
-        "capacity": capacity,
-        "min_voltage": min_voltage,
-        "max_voltage": max_voltage,
-        "soc": soc,
-        "health": health,
-        "status": "Active" if temp < 35 else "Warning",
-        "timestamp": datetime.now(),
-        "cell_type": cell_type
-    }
+    """, unsafe_allow_html=True)
 
-def generate_historical_data(cells_data, hours=24):
-    """Generate historical data for trend analysis"""
-    historical = []
-    base_time = datetime.now() - timedelta(hours=hours)
-    
-    for hour in range(hours):
-        timestamp = base_time + timedelta(hours=hour)
-        for cell_key, cell_data in cells_data.items():
-            # Add some variation to simulate real data
-            voltage_variation = random.uniform(-0.1, 0.1)
-            temp_variation = random.uniform(-2, 2)
-            current_variation = random.uniform(-0.2, 0.2)
-            
-            historical.append({
-                'timestamp': timestamp,
-                'cell_id': cell_key,
-                'voltage': max(cell_data['min_voltage'], 
-                              min(cell_data['max_voltage'], 
-                                  cell_data['voltage'] + voltage_variation)),
-                'temperature': max(20, cell_data['temp'] + temp_variation),
-                'current': max(0, cell_data['current'] + current_variation),
-                'capacity': cell_data['capacity'],
-                'soc': max(0, min(100, cell_data['soc'] + random.uniform(-5, 5))),
-                'health': cell_data['health']
+@st.cache_resource
+def get_telemetry_store():
+    """Process-wide on-disk store shared by every session"""
+    return TelemetryStore()
+
+@st.cache_resource
+def get_network_cache():
+    """Process-wide LRU cache of generated networks keyed by configuration"""
+    return NetworkCache()
+
+@st.cache_resource
+def get_simulator():
+    """Process-wide pack simulator and the clock thread that advances it"""
+    store = get_telemetry_store()
+    simulator = PackSimulator(store.load_cells() or CellStore())
+    simulator.network_key = store.network_key
+    clock = SimulationClock(simulator, time_scale=DEFAULT_TIME_SCALE)
+    clock.start()
+    return simulator, clock
+
+@st.cache_resource
+def get_task_scheduler():
+    """Process-wide task dispatcher, seeded from the persisted tasks and cells"""
+    store = get_telemetry_store()
+    simulator, clock = get_simulator()
+    scheduler = TaskScheduler(executor=SimulationExecutor(simulator), time_scale=clock.time_scale)
+    cells = store.load_cells()
+    if cells:
+        scheduler.set_cells(cells)
+    scheduler.load(store.load_tasks())
+    scheduler.saved_version = scheduler.version
+    return scheduler
+
+# Wall-clock seconds between samples written to the live telemetry ring
+RING_SAMPLE_INTERVAL = 1.0
+
+@st.cache_resource
+def get_telemetry_ring():
+    """Process-wide ring buffer sampled from the simulator by the clock thread"""
+    simulator, clock = get_simulator()
+    ring = TelemetryRing(len(simulator))
+    ring.network_key = simulator.network_key
+    last_sample = [0.0]
+    
+    def sample(sim):
+        now = time.monotonic()
+        if now - last_sample[0] < RING_SAMPLE_INTERVAL:
+            return
+        last_sample[0] = now
+        with sim.lock:
+            if ring.n_cells != len(sim) or ring.network_key != sim.network_key:
+                ring.reset(len(sim))
+                ring.network_key = sim.network_key
+            ring.append(np.datetime64(datetime.now(), "ms"), {
+                "voltage": sim.voltage,
+                "current": sim.current,
+                "temp": sim.temp,
+                "soc": sim.soc * 100.0,
             })
     
-    return historical
+    clock.listeners.append(sample)
+    return ring
+
+@st.cache_resource
+def get_alert_engine():
+    """Process-wide alert rules, evaluated against the simulator on every clock tick"""
+    simulator, clock = get_simulator()
+    engine = AlertEngine()
+    bound_keys = [None]
+    
+    def evaluate(sim):
+        with sim.lock:
+            if bound_keys[0] is not sim.keys:
+                # The simulator was reloaded with a new network
+                engine.bind(sim.keys, sim.type_codes, sim.v_min, sim.v_max)
+                bound_keys[0] = sim.keys
+            health = sim.capacity_ah / CAPACITY_AH[sim.type_codes] * 100.0
+            engine.evaluate(sim.voltage, sim.temp, sim.soc * 100.0, health, now=sim.sim_time)
+    
+    clock.listeners.append(evaluate)
+    return engine
+
+@st.cache_resource
+def get_state_estimator():
+    """Process-wide SoC / SoH estimator, fed the simulator's current and voltage on every clock tick"""
+    simulator, clock = get_simulator()
+    estimator = StateEstimator(simulator.type_codes, simulator.v_min, simulator.v_max, voltage=simulator.voltage)
+    bound_keys = [simulator.keys]
+    
+    def update(sim):
+        with sim.lock:
+            if bound_keys[0] is not sim.keys:
+                estimator.bind(sim.type_codes, sim.v_min, sim.v_max, voltage=sim.voltage)
+                bound_keys[0] = sim.keys
+            estimator.update(sim.current, sim.voltage, sim.temp, now=sim.sim_time)
+    
+    clock.listeners.append(update)
+    return estimator
+
+# Wall-clock seconds between simulator samples added to the retained history
+RETENTION_SAMPLE_INTERVAL = 10.0
+
+@st.cache_resource
+def get_history_retention():
+    """Process-wide tiered history: the stored history plus live simulator samples, bounded in memory"""
+    store = get_telemetry_store()
+    simulator, clock = get_simulator()
+    retention = TieredHistory()
+    retention.load_store(store)
+    last_sample = [0.0]
+    
+    def sample(sim):
+        now = time.monotonic()
+        if now - last_sample[0] < RETENTION_SAMPLE_INTERVAL:
+            return
+        last_sample[0] = now
+        with sim.lock:
+            if not len(sim):
+                return
+            current = np.abs(sim.current)
+            retention.append_sample(datetime.now(), sim.keys, {
+                "voltage": sim.voltage,
+                "temperature": sim.temp,
+                "current": current,
+                "capacity": sim.voltage * current,
+                "soc": sim.soc * 100.0,
+                "health": sim.capacity_ah / CAPACITY_AH[sim.type_codes] * 100.0,
+            })
+    
+    clock.listeners.append(sample)
+    return retention
+
+# Views of the retained history, each at a single resolution. The tiers hold
+# raw samples next to minute and hour rollups, so analysis and the datasheet
+# only ever see one of these, never the stitched mixture.
+HISTORY_VIEWS = {
+    "Full span": None,
+    "Raw samples": {"tiers": ("raw",)},
+    "1-minute buckets": {"width": 60, "tiers": ("raw", "minute")},
+}
+DEFAULT_HISTORY_VIEW = "Full span"
+
+@st.cache_resource(max_entries=3)
+def load_history_view(version, view):
+    """One history view per retention version, built on first use and shared across sessions"""
+    retention = get_history_retention()
+    if HISTORY_VIEWS[view] is None:
+        # Coarsest tier in use: everything re-bucketed to its width
+        return retention.query(width=retention.uniform_width())
+    return retention.query(**HISTORY_VIEWS[view])
+
+with timer("resources"):
+    telemetry_store = get_telemetry_store()
+    network_cache = get_network_cache()
+    simulator, simulation_clock = get_simulator()
+    task_scheduler = get_task_scheduler()
+    telemetry_ring = get_telemetry_ring()
+    alert_engine = get_alert_engine()
+    state_estimator = get_state_estimator()
+    history_retention = get_history_retention()
+
+# Seconds a session keeps its view of the retained history before re-reading it
+HISTORY_REFRESH_INTERVAL = 60.0
+
+def refresh_history(force=False):
+    """Move this session to the latest retention version, at most once per refresh interval"""
+    now = time.monotonic()
+    if not force and now - st.session_state.get('history_refreshed', -np.inf) < HISTORY_REFRESH_INTERVAL:
+        return
+    st.session_state.history_version = history_retention.version
+    st.session_state.history_refreshed = now
+
+def session_history():
+    """This session's history frame: the selected view at the session's retention version"""
+    view = st.session_state.get('history_view', DEFAULT_HISTORY_VIEW)
+    return load_history_view(st.session_state.history_version, view)
+
+def history_view_picker():
+    st.radio("Resolution", list(HISTORY_VIEWS), horizontal=True, key="history_view",
+             help="Rows of one resolution only: the whole retained span at its coarsest tier, "
+                  "the raw samples of the last hour, or minute buckets")
+
+# Initialize session state from the persisted store
+with timer("session_init"):
+    if 'cells_data' not in st.session_state:
+        st.session_state.cells_data = telemetry_store.load_cells() or CellStore()
+    if 'cell_list' not in st.session_state:
+        st.session_state.cell_list = []
+    refresh_history()
+    if 'network_key' not in st.session_state:
+        st.session_state.network_key = telemetry_store.network_key
+
+def get_cell_index():
+    """Filter/sort indexes for this session's cell table"""
+    cells = st.session_state.cells_data
+    index = st.session_state.get('cell_index')
+    if index is None or index.store is not cells:
+        with timer("build_cell_index"):
+            index = st.session_state.cell_index = CellIndex(cells)
+    return index
+
+def get_history_analyzer():
+    """Rollup/downsampling engine over this session's history frame"""
+    history = session_history()
+    analyzer = st.session_state.get('history_analyzer')
+    if analyzer is None or analyzer.frame is not history:
+        with timer("build_history_analyzer"):
+            analyzer = st.session_state.history_analyzer = HistoryAnalyzer(history)
+    return analyzer
+
+def get_history_sheet():
+    """Paged, server-side filtered view over this session's history"""
+    analyzer = get_history_analyzer()
+    sheet = st.session_state.get('history_sheet')
+    if sheet is None or sheet.analyzer is not analyzer:
+        sheet = st.session_state.history_sheet = HistorySheet(analyzer)
+    return sheet
+
+@timed()
+def sync_simulation():
+    """Pull the simulated cell state into this session's table when it has moved on"""
+    cells = st.session_state.cells_data
+    if (simulator.network_key != st.session_state.network_key or len(simulator) != len(cells)
+            or st.session_state.get('sim_version') == simulator.version):
+        return
+    simulator.write_to(cells)
+    if len(alert_engine) == len(cells):
+        apply_status(cells, alert_engine.status_codes())
+    st.session_state.sim_version = simulator.version
+
+@timed()
+def persist_tasks():
+    """Write the task table to disk if the scheduler changed it since the last save"""
+    version = task_scheduler.version
+    if version != task_scheduler.saved_version:
+        telemetry_store.save_tasks(task_scheduler.snapshot())
+        task_scheduler.saved_version = version
 
 def main():
     # Header with enhanced styling
@@ -345,6 +546,8 @@ def main():
     </div>
     """, unsafe_allow_html=True)
     
+    sync_simulation()
+    
     # Enhanced sidebar
     with st.sidebar:
         st.markdown("### 🎛️ Navigation Panel")
@@ -360,13 +563,24 @@ def main():
         # Quick stats in sidebar
         if st.session_state.cells_data:
             st.markdown("### 📊 Quick Stats")
-            total_cells = len(st.session_state.cells_data)
-            avg_temp = sum(cell['temp'] for cell in st.session_state.cells_data.values()) / total_cells
-            active_cells = sum(1 for cell in st.session_state.cells_data.values() if cell['status'] == 'Active')
+            with timer("sidebar_summary"):
+                stats = st.session_state.cells_data.summary()
             
-            st.metric("Total Cells", total_cells)
-            st.metric("Active Cells", active_cells)
-            st.metric("Avg Temperature", f"{avg_temp:.1f}°C")
+            st.metric("Total Cells", stats['total'])
+            st.metric("Active Cells", stats['active'])
+            st.metric("Avg Temperature", f"{stats['avg_temp']:.1f}°C")
+        
+        with st.expander("🗄️ Network Cache"):
+            cache_stats = network_cache.stats()
+            st.metric("Hit Rate", f"{cache_stats['hit_rate']:.0%}")
+            st.caption(
+                f"{cache_stats['hits']} hits · {cache_stats['misses']} misses · "
+                f"{cache_stats['evictions']} evictions · {cache_stats['entries']} entries · "
+                f"{cache_stats['bytes'] / 1e6:.1f} MB"
+            )
+        
+        with st.expander("🗃️ History Retention"):
+            history_retention_panel()
         
         st.markdown("---")
         st.markdown("### 🚀 Features")
@@ -385,7 +599,48 @@ def main():
         datasheet_page()
     elif "Export Center" in page:
         export_page()
+    
+    profiler = st.session_state.profiler
+    profiler.end_rerun()
+    with st.sidebar:
+        diagnostics_panel(profiler)
+
+def history_retention_panel():
+    """Sidebar view of the retained history's tiers and memory"""
+    tiers = history_retention.tier_stats()
+    st.metric("Retained", f"{history_retention.nbytes / 2**20:.1f} MB",
+              f"of {history_retention.budget_bytes / 2**20:.0f} MB budget", delta_color="off")
+    st.caption(f"{len(history_retention):,} rows · {history_retention.bytes_per_cell / 1024:.1f} KB per cell · "
+               f"{history_retention.rolled_up:,} rolled up · {history_retention.evicted:,} evicted")
+    st.dataframe(tiers[["tier", "rows", "mb", "oldest"]], hide_index=True, use_container_width=True)
+
+def diagnostics_panel(profiler):
+    """Sidebar view of this session's rerun timings, state sizes and profile capture"""
+    with st.expander("🩺 Diagnostics"):
+        last = profiler.last_rerun
+        col1, col2 = st.columns(2)
+        col1.metric("Reruns", profiler.reruns)
+        col2.metric("Last Rerun", f"{last['total_ms']:.0f} ms" if last else "–")
+        st.dataframe(profiler.table(), use_container_width=True, hide_index=True)
+        
+        sizes = session_sizes(st.session_state)
+        st.markdown("**Session state**")
+        st.dataframe(pd.DataFrame({"key": list(sizes), "MB": [size / 1e6 for size in sizes.values()]}),
+                     use_container_width=True, hide_index=True)
+        
+        st.checkbox("Capture cProfile on each rerun", key="profiler_capture")
+        if profiler.last_profile:
+            st.caption("Top functions of the last captured rerun (cumulative time)")
+            st.code(profiler.last_profile, language=None)
+        
+        st.download_button(
+            "⬇️ Export Diagnostics JSON",
+            data=json.dumps(profiler.to_json(sizes), indent=2, default=str),
+            file_name=f"bms_diagnostics_{datetime.now():%Y%m%d_%H%M%S}.json",
+            mime="application/json",
+        )
 
+@timed()
 def cell_configuration_page():
     st.header("🔧 Advanced Cell Configuration")
     
@@ -394,7 +649,7 @@ def cell_configuration_page():
     with col1:
         st.subheader("⚡ Create Cell Network")
         with st.form("cell_form"):
-            num_cells = st.number_input("Number of Cells", min_value=1, max_value=100, value=5)
+            num_cells = st.number_input("Number of Cells", min_value=1, max_value=100_000, value=5)
             
             # Advanced cell configuration
             st.markdown("#### Cell Type Configuration")
@@ -417,18 +672,34 @@ def cell_configuration_page():
                             key=f"priority_{i}"
                         )
                     cell_types.append((cell_type, priority))
+                type_labels = [ct[0] for ct in cell_types]
+                priority_labels = [ct[1] for ct in cell_types]
             else:
                 # Bulk configuration for many cells
                 default_type = st.selectbox("Default Cell Type", ["LFP", "Li-ion", "NMC", "LTO", "LiPo"])
-                cell_types = [(default_type, "Medium") for _ in range(num_cells)]
+                type_labels = [default_type] * num_cells
+                priority_labels = "Medium"
             
-            generate_historical = st.checkbox("Generate Historical Data (24h)", value=True)
+            generate_historical = st.checkbox("Generate Historical Data", value=True)
+            col_a, col_b = st.columns(2)
+            with col_a:
+                history_hours = st.number_input("History Horizon (hours)", min_value=1, max_value=24 * 30, value=24)
+            with col_b:
+                history_resolution = st.selectbox("History Resolution", list(RESOLUTIONS), index=0)
+            
+            col_a, col_b = st.columns(2)
+            with col_a:
+                seed = st.number_input("Random Seed", min_value=0, value=0, step=1)
+            with col_b:
+                force_regenerate = st.checkbox("Force Regeneration", value=False,
+                                               help="Discard any cached network with this configuration")
+            parallel_build = st.checkbox(f"Parallel Build ({os.cpu_count()} cores)", value=num_cells >= 100_000,
+                                         help="Shard generation across worker processes")
             
             submitted = st.form_submit_button("⚡ Generate Cell Network", use_container_width=True)
             
             if submitted:
-                st.session_state.cell_list = [ct[0] for ct in cell_types]
-                st.session_state.cells_data = {}
+                st.session_state.cell_list = type_labels
                 
                 # Enhanced progress tracking
                 progress_container = st.container()
@@ -436,23 +707,48 @@ def cell_configuration_page():
                     progress_bar = st.progress(0)
                     status_text = st.empty()
                     
-                    for idx, (cell_type, priority) in enumerate(cell_types):
-                        cell_key = f"cell_{idx+1}_{cell_type.lower()}"
-                        cell_data = create_cell_data(cell_type, idx+1)
-                        cell_data['priority'] = priority
-                        st.session_state.cells_data[cell_key] = cell_data
-                        
-                        progress = (idx + 1) / len(cell_types)
-                        progress_bar.progress(progress)
-                        status_text.text(f"⚡ Generating {cell_key}... ({idx+1}/{len(cell_types)})")
-                        time.sleep(0.05)
+                    def report_progress(done, total):
+                        progress_bar.progress(done / total)
+                        status_text.text(f"⚡ Generating cells... ({done}/{total})")
                     
+                    history_rows = 0
                     if generate_historical:
-                        status_text.text("📊 Generating historical data...")
-                        st.session_state.historical_data = generate_historical_data(st.session_state.cells_data)
+                        steps, _ = history_steps(history_hours, history_resolution)
+                        history_rows = steps * num_cells
+                        if history_rows > MAX_SESSION_HISTORY_ROWS:
+                            st.warning(f"⚠️ {history_rows:,} history rows exceeds the session limit of "
+                                       f"{MAX_SESSION_HISTORY_ROWS:,}; choose a shorter horizon or coarser resolution.")
+                            generate_historical = False
+                    
+                    key = network_key(
+                        type_labels, priority_labels, int(seed),
+                        history_hours if generate_historical else 0, history_resolution
+                    )
+                    if force_regenerate:
+                        network_cache.invalidate(key)
+                    
+                    def build_and_store():
+                        status_text.text("📊 Generating cells and historical data...")
+                        with timer("build_network"):
+                            cells = build_network(telemetry_store, key, type_labels, priority_labels,
+                                                  parallel=parallel_build, progress=report_progress)
+                        return CachedNetwork(cells, telemetry_store.read_history())
+                    
+                    network = network_cache.get_or_build(key, build_and_store)
+                    if telemetry_store.network_key != key:
+                        # Cache hit for a network that is not the one on disk
+                        publish_network(telemetry_store, key, network.cells, [network.history])
+                    
+                    st.session_state.network_key = key
+                    st.session_state.cells_data = network.cells.copy()
+                    simulator.load(network.cells)
+                    simulator.network_key = key
+                    task_scheduler.set_cells(network.cells)
+                    history_retention.replace(network.history)
+                    refresh_history(force=True)
                     
                     status_text.text("✅ Cell network generated successfully!")
-                    st.success(f"🎉 Generated {len(cell_types)} cells with full data!")
+                    st.success(f"🎉 Generated {num_cells} cells with full data!")
                     time.sleep(1)
                     progress_bar.empty()
                     status_text.empty()
@@ -462,23 +758,18 @@ def cell_configuration_page():
             st.subheader("🔋 Network Overview")
             
             # Enhanced metrics
-            total_cells = len(st.session_state.cells_data)
-            active_cells = sum(1 for cell in st.session_state.cells_data.values() if cell['status'] == 'Active')
-            warning_cells = total_cells - active_cells
-            avg_temp = sum(cell['temp'] for cell in st.session_state.cells_data.values()) / total_cells
-            avg_voltage = sum(cell['voltage'] for cell in st.session_state.cells_data.values()) / total_cells
-            total_capacity = sum(cell['capacity'] for cell in st.session_state.cells_data.values())
-            avg_health = sum(cell['health'] for cell in st.session_state.cells_data.values()) / total_cells
+            with timer("overview_summary"):
+                stats = st.session_state.cells_data.summary()
             
             # Display metrics in cards
             metrics_data = [
-                ("Total Cells", total_cells, "🔋"),
-                ("Active", active_cells, "✅"),
-                ("Warning", warning_cells, "⚠️"),
-                ("Avg Temp", f"{avg_temp:.1f}°C", "🌡️"),
-                ("Avg Voltage", f"{avg_voltage:.2f}V", "⚡"),
-                ("Total Capacity", f"{total_capacity:.1f}Wh", "🔥"),
-                ("Avg Health", f"{avg_health:.1f}%", "❤️")
+                ("Total Cells", stats['total'], "🔋"),
+                ("Active", stats['active'], "✅"),
+                ("Warning", stats['warning'], "⚠️"),
+                ("Avg Temp", f"{stats['avg_temp']:.1f}°C", "🌡️"),
+                ("Avg Voltage", f"{stats['avg_voltage']:.2f}V", "⚡"),
+                ("Total Capacity", f"{stats['total_capacity']:.1f}Wh", "🔥"),
+                ("Avg Health", f"{stats['avg_health']:.1f}%", "❤️")
             ]
             
             for i in range(0, len(metrics_data), 2):
@@ -504,6 +795,13 @@ def cell_configuration_page():
                         </div>
                         """, unsafe_allow_html=True)
     
+    with st.expander("📥 Import Cycler / BMS Logs"):
+        import_logs_section()
+    
+    if st.session_state.cells_data:
+        with st.expander("🔗 Pack Topology"):
+            pack_topology_section()
+    
     # Enhanced cell display
     if st.session_state.cells_data:
         st.markdown("---")
@@ -518,56 +816,211 @@ def cell_configuration_page():
         with col3:
             view_mode = st.selectbox("View Mode", ["Cards", "Compact"])
         
-        # Apply filters and sorting
-        filtered_cells = st.session_state.cells_data.copy()
-        if status_filter != "All":
-            filtered_cells = {k: v for k, v in filtered_cells.items() if v['status'] == status_filter}
+        with st.expander("🎯 Range Filters & Top-K"):
+            col_a, col_b, col_c = st.columns(3)
+            with col_a:
+                min_temp = st.number_input("Temperature above (°C)", value=None, step=0.5)
+            with col_b:
+                max_health = st.number_input("Health below (%)", value=None, step=0.5)
+            with col_c:
+                top_k = st.number_input("Top-K by sort column (0 = all)", min_value=0, value=0, step=1,
+                                        disabled=sort_by == "Cell ID", help="Needs a numeric sort column")
         
-        # Sort cells
-        if sort_by == "Temperature":
-            filtered_cells = dict(sorted(filtered_cells.items(), key=lambda x: x[1]['temp'], reverse=True))
-        elif sort_by == "Voltage":
-            filtered_cells = dict(sorted(filtered_cells.items(), key=lambda x: x[1]['voltage'], reverse=True))
-        elif sort_by == "Health":
-            filtered_cells = dict(sorted(filtered_cells.items(), key=lambda x: x[1]['health'], reverse=True))
+        # Apply filters and sorting through the prebuilt indexes
+        cells = st.session_state.cells_data
+        predicates = []
+        if min_temp is not None:
+            predicates.append(('temp', '>', min_temp))
+        if max_health is not None:
+            predicates.append(('health', '<', max_health))
+        sort_columns = {"Temperature": 'temp', "Voltage": 'voltage', "Health": 'health'}
+        sort_column = sort_columns.get(sort_by)
+        status = None if status_filter == "All" else status_filter
+        with timer("cell_query"):
+            index = get_cell_index()
+            if top_k and sort_column:
+                # argpartition selection; no full sort of the column
+                rows = index.top_k(sort_column, top_k, mask=index.filter_mask(status, predicates))
+            else:
+                rows = index.query(status=status, predicates=predicates, sort_by=sort_column)
         
-        if view_mode == "Cards":
-            # Card view
-            for cell_key, cell_data in filtered_cells.items():
-                status_class = "status-active" if cell_data['status'] == 'Active' else "status-warning"
-                health_color = "🟢" if cell_data['health'] > 90 else "🟡" if cell_data['health'] > 75 else "🔴"
-                
-                st.markdown(f"""
-                <div class="cell-card">
-                    <h3><span class="status-indicator {status_class}"></span>{cell_key.upper()}</h3>
-                    <div class="metric-card">
-                        <div style="display: grid; grid-template-columns: 1fr 1fr; gap: 1rem;">
-                            <div>
-                                <strong>🔋 Voltage:</strong> {cell_data['voltage']}V<br>
-                                <strong>⚡ Current:</strong> {cell_data['current']}A<br>
-                                <strong>🌡️ Temperature:</strong> {cell_data['temp']}°C<br>
-                                <strong>🔥 Capacity:</strong> {cell_data['capacity']}Wh
-                            </div>
-                            <div>
-                                <strong>📊 State of Charge:</strong> {cell_data['soc']}%<br>
-                                <strong>❤️ Health:</strong> {health_color} {cell_data['health']}%<br>
-                                <strong>🎯 Priority:</strong> {cell_data.get('priority', 'Medium')}<br>
-                                <strong>📝 Type:</strong> {cell_data['cell_type']}
-                            </div>
-                        </div>
-                        <div style="margin-top: 1rem; padding-top: 1rem; border-top: 1px solid rgba(255,255,255,0.2);">
-                            <strong>Range:</strong> {cell_data['min_voltage']}V - {cell_data['max_voltage']}V | 
-                            <strong>Status:</strong> {cell_data['status']}
-                        </div>
-                    </div>
-                </div>
-                """, unsafe_allow_html=True)
-        else:
-            # Compact table view
-            df = pd.DataFrame.from_dict(filtered_cells, orient='index')
-            st.dataframe(df, use_container_width=True)
+        # Only the current page is formatted and sent to the browser
+        col_a, col_b = st.columns([1, 3])
+        with col_a:
+            page_size = st.selectbox("Cells per Page", PAGE_SIZES, index=1)
+        total_pages = page_count(len(rows), page_size)
+        with col_b:
+            page = st.number_input(f"Page (of {total_pages})", min_value=1, max_value=total_pages, value=1)
+        
+        render_start = time.perf_counter()
+        visible_rows = page_rows(rows, page, page_size)
+        with timer("render_cells"):
+            if view_mode == "Cards":
+                st.markdown(render_cards(cells, visible_rows), unsafe_allow_html=True)
+            else:
+                st.dataframe(cells.to_frame(visible_rows), use_container_width=True)
+        render_ms = (time.perf_counter() - render_start) * 1000
+        st.caption(f"Showing {len(visible_rows)} of {len(rows)} cells · page built in {render_ms:.1f} ms")
 
+def pack_topology_section():
+    """Wire the cells into series/parallel packs, report pack state and simulate balancing"""
+    cells = st.session_state.cells_data
+    col_a, col_b, col_c = st.columns(3)
+    with col_a:
+        series = st.number_input("Groups in Series", min_value=1, max_value=1000, value=16, key="pack_series")
+    with col_b:
+        parallel = st.number_input("Cells in Parallel", min_value=1, max_value=10_000, value=100, key="pack_parallel")
+    with col_c:
+        max_packs = st.number_input("Max Packs (0 = all)", min_value=0, value=0, key="pack_limit")
+    try:
+        with timer("pack_topology"):
+            topology = PackTopology.from_store(cells, int(series), int(parallel), int(max_packs) or None)
+            voltage, soc, capacity_ah = cell_state(cells)
+            packs = topology.pack_frame(voltage, soc, capacity_ah)
+    except ValueError as exc:
+        st.warning(str(exc))
+        return
+    
+    st.caption(f"{len(topology):,} packs · {topology.n_cells:,} of {len(cells):,} cells wired "
+               "(one chemistry per pack; leftover cells are unassigned)")
+    cols = st.columns(4)
+    cols[0].metric("Total Energy", f"{packs['energy_wh'].sum() / 1000:,.1f} kWh")
+    cols[1].metric("Lowest Pack SoC", f"{packs['soc'].min():.1f}%")
+    cols[2].metric("Max SoC Spread", f"{packs['soc_spread'].max():.2f}%")
+    cols[3].metric("Max Voltage Spread", f"{packs['voltage_spread_mv'].max():.0f} mV")
+    st.dataframe(packs.round(2), use_container_width=True)
+    
+    with st.form("pack_balancing"):
+        col_a, col_b, col_c = st.columns(3)
+        with col_a:
+            mode = st.radio("Balancing", BALANCING_MODES, horizontal=True)
+        with col_b:
+            hours = st.number_input("Hours", min_value=0.1, max_value=1000.0, value=1.0)
+        with col_c:
+            current = st.number_input("Current per Group (A, 0 = default)", min_value=0.0, value=0.0,
+                                      help=f"Defaults: {DEFAULT_BLEED_CURRENT} A bleed, "
+                                           f"{DEFAULT_TRANSFER_CURRENT} A active transfer")
+        apply = st.checkbox("Apply the balanced SoC to the simulation")
+        submitted = st.form_submit_button("⚖️ Simulate Balancing")
+    if not submitted:
+        return
+    with timer("pack_balance"):
+        result = topology.balance(soc, capacity_ah, mode, hours * 3600.0, current or None)
+    cols = st.columns(3)
+    cols[0].metric("Mean SoC Spread", f"{result.spread_after.mean() * 100:.2f}%",
+                   f"{(result.spread_after.mean() - result.spread_before.mean()) * 100:+.2f}%", delta_color="inverse")
+    cols[1].metric("Charge Moved", f"{result.moved_ah.sum():,.1f} Ah")
+    cols[2].metric("Charge Lost", f"{result.lost_ah.sum():,.1f} Ah")
+    if apply:
+        rows = topology.cell_rows
+        if simulator.network_key == st.session_state.network_key and len(simulator) == len(cells):
+            with simulator.lock:
+                simulator.soc[rows] = result.soc[rows]
+                simulator.version += 1
+        cells.update_rows(rows, soc=result.soc[rows] * 100.0)
+        st.success(f"Balanced SoC applied to {len(rows):,} cells.")
+
+def import_logs_section():
+    """Chunked import of CSV / NDJSON / Parquet logs into the cell table and history"""
+    col_a, col_b = st.columns([3, 1])
+    with col_a:
+        # Server-side paths are only offered inside the configured import root
+        path = ""
+        if IMPORT_ROOT:
+            path = st.text_input(f"Log File Path (under {IMPORT_ROOT})", placeholder="campaign_01/cycler.csv")
+    with col_b:
+        chunk_rows = st.number_input("Rows per Chunk", min_value=10_000, max_value=5_000_000,
+                                     value=DEFAULT_IMPORT_ROWS, step=100_000)
+    upload = st.file_uploader("...or upload a log" if IMPORT_ROOT else "Upload a log",
+                              type=["csv", "ndjson", "jsonl", "json", "parquet"])
+    source = path.strip() or upload
+    if not source:
+        return
+    name = source if isinstance(source, str) else source.name
+    try:
+        if isinstance(source, str):
+            source = name = resolve_import_path(source)
+        fmt = detect_format(name)
+        columns = read_columns(source, fmt)
+    except (OSError, ValueError, ImportError) as exc:
+        st.error(f"Cannot read {name}: {exc}")
+        return
+    if hasattr(source, "seek"):
+        source.seek(0)
+    
+    st.markdown(f"**{fmt}** · {len(columns)} columns")
+    guessed = guess_mapping(columns)
+    mapping = {}
+    field_cols = st.columns(len(IMPORT_FIELDS) // 3 + 1)
+    for i, field in enumerate(IMPORT_FIELDS):
+        options = ["—"] + columns
+        default = options.index(guessed[field]) if field in guessed else 0
+        label = f"{field} *" if field in REQUIRED_FIELDS else field
+        with field_cols[i % len(field_cols)]:
+            chosen = st.selectbox(label, options, index=default, key=f"import_map_{field}")
+        if chosen != "—":
+            mapping[field] = chosen
+    
+    col_a, col_b, col_c = st.columns(3)
+    with col_a:
+        default_type = st.selectbox("Default Cell Type", CELL_TYPES, key="import_default_type")
+    with col_b:
+        time_origin = st.text_input("Numeric Time Origin", placeholder="e.g. 2025-01-01 08:00 (blank = Unix epoch)")
+    with col_c:
+        append_history = st.checkbox("Append Readings to History", value=True)
+    
+    missing = [field for field in REQUIRED_FIELDS if field not in mapping]
+    if missing:
+        st.warning(f"Map a column to: {', '.join(missing)}")
+    if not st.button("📥 Import", disabled=bool(missing)):
+        return
+    
+    cells = st.session_state.cells_data.copy()
+    importer = LogImporter(cells, telemetry_store if append_history else None,
+                           default_type=default_type, time_origin=time_origin.strip() or None)
+    progress_bar = st.progress(0.0)
+    status_text = st.empty()
+    total_bytes = os.path.getsize(source) if isinstance(source, str) else source.size
+    handle = open(source, "rb") if isinstance(source, str) and fmt == "CSV" and not name.endswith(".gz") else None
+    
+    def report_progress(stats):
+        if handle is not None or not isinstance(source, str):
+            position = (handle or source).tell()
+            progress_bar.progress(min(position / max(total_bytes, 1), 1.0))
+        status_text.text(f"Chunk {stats.chunks} · {stats.rows_read:,} rows · {stats.rows_per_second:,.0f} rows/s")
+    
+    try:
+        with timer("import_logs"):
+            stats = importer.import_file(handle or source, fmt, mapping, chunk_rows, progress=report_progress)
+    except (ValueError, ImportError, KeyError) as exc:
+        st.error(f"Import failed: {exc}")
+        return
+    finally:
+        if handle is not None:
+            handle.close()
+    progress_bar.progress(1.0)
+    
+    # Imported cells no longer match a generated configuration
+    telemetry_store.save_cells(cells)
+    telemetry_store.set_network_key(None)
+    st.session_state.network_key = None
+    st.session_state.cells_data = cells
+    simulator.load(cells)
+    simulator.network_key = None
+    task_scheduler.set_cells(cells)
+    history_retention.load_store(telemetry_store)
+    refresh_history(force=True)
+    
+    status_text.empty()
+    st.success(f"✅ Imported {stats.rows_imported:,} of {stats.rows_read:,} rows in {stats.chunks} chunks "
+               f"({stats.rows_per_second:,.0f} rows/s) · {stats.cells_added:,} new cells")
+    if stats.rejected:
+        st.warning("Rejected rows: " + ", ".join(f"{reason}: {count:,}" for reason, count in stats.rejected.items()))
+
+@timed()
 def task_management_page():
+    import plotly.express as px
+    
     st.header("📋 Advanced Task Management")
     
     col1, col2 = st.columns([1, 1])
@@ -579,13 +1032,14 @@ def task_management_page():
             task_name = st.text_input("Task Name", placeholder="e.g., Charging Cycle 1")
             task_type = st.selectbox("Task Type", ["CC_CV", "IDLE", "CC_CD"])
             priority = st.selectbox("Priority", ["High", "Medium", "Low"])
+            target_cell = st.text_input("Target Cell (optional)", placeholder="e.g., cell_1_lfp; blank assigns the next idle cell")
             
             # Estimated duration calculator
             if task_type == "CC_CV":
                 st.markdown("**⚡ Constant Current - Constant Voltage Parameters**")
                 col_a, col_b = st.columns(2)
                 with col_a:
-                    cc_input = st.text_input("CC/CP Value", placeholder="e.g., 5A or 10W")
+                    cc_input = st.text_input("CC/CP Value", placeholder="e.g., 5A or 10W; blank uses Current")
                     cv_voltage = st.number_input("CV Voltage (V)", min_value=0.0, value=3.6, step=0.1)
                 with col_b:
                     current = st.number_input("Current (A)", min_value=0.0, value=1.0, step=0.1)
@@ -632,8 +1086,9 @@ def task_management_page():
                 st.markdown("**🔋 Constant Current - Constant Discharge Parameters**")
                 col_a, col_b = st.columns(2)
                 with col_a:
-                    cc_input = st.text_input("CC/CP Value", placeholder="e.g., 5A or 10W")
+                    cc_input = st.text_input("CC/CP Value", placeholder="e.g., 5A or 10W; blank uses Current")
                     voltage = st.number_input("Voltage (V)", min_value=0.0, value=3.2, step=0.1)
+                    current = st.number_input("Current (A)", min_value=0.0, value=1.0, step=0.1)
                 with col_b:
                     capacity = st.number_input("Capacity", min_value=0.0, value=100.0, step=1.0)
                     time_seconds = st.number_input("Duration (seconds)", min_value=1, value=3600, step=1)
@@ -647,6 +1102,7 @@ def task_management_page():
                     "task_type": "CC_CD",
                     "cc_cp": cc_input,
                     "voltage": voltage,
+                    "current": current,
                     "capacity": capacity,
                     "time_seconds": time_seconds,
                     "priority": priority,
@@ -657,27 +1113,524 @@ def task_management_page():
             submitted = st.form_submit_button("🚀 Add Task", use_container_width=True)
             
             if submitted:
-                task_number = len(st.session_state.tasks_data) + 1
-                task_key = f"task_{task_number}"
-                st.session_state.tasks_data[task_key] = task_data
-                st.success(f"✅ Task '{task_name}' added successfully!")
+                if target_cell.strip():
+                    task_data["target_cell"] = target_cell.strip()
+                try:
+                    if task_type != "IDLE":
+                        # Reject a bad setpoint now rather than failing the task on dispatch
+                        task_current(task_data, task_data.get("cv_voltage") or task_data.get("voltage") or 3.6)
+                except ValueError as exc:
+                    st.error(f"❌ {exc}")
+                else:
+                    task_scheduler.submit(task_data)
+                    persist_tasks()
+                    st.success(f"✅ Task '{task_name}' added successfully!")
     
+    # Render from a copy; the scheduler thread keeps updating the live tasks
+    tasks = task_scheduler.snapshot()
     with col2:
-        if st.session_state.tasks_data:
+        if tasks:
             st.subheader("📊 Task Queue Analytics")
+            persist_tasks()
             
-            # Enhanced task analytics
-            total_tasks = len(st.session_state.tasks_data)
-            pending_tasks = sum(1 for task in st.session_state.tasks_data.values() if task.get('status') == 'Pending')
-            high_priority = sum(1 for task in st.session_state.tasks_data.values() if task.get('priority') == 'High')
+            # Status counts are maintained by the scheduler, no rescan needed
+            counts = task_scheduler.counts
+            total_tasks = len(tasks)
+            high_priority = sum(1 for task in tasks.values() if task.get('priority') == 'High')
             
             # Calculate total estimated time
-            total_time = sum(task.get('time_seconds', 0) for task in st.session_state.tasks_data.values())
+            total_time = sum(task.get('time_seconds', 0) for task in tasks.values())
             total_hours = total_time // 3600
             total_minutes = (total_time % 3600) // 60
             
             # Task type distribution
             task_types = {}
-            for task in st.session_state.tasks_data.values():
+            for task in tasks.values():
                 task_type = task.get('task_type', 'Unknown')
-                
\ No newline at end of file
+                task_types[task_type] = task_types.get(task_type, 0) + 1
+            
+            col_a, col_b, col_c = st.columns(3)
+            with col_a:
+                st.metric("Total Tasks", total_tasks)
+                st.metric("High Priority", high_priority)
+            with col_b:
+                st.metric("Pending", counts['Pending'])
+                st.metric("Running", counts['Running'])
+            with col_c:
+                st.metric("Done", counts['Done'])
+                st.metric("Failed", counts['Failed'])
+            st.info(f"⏱️ Total Scheduled Time: {total_hours}h {total_minutes}m")
+            
+            fig = px.pie(names=list(task_types), values=list(task_types.values()), title="Task Type Distribution", hole=0.4)
+            st.plotly_chart(fig, use_container_width=True)
+            
+            st.button("🔄 Refresh Queue")
+    
+    with st.expander("⚙️ Simulation Engine"):
+        col_a, col_b, col_c = st.columns(3)
+        with col_a:
+            timestep = st.number_input("Timestep (s)", min_value=0.1, max_value=60.0,
+                                       value=float(simulator.timestep), step=0.5)
+        with col_b:
+            time_scale = st.number_input("Time Scale (x real time)", min_value=1.0, max_value=3600.0,
+                                         value=float(simulation_clock.time_scale), step=10.0)
+        with col_c:
+            st.metric("Simulated Time", f"{simulator.sim_time / 3600:.2f} h")
+        simulator.timestep = timestep
+        simulation_clock.time_scale = task_scheduler.time_scale = time_scale
+        
+        col_a, col_b = st.columns(2)
+        with col_a:
+            if simulation_clock.running:
+                if st.button("⏸️ Pause Simulation"):
+                    simulation_clock.stop()
+            elif st.button("▶️ Resume Simulation"):
+                simulation_clock.start()
+        with col_b:
+            if simulation_clock.wall_per_sim:
+                st.caption(f"{len(simulator):,} cells · {1 / simulation_clock.wall_per_sim:,.0f}x faster than real time")
+    
+    if tasks:
+        st.markdown("---")
+        st.subheader("🗂️ Task Queue")
+        status_filter = st.multiselect("Show Status", list(TASK_STATUSES), default=["Pending", "Running"])
+        shown = [(key, task) for key, task in tasks.items() if task.get('status') in status_filter]
+        if shown:
+            df = pd.DataFrame.from_dict(dict(shown[-200:]), orient='index')
+            columns = [c for c in ['task_name', 'task_type', 'priority', 'status', 'cell', 'time_seconds',
+                                   'created_at', 'started_at', 'finished_at', 'error'] if c in df.columns]
+            st.dataframe(df[columns], use_container_width=True)
+            if len(shown) > 200:
+                st.caption(f"Showing the latest 200 of {len(shown)} tasks")
+        else:
+            st.info("No tasks with the selected status.")
+
+# Live Dashboard streaming: points drawn on first render, updates per rerun
+DASHBOARD_WINDOW = 600
+DASHBOARD_MAX_UPDATES = 300
+DASHBOARD_TRACKED_CELLS = 8
+DASHBOARD_METRICS = {"Voltage (V)": "voltage", "Temperature (°C)": "temp", "Current (A)": "current", "SoC (%)": "soc"}
+
+def dashboard_stats_frame(times, stats, column):
+    return pd.DataFrame({stat: stats[(column, stat)] for stat in ("mean", "min", "max")},
+                        index=pd.DatetimeIndex(times, name="time"))
+
+def dashboard_cells_frame(times, samples, column, labels):
+    return pd.DataFrame(samples[column], columns=labels, index=pd.DatetimeIndex(times, name="time"))
+
+@timed()
+def dashboard_page():
+    st.header("📊 Live Dashboard")
+    
+    if not len(simulator):
+        st.info("Create a cell network in Cell Configuration to start live monitoring.")
+        return
+    if simulator.network_key != st.session_state.network_key:
+        st.warning("The simulator is running a different network than this session. Reload it from Cell Configuration.")
+    
+    col1, col2, col3 = st.columns([1, 1, 2])
+    with col1:
+        metric_label = st.selectbox("Metric", list(DASHBOARD_METRICS))
+        column = DASHBOARD_METRICS[metric_label]
+    with col2:
+        refresh = st.slider("Refresh Interval (s)", 0.5, 10.0, 1.0, 0.5)
+        live = st.checkbox("Stream Live", value=simulation_clock.running)
+    with col3:
+        tracked_input = st.text_input(
+            "Tracked Cells", placeholder=f"Comma-separated cell IDs (blank = {DASHBOARD_TRACKED_CELLS} hottest)")
+    latest = telemetry_ring.latest()
+    if latest is not None and len(latest["temp"]) != len(simulator):
+        latest = None
+    tracked = [key.strip() for key in tracked_input.split(",") if key.strip()]
+    unknown = [key for key in tracked if key not in simulator.rows]
+    if unknown:
+        st.warning(f"Unknown cells ignored: {', '.join(unknown)}")
+    tracked = [key for key in tracked if key in simulator.rows][:DASHBOARD_TRACKED_CELLS]
+    if not tracked and latest is not None:
+        count = min(DASHBOARD_TRACKED_CELLS, len(simulator))
+        hottest = np.argpartition(latest["temp"], -count)[-count:]
+        tracked = [simulator.keys[row] for row in hottest[np.argsort(-latest["temp"][hottest])]]
+    tracked_rows = np.array([simulator.rows[key] for key in tracked], dtype=np.intp)
+    
+    metric_cols = st.columns(6)
+    metric_slots = [col.empty() for col in metric_cols]
+    
+    def show_metrics(sample):
+        if sample is None:
+            return
+        metric_slots[0].metric("Avg Voltage", f"{sample['voltage'].mean():.3f} V")
+        metric_slots[1].metric("Avg Temperature", f"{sample['temp'].mean():.1f}°C")
+        metric_slots[2].metric("Max Temperature", f"{sample['temp'].max():.1f}°C")
+        metric_slots[3].metric("Avg SoC", f"{sample['soc'].mean():.1f}%")
+        metric_slots[4].metric("Pack Current", f"{sample['current'].sum():.1f} A")
+        metric_slots[5].metric("Active Alerts", f"{sum(alert_engine.counts().values()):,}")
+    
+    show_metrics(latest)
+    
+    st.subheader(f"📈 Fleet {metric_label}")
+    times, stats, seq = telemetry_ring.stats_since(limit=DASHBOARD_WINDOW)
+    fleet_chart = st.line_chart(dashboard_stats_frame(times, stats, column))
+    
+    cell_chart = None
+    if len(tracked_rows):
+        st.subheader(f"🔍 Tracked Cells · {metric_label}")
+        times, samples, _ = telemetry_ring.cells_since(tracked_rows, until=seq, limit=DASHBOARD_WINDOW)
+        cell_chart = st.line_chart(dashboard_cells_frame(times, samples, column, tracked))
+    
+    alerts_section()
+    estimation_section()
+    
+    status = st.empty()
+    status.caption(
+        f"{telemetry_ring.n_cells:,} cells · {telemetry_ring.capacity:,} samples per cell · "
+        f"{telemetry_ring.nbytes / 1e6:.1f} MB ring buffer"
+        + (" · window limited by the memory budget" if telemetry_ring.capacity < MIN_RING_CAPACITY else "")
+    )
+    if not live:
+        return
+    if not simulation_clock.running:
+        st.info("The simulation is paused; resume it in Task Management to stream new samples.")
+        return
+    
+    # Stream only the samples appended since the last update; after
+    # DASHBOARD_MAX_UPDATES the page reruns so the charts start from a
+    # fresh window instead of growing in the browser.
+    for _ in range(DASHBOARD_MAX_UPDATES):
+        time.sleep(refresh)
+        if telemetry_ring.seq < seq or telemetry_ring.n_cells != len(simulator):
+            # The ring was reset for a new network
+            break
+        if telemetry_ring.seq == seq:
+            continue
+        times, stats, new_seq = telemetry_ring.stats_since(seq)
+        fleet_chart.add_rows(dashboard_stats_frame(times, stats, column))
+        if cell_chart is not None:
+            times, samples, _ = telemetry_ring.cells_since(tracked_rows, seq, new_seq)
+            cell_chart.add_rows(dashboard_cells_frame(times, samples, column, tracked))
+        seq = new_seq
+        show_metrics(telemetry_ring.latest())
+    st.rerun()
+
+# Rows shown in the active alert and alert log tables
+ALERT_TABLE_ROWS = 500
+
+def alerts_section():
+    st.subheader("🚨 Alerts")
+    counts = alert_engine.counts()
+    for col, (rule, count) in zip(st.columns(len(counts)), counts.items()):
+        col.metric(rule.replace("_", " ").title(), f"{count:,}")
+    st.caption(f"{alert_engine.evaluations:,} evaluations · last took {alert_engine.last_elapsed * 1000:.1f} ms · "
+               f"debounce {alert_engine.debounce} ticks")
+    
+    active_tab, log_tab, limits_tab = st.tabs(["Active", "Alert Log", "Limits"])
+    with active_tab:
+        active = alert_engine.active_frame(limit=ALERT_TABLE_ROWS)
+        if len(active):
+            st.dataframe(active, use_container_width=True, hide_index=True)
+        else:
+            st.success("No active alerts.")
+    with log_tab:
+        st.dataframe(alert_engine.log_frame(limit=ALERT_TABLE_ROWS), use_container_width=True, hide_index=True)
+    with limits_tab:
+        st.caption("Voltage limits are a margin beyond each cell's min/max voltage; temperature rate is in °C/min.")
+        current = limits_frame(alert_engine.limits)
+        edited = st.data_editor(current, use_container_width=True, key="alert_limits")
+        if not edited.equals(current):
+            alert_engine.set_limits(edited)
+            st.success("Limits updated for every session.")
+
+def estimation_section():
+    st.subheader("🧮 State Estimation")
+    with simulator.lock, state_estimator.lock:
+        if len(state_estimator) != len(simulator) or not len(simulator):
+            st.info("The estimator starts with the next simulation tick.")
+            return
+        soc_error = np.abs(state_estimator.soc - simulator.soc) * 100.0
+        true_health = simulator.capacity_ah / CAPACITY_AH[simulator.type_codes] * 100.0
+        health_error = np.abs(state_estimator.health - true_health)
+        soc_std = state_estimator.soc_std * 100.0
+    cols = st.columns(4)
+    cols[0].metric("Mean SoC Error", f"{soc_error.mean():.2f}%")
+    cols[1].metric("Max SoC Error", f"{soc_error.max():.2f}%")
+    cols[2].metric("Mean SoC Uncertainty", f"±{soc_std.mean():.2f}%")
+    cols[3].metric("Mean SoH Error", f"{health_error.mean():.1f}%")
+    st.caption(f"{state_estimator.samples:,} updates · last took {state_estimator.last_elapsed * 1000:.1f} ms · "
+               "errors are against the simulator's true state; SoH is learned from charge counted over SoC swings")
+
+def to_datetime(value):
+    return pd.Timestamp(value).to_pydatetime()
+
+@timed()
+def data_analysis_page():
+    import plotly.express as px
+    import plotly.graph_objects as go
+    
+    st.header("📈 Data Analysis")
+    
+    history_view_picker()
+    if not len(session_history()):
+        st.info("Generate historical data in Cell Configuration to analyze trends.")
+        return
+    analyzer = get_history_analyzer()
+    
+    col1, col2, col3 = st.columns([1, 1, 2])
+    with col1:
+        metric = st.selectbox("Metric", list(analyzer.metrics))
+        method = st.radio("Downsampling", ["LTTB", "Min-Max"], horizontal=True)
+    with col2:
+        target_points = st.slider("Points per Series", 200, 5000, DEFAULT_TARGET_POINTS, 100)
+    with col3:
+        cells_input = st.text_input("Cells to Plot", placeholder="Comma-separated cell IDs, e.g. cell_1_lfp")
+    cells = [key.strip() for key in cells_input.split(",") if key.strip()]
+    
+    # Zooming narrows the window and re-queries it at a finer bucket width
+    start, end = to_datetime(analyzer.start), to_datetime(analyzer.end)
+    if end > start:
+        window = st.slider("Time Window", min_value=start, max_value=end, value=(start, end),
+                           step=timedelta(seconds=analyzer.raw_step), format="YYYY-MM-DD HH:mm:ss")
+    else:
+        window = (start, end)
+    
+    query_start = time.perf_counter()
+    with timer("analysis_trend"):
+        width, fleet, lines = analyzer.trend(metric, *window, cells=cells, target_points=target_points,
+                                             method="minmax" if method == "Min-Max" else "lttb")
+    rows = analyzer.row_range(*window)
+    
+    st.subheader(f"📉 {metric.title()} Trend")
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(x=fleet["time"], y=fleet["max"], mode="lines", line=dict(width=0),
+                             name="Fleet max", showlegend=False))
+    fig.add_trace(go.Scatter(x=fleet["time"], y=fleet["min"], mode="lines", line=dict(width=0),
+                             fill="tonexty", fillcolor="rgba(102, 126, 234, 0.2)", name="Fleet min-max"))
+    fig.add_trace(go.Scatter(x=fleet["time"], y=fleet["mean"], mode="lines", name="Fleet mean",
+                             line=dict(color="#667eea", width=2)))
+    for cell, line in lines.items():
+        fig.add_trace(go.Scattergl(x=line["time"], y=line[metric], mode="lines", name=cell))
+    fig.update_layout(height=450, hovermode="x unified", uirevision=metric)
+    st.plotly_chart(fig, use_container_width=True)
+    
+    missing = [cell for cell in cells if cell not in lines]
+    if missing:
+        st.warning(f"No history for: {', '.join(missing)}")
+    points = len(fleet) * 3 + sum(len(line) for line in lines.values())
+    st.caption(
+        f"{rows.stop - rows.start:,} samples in window · {width}s buckets · "
+        f"{points:,} points plotted · {(time.perf_counter() - query_start) * 1000:.0f} ms"
+    )
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        st.subheader("📊 Distribution")
+        bins = st.slider("Bins", 10, 200, 50, 10)
+        edges, counts = analyzer.distribution(metric, *window, bins=bins)
+        if len(counts):
+            fig = go.Figure(go.Bar(x=(edges[:-1] + edges[1:]) / 2, y=counts, width=np.diff(edges),
+                                   marker_color="#764ba2"))
+            fig.update_layout(xaxis_title=metric, yaxis_title="Samples", height=400, bargap=0)
+            st.plotly_chart(fig, use_container_width=True)
+    with col2:
+        st.subheader("🔗 Correlation")
+        corr = analyzer.correlation(*window)
+        fig = px.imshow(corr, text_auto=".2f", color_continuous_scale="RdBu_r", zmin=-1, zmax=1)
+        fig.update_layout(height=400)
+        st.plotly_chart(fig, use_container_width=True)
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        x_metric = st.selectbox("X Axis", list(analyzer.metrics), index=0)
+    with col2:
+        y_metric = st.selectbox("Y Axis", list(analyzer.metrics),
+                                index=min(1, len(analyzer.metrics) - 1))
+    sample = analyzer.scatter_sample(x_metric, y_metric, *window)
+    fig = px.scatter(sample, x=x_metric, y=y_metric, opacity=0.5, render_mode="webgl",
+                     hover_data=["cell_id"])
+    fig.update_layout(height=400)
+    st.plotly_chart(fig, use_container_width=True)
+    st.caption(f"Scatter shows an evenly strided sample of {len(sample):,} points")
+
+# Exports larger than this are left on disk instead of offered as a download:
+# st.download_button holds the whole file in server memory, so keep it small
+MAX_DOWNLOAD_BYTES = 32 * 1024 * 1024
+
+@timed()
+def export_page():
+    st.header("💾 Export Center")
+    st.markdown("""
+    <div class="export-section">
+        <h3 style="margin: 0;">Stream cells, tasks and history to CSV, NDJSON or Parquet</h3>
+    </div>
+    """, unsafe_allow_html=True)
+    
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        dataset = st.radio("Dataset", ["Cells", "Tasks", "History"], horizontal=True)
+    with col2:
+        fmt = st.selectbox("Format", list(EXPORT_FORMATS))
+    with col3:
+        compression = st.selectbox("Compression", list(COMPRESSIONS))
+    
+    history = session_history()
+    # Stream stored history straight from the memory-mapped partitions when
+    # it belongs to this session's network
+    use_store = (telemetry_store.history_rows > 0
+                 and telemetry_store.network_key == st.session_state.network_key)
+    start = end = None
+    if dataset == "Cells":
+        all_columns, total = CELL_EXPORT_COLUMNS, len(st.session_state.cells_data)
+    elif dataset == "Tasks":
+        all_columns, total = TASK_EXPORT_COLUMNS, len(task_scheduler)
+    else:
+        all_columns = HISTORY_COLUMNS
+        total = telemetry_store.history_rows if use_store else len(history)
+        if len(history):
+            analyzer = get_history_analyzer()
+            first, last = to_datetime(analyzer.start), to_datetime(analyzer.end)
+            if last > first:
+                start, end = st.slider("Time Range", min_value=first, max_value=last, value=(first, last),
+                                       step=timedelta(seconds=analyzer.raw_step), format="YYYY-MM-DD HH:mm:ss")
+    
+    columns = st.multiselect("Columns", list(all_columns), default=list(all_columns))
+    chunk_rows = st.number_input("Rows per Chunk", min_value=10_000, max_value=2_000_000,
+                                 value=DEFAULT_EXPORT_ROWS, step=50_000)
+    st.caption(f"{total:,} rows available")
+    
+    if not st.button("📦 Export", disabled=not (total and columns)):
+        return
+    
+    if dataset == "Cells":
+        chunks = iter_cell_chunks(st.session_state.cells_data, columns, chunk_rows)
+    elif dataset == "Tasks":
+        chunks = iter_task_chunks(task_scheduler.snapshot(), columns, chunk_rows)
+    else:
+        chunks = iter_history_chunks(telemetry_store if use_store else history, columns, start, end, chunk_rows)
+    job = ExportJob(chunks, fmt, compression)
+    
+    export_dir = os.path.join(telemetry_store.root, "exports")
+    os.makedirs(export_dir, exist_ok=True)
+    path = os.path.join(export_dir, f"{dataset.lower()}_{datetime.now():%Y%m%d_%H%M%S}{job.extension}")
+    progress_bar = st.progress(0.0)
+    status_text = st.empty()
+    
+    def report_progress(job):
+        progress_bar.progress(min(job.rows / total, 1.0))
+        status_text.text(f"{job.rows:,} rows · {job.raw_bytes / 1e6:.1f} MB · {job.throughput:.1f} MB/s")
+    
+    try:
+        with timer("export_write"):
+            job.write_to(path, progress=report_progress)
+    except (ImportError, ValueError) as exc:
+        st.error(str(exc))
+        return
+    progress_bar.progress(1.0)
+    status_text.empty()
+    
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Rows", f"{job.rows:,}")
+    col2.metric("Encoded", f"{job.raw_bytes / 1e6:.1f} MB")
+    col3.metric("File Size", f"{job.bytes_written / 1e6:.1f} MB")
+    col4.metric("Throughput", f"{job.throughput:.1f} MB/s")
+    st.success(f"✅ Exported to {path} in {job.elapsed:.2f}s")
+    if job.bytes_written <= MAX_DOWNLOAD_BYTES:
+        with open(path, "rb") as fh:
+            st.download_button("⬇️ Download", fh, file_name=os.path.basename(path),
+                               mime="application/octet-stream")
+    else:
+        st.warning(f"⚠️ Exports over {MAX_DOWNLOAD_BYTES // 2**20} MB are not offered as a browser download, "
+                   f"to keep them out of server memory; copy the file from {path}.")
+
+def predicate_inputs(key, columns):
+    """One optional ``(column, op, value)`` filter row; returns a list of 0 or 1 predicates"""
+    col_a, col_b, col_c = st.columns([2, 1, 2])
+    with col_a:
+        column = st.selectbox("Filter Column", ["None"] + list(columns), key=f"{key}_filter_column")
+    with col_b:
+        op = st.selectbox("Operator", list(PREDICATE_OPS), key=f"{key}_filter_op")
+    with col_c:
+        value = st.number_input("Value", value=0.0, step=0.5, key=f"{key}_filter_value")
+    return [] if column == "None" else [(column, op, value)]
+
+def pager(key, total):
+    col_a, col_b = st.columns([1, 3])
+    with col_a:
+        page_size = st.selectbox("Rows per Page", DATASHEET_PAGE_SIZES, index=1, key=f"{key}_page_size")
+    total_pages = page_count(total, page_size)
+    with col_b:
+        page = st.number_input(f"Page (of {total_pages:,})", min_value=1, max_value=total_pages, value=1,
+                               key=f"{key}_page")
+    return page, page_size
+
+@timed()
+def datasheet_page():
+    st.header("📋 Datasheet View")
+    cells_tab, history_tab = st.tabs(["🔋 Cells", "📜 History"])
+    
+    with cells_tab:
+        cells = st.session_state.cells_data
+        if not cells:
+            st.info("No cells yet. Create a network in Cell Configuration.")
+        else:
+            col1, col2, col3, col4 = st.columns(4)
+            with col1:
+                status = st.selectbox("Status", ["All"] + STATUSES, key="sheet_status")
+            with col2:
+                cell_type = st.selectbox("Cell Type", ["All"] + CELL_TYPES, key="sheet_type")
+            with col3:
+                sort_by = st.selectbox("Sort by", ["Cell ID"] + list(SORTABLE_COLUMNS), key="sheet_sort")
+            with col4:
+                descending = st.checkbox("Descending", value=True, key="sheet_desc")
+            predicates = predicate_inputs("sheet", SORTABLE_COLUMNS)
+            all_columns = list(cells.to_frame([]).columns)
+            columns = st.multiselect("Columns", all_columns, default=all_columns, key="sheet_columns")
+            
+            query_start = time.perf_counter()
+            with timer("sheet_query"):
+                rows = get_cell_index().query(
+                    status=None if status == "All" else status,
+                    cell_type=None if cell_type == "All" else cell_type,
+                    predicates=predicates,
+                    sort_by=None if sort_by == "Cell ID" else sort_by,
+                    descending=descending,
+                )
+            page, page_size = pager("sheet", len(rows))
+            st.dataframe(cell_page(cells, rows, page, page_size, columns), use_container_width=True)
+            st.caption(f"{len(rows):,} of {len(cells):,} cells match · page fetched in "
+                       f"{(time.perf_counter() - query_start) * 1000:.1f} ms")
+    
+    with history_tab:
+        history_view_picker()
+        if not len(session_history()):
+            st.info("No historical data yet. Generate it in Cell Configuration.")
+            return
+        sheet = get_history_sheet()
+        analyzer = sheet.analyzer
+        
+        col1, col2, col3 = st.columns([2, 1, 1])
+        with col1:
+            cells_input = st.text_input("Cell IDs", placeholder="Comma-separated, blank = all cells",
+                                        key="history_cells")
+        with col2:
+            sort_by = st.selectbox("Sort by", list(HISTORY_SORTABLE_COLUMNS), key="history_sort")
+        with col3:
+            descending = st.checkbox("Descending", value=False, key="history_desc")
+        start, end = to_datetime(analyzer.start), to_datetime(analyzer.end)
+        if end > start:
+            start, end = st.slider("Time Range", min_value=start, max_value=end, value=(start, end),
+                                   step=timedelta(seconds=analyzer.raw_step), format="YYYY-MM-DD HH:mm:ss",
+                                   key="history_window")
+        predicates = predicate_inputs("history", analyzer.metrics)
+        all_columns = ["timestamp", "cell_id"] + list(analyzer.metrics)
+        columns = st.multiselect("Columns", all_columns, default=all_columns, key="history_columns")
+        
+        query_start = time.perf_counter()
+        cells = tuple(key.strip() for key in cells_input.split(",") if key.strip())
+        with timer("history_query"):
+            rows = sheet.query(start, end, cells=cells, predicates=tuple(predicates),
+                               sort_by=sort_by, descending=descending)
+        page, page_size = pager("history", len(rows))
+        st.dataframe(sheet.page(rows, page, page_size, columns), use_container_width=True, hide_index=True)
+        st.caption(f"{len(rows):,} of {len(analyzer):,} rows match · page fetched in "
+                   f"{(time.perf_counter() - query_start) * 1000:.1f} ms")
+
+if __name__ == "__main__":
+    main()
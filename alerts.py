@@ -0,0 +1,260 @@
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from cell_store import CELL_TYPES, category_code
+
+# Rule name -> (metric, direction); "above" trips when the value exceeds the
+# threshold, "below" when it drops under it
+ALERT_RULES = {
+    "over_voltage": ("voltage", "above"),
+    "under_voltage": ("voltage", "below"),
+    "over_temp": ("temp", "above"),
+    "low_soc": ("soc", "below"),
+    "low_health": ("health", "below"),
+    "temp_rate": ("temp_rate", "above"),
+}
+
+# Per-chemistry limits. Voltage limits are a margin beyond each cell's own
+# min_voltage/max_voltage; temp_rate is the absolute change in °C/min. The
+# 35 °C over-temperature default is the threshold cells are generated with.
+LIMIT_FIELDS = ("voltage_margin", "max_temp", "min_soc", "min_health", "max_temp_rate")
+DEFAULT_LIMITS = {
+    "LFP": dict(voltage_margin=0.05, max_temp=35.0, min_soc=10.0, min_health=80.0, max_temp_rate=2.0),
+    "Li-ion": dict(voltage_margin=0.05, max_temp=35.0, min_soc=12.0, min_health=80.0, max_temp_rate=1.5),
+    "NMC": dict(voltage_margin=0.05, max_temp=35.0, min_soc=12.0, min_health=80.0, max_temp_rate=1.5),
+    "LTO": dict(voltage_margin=0.05, max_temp=35.0, min_soc=5.0, min_health=80.0, max_temp_rate=2.5),
+    "LiPo": dict(voltage_margin=0.03, max_temp=35.0, min_soc=15.0, min_health=80.0, max_temp_rate=1.0),
+}
+
+# How far back inside the limit a value must come before an alert clears
+DEFAULT_HYSTERESIS = {
+    "over_voltage": 0.02, "under_voltage": 0.02, "over_temp": 2.0,
+    "low_soc": 5.0, "low_health": 1.0, "temp_rate": 0.5,
+}
+
+# Consecutive evaluations a condition must hold before the alert is raised
+DEFAULT_DEBOUNCE = 3
+ALERT_LOG_CAPACITY = 100_000
+
+# CellStore columns the thresholds are derived from
+_LAYOUT_COLUMNS = ("cell_type", "min_voltage", "max_voltage")
+
+_ACTIVE = category_code("status", "Active")
+_WARNING = category_code("status", "Warning")
+
+
+def limits_frame(limits=None):
+    """Limits as an editable DataFrame, one row per chemistry"""
+    limits = limits or DEFAULT_LIMITS
+    return pd.DataFrame([[limits[t][field] for field in LIMIT_FIELDS] for t in CELL_TYPES],
+                        index=pd.Index(CELL_TYPES, name="cell_type"), columns=list(LIMIT_FIELDS))
+
+
+class AlertEngine:
+    """Threshold rules with hysteresis and debounce over every cell at once
+
+    ``bind`` fixes the cell layout and precomputes a (rules, cells)
+    threshold matrix from the per-chemistry limits. ``evaluate`` then
+    compares one telemetry tick against it in a handful of whole-array
+    operations: a condition must hold for ``debounce`` consecutive ticks
+    to raise an alert, and the value must come back inside the limit by
+    the rule's hysteresis to clear it. Raise/clear transitions are kept in
+    a bounded, columnar alert log.
+    """
+
+    def __init__(self, limits=None, hysteresis=None, debounce=DEFAULT_DEBOUNCE, log_capacity=ALERT_LOG_CAPACITY):
+        self.rules = list(ALERT_RULES)
+        self.limits = {t: dict(DEFAULT_LIMITS[t], **(limits or {}).get(t, {})) for t in CELL_TYPES}
+        self.hysteresis = dict(DEFAULT_HYSTERESIS, **(hysteresis or {}))
+        self.debounce = max(int(debounce), 1)
+        self.log_capacity = log_capacity
+        self.lock = threading.RLock()
+        self._sign = np.array([1.0 if ALERT_RULES[r][1] == "above" else -1.0 for r in self.rules],
+                              dtype=np.float32)[:, None]
+        self._log = []
+        self._log_rows = 0
+        self.evaluations = 0
+        self.last_elapsed = 0.0
+        self._store_layout = None
+        self.bind([], np.zeros(0, dtype=np.intp), np.zeros(0), np.zeros(0))
+
+    def __len__(self):
+        return len(self.keys)
+
+    # Layout and limits --------------------------------------------------
+
+    def bind(self, keys, type_codes, min_voltage, max_voltage):
+        """Attach to a cell layout; clears alert state but keeps the log"""
+        with self.lock:
+            self.keys = list(keys)
+            self.type_codes = np.asarray(type_codes, dtype=np.intp)
+            self.min_voltage = np.asarray(min_voltage, dtype=np.float32)
+            self.max_voltage = np.asarray(max_voltage, dtype=np.float32)
+            shape = (len(self.rules), len(self.keys))
+            self.active = np.zeros(shape, dtype=bool)
+            self.pending = np.zeros(shape, dtype=np.int16)
+            self._values = np.zeros(shape, dtype=np.float32)
+            self._prev_temp = None
+            self._prev_time = None
+            self._primed = False
+            self._update_thresholds()
+
+    def bind_store(self, store):
+        self.bind(list(store), store.column("cell_type"), store.column("min_voltage"), store.column("max_voltage"))
+
+    def set_limits(self, limits):
+        """Replace the per-chemistry limits (a ``limits_frame`` or nested dict)"""
+        if isinstance(limits, pd.DataFrame):
+            limits = {t: {field: float(limits.at[t, field]) for field in LIMIT_FIELDS} for t in limits.index}
+        with self.lock:
+            for cell_type, values in limits.items():
+                self.limits[cell_type].update(values)
+            self._update_thresholds()
+
+    def _update_thresholds(self):
+        table = {field: np.array([self.limits[t][field] for t in CELL_TYPES], dtype=np.float32)
+                 for field in LIMIT_FIELDS}
+        codes = self.type_codes
+        margin = table["voltage_margin"][codes]
+        by_rule = {
+            "over_voltage": self.max_voltage + margin,
+            "under_voltage": self.min_voltage - margin,
+            "over_temp": table["max_temp"][codes],
+            "low_soc": table["min_soc"][codes],
+            "low_health": table["min_health"][codes],
+            "temp_rate": table["max_temp_rate"][codes],
+        }
+        self.thresholds = np.stack([by_rule[rule] for rule in self.rules]).astype(np.float32, copy=False)
+        hysteresis = np.array([self.hysteresis[rule] for rule in self.rules], dtype=np.float32)[:, None]
+        self._trip = self.thresholds * self._sign
+        self._clear = self._trip - hysteresis
+
+    # Evaluation -----------------------------------------------------------
+
+    def evaluate(self, voltage, temp, soc, health, now=None):
+        """Run every rule over one tick; ``now`` is in seconds (monotonic by default)
+
+        Returns ``(raised, cleared)`` counts for this tick.
+        """
+        started = time.perf_counter()
+        now = time.monotonic() if now is None else now
+        with self.lock:
+            temp = np.asarray(temp, dtype=np.float32)
+            if self._prev_temp is not None and now > self._prev_time:
+                temp_rate = np.abs(temp - self._prev_temp) * np.float32(60.0 / (now - self._prev_time))
+            else:
+                temp_rate = np.zeros_like(temp)
+            self._prev_temp, self._prev_time = temp.copy(), now
+
+            # Sign-adjusted values so every rule trips at or above its threshold
+            values = self._values
+            for row, metric in enumerate((voltage, voltage, temp, soc, health, temp_rate)):
+                np.multiply(metric, self._sign[row], out=values[row])
+            tripped = values >= self._trip
+            in_band = values >= self._clear
+
+            # Debounce: count consecutive tripped ticks; the first tick after
+            # bind takes the current condition as the starting state
+            pending = self.pending
+            pending += 1
+            np.minimum(pending, self.debounce, out=pending)
+            pending *= tripped
+            ready = tripped if not self._primed else pending >= self.debounce
+            raised = ready & ~self.active
+            cleared = self.active & ~in_band
+            self.active |= raised
+            self.active &= ~cleared
+            self._primed = True
+
+            self._log_events(raised, cleared, values)
+            self.evaluations += 1
+            self.last_elapsed = time.perf_counter() - started
+            return int(np.count_nonzero(raised)), int(np.count_nonzero(cleared))
+
+    def evaluate_store(self, store, now=None):
+        """Evaluate a CellStore's current columns and write the resulting status back"""
+        layout = (id(store), len(store), *(store.column_version(name) for name in _LAYOUT_COLUMNS))
+        if layout != self._store_layout:
+            self.bind_store(store)
+            self._store_layout = layout
+        result = self.evaluate(store.column("voltage"), store.column("temp"), store.column("soc"),
+                               store.column("health"), now=now)
+        apply_status(store, self.status_codes())
+        return result
+
+    def status_codes(self):
+        """Per-cell status code: Warning while any alert is active"""
+        with self.lock:
+            return np.where(self.active.any(axis=0), _WARNING, _ACTIVE).astype(np.int8)
+
+    def counts(self):
+        """Active alerts per rule"""
+        with self.lock:
+            return dict(zip(self.rules, self.active.sum(axis=1).tolist()))
+
+    def active_frame(self, limit=None):
+        """Currently active alerts, one row per (cell, rule)"""
+        with self.lock:
+            rule_idx, rows = np.nonzero(self.active)
+            if limit is not None:
+                rule_idx, rows = rule_idx[:limit], rows[:limit]
+            return pd.DataFrame({
+                "cell_id": [self.keys[row] for row in rows],
+                "rule": pd.Categorical.from_codes(rule_idx, categories=self.rules),
+                "threshold": self.thresholds[rule_idx, rows],
+            })
+
+    # Alert log ------------------------------------------------------------
+
+    def _log_events(self, raised, cleared, values):
+        changed = raised | cleared
+        if not changed.any():
+            return
+        rule_idx, rows = np.nonzero(changed)
+        self._log.append({
+            "time": np.datetime64(datetime.now(), "ms"),
+            "keys": self.keys,
+            "rule": rule_idx.astype(np.int8),
+            "row": rows.astype(np.int32),
+            "raised": raised[rule_idx, rows],
+            "value": values[rule_idx, rows] * self._sign[rule_idx, 0],
+            "threshold": self.thresholds[rule_idx, rows],
+        })
+        self._log_rows += rows.size
+        while self._log_rows > self.log_capacity and len(self._log) > 1:
+            self._log_rows -= self._log.pop(0)["row"].size
+
+    def log_frame(self, limit=None):
+        """Most recent raise/clear events first, at most ``limit`` rows"""
+        with self.lock:
+            chunks = []
+            remaining = limit if limit is not None else self._log_rows
+            for entry in reversed(self._log):
+                if remaining <= 0:
+                    break
+                take = slice(-remaining, None) if remaining < entry["row"].size else slice(None)
+                rows = entry["row"][take][::-1]
+                chunks.append(pd.DataFrame({
+                    "time": np.full(rows.size, entry["time"]),
+                    "cell_id": [entry["keys"][row] for row in rows],
+                    "rule": pd.Categorical.from_codes(entry["rule"][take][::-1], categories=self.rules),
+                    "event": np.where(entry["raised"][take][::-1], "raised", "cleared"),
+                    "value": entry["value"][take][::-1],
+                    "threshold": entry["threshold"][take][::-1],
+                }))
+                remaining -= rows.size
+        if not chunks:
+            return pd.DataFrame(columns=["time", "cell_id", "rule", "event", "value", "threshold"])
+        return pd.concat(chunks, ignore_index=True)
+
+
+def apply_status(store, codes):
+    """Write status codes into a CellStore, touching only the rows that changed"""
+    changed = np.flatnonzero(store.column("status") != codes)
+    if changed.size:
+        store.update_rows(changed, status=codes[changed])
+    return changed.size
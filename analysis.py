@@ -0,0 +1,320 @@
+import warnings
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+ANALYSIS_METRICS = ("voltage", "temperature", "current", "soc", "capacity", "health")
+
+# Candidate bucket widths in seconds, finest first
+BUCKET_LADDER = (1, 5, 15, 60, 300, 900, 3600, 4 * 3600, 12 * 3600, 86400)
+DEFAULT_TARGET_POINTS = 1000
+MAX_SCATTER_POINTS = 5000
+MAX_CORRELATION_ROWS = 1_000_000
+ROLLUP_CACHE_ENTRIES = 16
+
+_US = 1_000_000
+
+
+def lttb(x, y, n_out):
+    """Largest-Triangle-Three-Buckets downsampling; returns the kept indices
+
+    Keeps the first and last points and, from each of ``n_out - 2`` equal
+    buckets in between, the point forming the largest triangle with the
+    previously kept point and the mean of the next bucket. ``x`` must be
+    increasing.
+    """
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.intp)
+    # Mean of every bucket, plus the last point as the final "next bucket"
+    sums_x = np.add.reduceat(x[1:n - 1], edges[:-1] - 1)
+    sums_y = np.add.reduceat(y[1:n - 1], edges[:-1] - 1)
+    widths = np.diff(edges)
+    avg_x = np.append(sums_x / widths, x[-1])
+    avg_y = np.append(sums_y / widths, y[-1])
+
+    kept = np.empty(n_out, dtype=np.intp)
+    kept[0], kept[-1] = 0, n - 1
+    prev = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        area = np.abs((x[prev] - avg_x[i + 1]) * (y[lo:hi] - y[prev])
+                      - (x[prev] - x[lo:hi]) * (avg_y[i + 1] - y[prev]))
+        prev = lo + int(np.argmax(area))
+        kept[i + 1] = prev
+    return kept
+
+
+def minmax_decimate(y, n_out):
+    """Indices of the min and max of each of ``n_out // 2`` buckets, in order
+
+    Preserves every spike in the data, at the cost of a less smooth line
+    than LTTB.
+    """
+    n = len(y)
+    buckets = max(n_out // 2, 1)
+    if n <= n_out:
+        return np.arange(n)
+    y = np.asarray(y, dtype=np.float64)
+    size = -(-n // buckets)
+    padded = np.full(buckets * size, np.nan)
+    padded[:n] = y
+    padded = padded.reshape(buckets, size)
+    valid = ~np.all(np.isnan(padded), axis=1)
+    offsets = np.arange(buckets)[valid] * size
+    lows = offsets + np.nanargmin(padded[valid], axis=1)
+    highs = offsets + np.nanargmax(padded[valid], axis=1)
+    return np.unique(np.concatenate([lows, highs]))
+
+
+def bucket_width(span_seconds, target_points, min_width=1):
+    """Finest ladder width (>= ``min_width``) giving at most ``target_points`` buckets"""
+    for width in BUCKET_LADDER:
+        if width >= min_width and span_seconds / width <= target_points:
+            return width
+    return max(BUCKET_LADDER[-1], min_width)
+
+
+class Rollup:
+    """Per-bucket, per-cell min/max/mean/last of one metric
+
+    Arrays are dense ``(buckets, cells)``; buckets with no samples for a cell
+    hold NaN. ``times`` are the bucket start times.
+    """
+
+    def __init__(self, times, width, minimum, maximum, sums, counts, last):
+        self.times = times
+        self.width = width
+        self.min = minimum
+        self.max = maximum
+        self.counts = counts
+        with np.errstate(invalid="ignore", divide="ignore"):
+            self.mean = (sums / counts).astype(np.float32)
+        self.last = last
+        self._sums = sums
+
+    def __len__(self):
+        return len(self.times)
+
+    def fleet(self):
+        """Fleet-wide min/mean/max per bucket as a DataFrame"""
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = self._sums.sum(axis=1) / self.counts.sum(axis=1)
+        with warnings.catch_warnings():
+            # All-NaN buckets (cells without samples) reduce to NaN
+            warnings.simplefilter("ignore", RuntimeWarning)
+            return pd.DataFrame({
+                "time": self.times,
+                "min": np.nanmin(self.min, axis=1),
+                "mean": mean.astype(np.float32),
+                "max": np.nanmax(self.max, axis=1),
+            })
+
+
+class HistoryAnalyzer:
+    """Rollups, downsampled trends, distributions and correlations over a history frame
+
+    Rows are kept in time order, so any time window is a contiguous row range
+    found with ``searchsorted``. Time-major grids (every timestamp holding
+    every cell, as ``history`` generates them) are reshaped to
+    ``(steps, cells)`` and rolled up with ``reduceat``; other layouts fall
+    back to a sort by (bucket, cell). Results are computed per window at the
+    resolution the caller can display, so zooming in re-queries a narrower
+    range at a finer bucket width instead of shipping every sample.
+    """
+
+    def __init__(self, frame):
+        self.frame = frame
+        times = frame["timestamp"].to_numpy().astype("datetime64[us]").view(np.int64)
+        codes = frame["cell_id"].cat.codes.to_numpy()
+        order = None
+        if len(times) > 1 and np.any(times[1:] < times[:-1]):
+            order = np.argsort(times, kind="stable")
+        self.times = times if order is None else times[order]
+        self.cell_codes = codes if order is None else codes[order]
+        self.cell_ids = frame["cell_id"].cat.categories
+        self.metrics = tuple(name for name in ANALYSIS_METRICS if name in frame)
+        self.values = {}
+        for name in self.metrics:
+            values = frame[name].to_numpy(dtype=np.float32)
+            self.values[name] = values if order is None else values[order]
+
+        n = len(self.cell_ids)
+        self.grid = (n > 0 and len(times) % n == 0 and
+                     np.array_equal(self.cell_codes.reshape(-1, n),
+                                    np.broadcast_to(np.arange(n), (len(times) // n, n))))
+        step_times = self.times[::n] if self.grid else np.unique(self.times)
+        self.step_times = step_times
+        self.raw_step = (int(np.median(np.diff(step_times))) // _US or 1) if len(step_times) > 1 else 1
+        self._rollups = OrderedDict()
+
+    def __len__(self):
+        return len(self.times)
+
+    @property
+    def start(self):
+        return self.times[0].astype("datetime64[us]") if len(self) else None
+
+    @property
+    def end(self):
+        return self.times[-1].astype("datetime64[us]") if len(self) else None
+
+    def _bounds(self, start, end):
+        lo_t = self.times[0] if start is None else np.datetime64(start, "us").astype(np.int64)
+        hi_t = self.times[-1] if end is None else np.datetime64(end, "us").astype(np.int64)
+        return lo_t, hi_t
+
+    def row_range(self, start=None, end=None):
+        """Contiguous row slice covering [start, end]"""
+        lo_t, hi_t = self._bounds(start, end)
+        lo = np.searchsorted(self.times, lo_t, side="left")
+        hi = np.searchsorted(self.times, hi_t, side="right")
+        return slice(lo, hi)
+
+    # Rollups ----------------------------------------------------------
+
+    def rollup(self, metric, width, start=None, end=None):
+        """Rollup of ``metric`` into ``width``-second buckets over [start, end]"""
+        lo_t, hi_t = self._bounds(start, end)
+        key = (metric, width, int(lo_t), int(hi_t))
+        cached = self._rollups.get(key)
+        if cached is not None:
+            self._rollups.move_to_end(key)
+            return cached
+
+        rows = self.row_range(start, end)
+        width_us = width * _US
+        # Buckets are aligned to multiples of the width since the epoch
+        origin = lo_t - lo_t % width_us
+        compute = self._grid_rollup if self.grid else self._sorted_rollup
+        times, minimum, maximum, sums, counts, last = compute(metric, rows, origin, width_us)
+        rollup = Rollup(times, width, minimum, maximum, sums, counts, last)
+
+        self._rollups[key] = rollup
+        if len(self._rollups) > ROLLUP_CACHE_ENTRIES:
+            self._rollups.popitem(last=False)
+        return rollup
+
+    def _grid_rollup(self, metric, rows, origin, width_us):
+        n = len(self.cell_ids)
+        first, stop = rows.start // n, rows.stop // n
+        grid = self.values[metric].reshape(-1, n)[first:stop]
+        step_times = self.step_times[first:stop]
+        buckets = (step_times - origin) // width_us
+        if not len(buckets):
+            empty = np.empty((0, n), dtype=np.float32)
+            return (np.array([], dtype="datetime64[us]"), empty, empty, empty.astype(np.float64),
+                    empty.astype(np.int64), empty)
+        starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+        ends = np.r_[starts[1:], len(buckets)]
+        counts = np.broadcast_to((ends - starts)[:, None], (len(starts), n))
+        return (
+            (origin + buckets[starts] * width_us).astype("datetime64[us]"),
+            np.minimum.reduceat(grid, starts, axis=0),
+            np.maximum.reduceat(grid, starts, axis=0),
+            np.add.reduceat(grid, starts, axis=0, dtype=np.float64),
+            counts,
+            grid[ends - 1],
+        )
+
+    def _sorted_rollup(self, metric, rows, origin, width_us):
+        n = len(self.cell_ids)
+        values = self.values[metric][rows]
+        buckets = (self.times[rows] - origin) // width_us
+        distinct, bucket_pos = np.unique(buckets, return_inverse=True)
+        keys = bucket_pos * n + self.cell_codes[rows]
+        order = np.argsort(keys, kind="stable")
+        keys, values = keys[order], values[order]
+        shape = (len(distinct), n)
+        minimum = np.full(shape, np.nan, dtype=np.float32)
+        maximum = np.full(shape, np.nan, dtype=np.float32)
+        last = np.full(shape, np.nan, dtype=np.float32)
+        sums = np.zeros(shape)
+        counts = np.zeros(shape, dtype=np.int64)
+        if len(keys):
+            starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+            ends = np.r_[starts[1:], len(keys)]
+            slots = np.unravel_index(keys[starts], shape)
+            minimum[slots] = np.minimum.reduceat(values, starts)
+            maximum[slots] = np.maximum.reduceat(values, starts)
+            sums[slots] = np.add.reduceat(values, starts, dtype=np.float64)
+            counts[slots] = ends - starts
+            last[slots] = values[ends - 1]
+        times = (origin + distinct * width_us).astype("datetime64[us]")
+        return times, minimum, maximum, sums, counts, last
+
+    # Queries ----------------------------------------------------------
+
+    def trend(self, metric, start=None, end=None, cells=(), target_points=DEFAULT_TARGET_POINTS,
+              method="lttb"):
+        """Fleet band plus per-cell lines for [start, end], sized for display
+
+        The fleet min/mean/max comes from a rollup at the finest ladder width
+        that fits ``target_points`` buckets. Each requested cell's raw series
+        is downsampled to ``target_points`` with LTTB or min-max decimation.
+        Returns ``(width_seconds, fleet_frame, {cell_id: frame})``.
+        """
+        lo_t, hi_t = self._bounds(start, end)
+        span = max((hi_t - lo_t) / _US, 1)
+        width = bucket_width(span, target_points, self.raw_step)
+        fleet = self.rollup(metric, width, start, end).fleet()
+
+        lines = {}
+        rows = self.row_range(start, end)
+        code_of = {cell: code for code, cell in enumerate(self.cell_ids)}
+        for cell in cells:
+            code = code_of.get(cell)
+            if code is None:
+                continue
+            if self.grid:
+                n = len(self.cell_ids)
+                first, stop = rows.start // n, rows.stop // n
+                times = self.step_times[first:stop]
+                values = self.values[metric].reshape(-1, n)[first:stop, code]
+            else:
+                mask = self.cell_codes[rows] == code
+                times = self.times[rows][mask]
+                values = self.values[metric][rows][mask]
+            if method == "minmax":
+                kept = minmax_decimate(values, target_points)
+            else:
+                kept = lttb(times, values, target_points)
+            lines[cell] = pd.DataFrame({"time": times[kept].astype("datetime64[us]"),
+                                        metric: values[kept]})
+        return width, fleet, lines
+
+    def distribution(self, metric, start=None, end=None, bins=50):
+        """Histogram (bin edges, counts) of every sample of ``metric`` in the window"""
+        values = self.values[metric][self.row_range(start, end)]
+        values = values[np.isfinite(values)]
+        if not len(values):
+            return np.array([]), np.array([], dtype=np.int64)
+        counts, edges = np.histogram(values, bins=bins)
+        return edges, counts
+
+    def _window_sample(self, start, end, limit):
+        rows = self.row_range(start, end)
+        stride = max(1, -(-(rows.stop - rows.start) // limit))
+        return slice(rows.start, rows.stop, stride)
+
+    def correlation(self, start=None, end=None, metrics=None):
+        """Pearson correlation matrix of the metrics over a strided sample of the window"""
+        metrics = [m for m in (metrics or self.metrics) if m in self.values]
+        rows = self._window_sample(start, end, MAX_CORRELATION_ROWS)
+        data = np.vstack([self.values[m][rows].astype(np.float64) for m in metrics])
+        with np.errstate(invalid="ignore", divide="ignore"):
+            matrix = np.corrcoef(data) if data.shape[1] > 1 else np.full((len(metrics),) * 2, np.nan)
+        return pd.DataFrame(np.atleast_2d(matrix), index=metrics, columns=metrics)
+
+    def scatter_sample(self, x, y, start=None, end=None, limit=MAX_SCATTER_POINTS):
+        """Evenly strided sample of two metrics for a scatter plot"""
+        rows = self._window_sample(start, end, limit)
+        return pd.DataFrame({
+            x: self.values[x][rows],
+            y: self.values[y][rows],
+            "cell_id": self.cell_ids[self.cell_codes[rows]],
+        })
@@ -0,0 +1,39 @@
+"""Time bulk cell-network generation across pack sizes
+
+Run from the repository root:  python benchmarks/bench_generation.py
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cell_generator import generate_cells  # noqa: E402
+
+DEFAULT_SIZES = [1_000, 10_000, 100_000, 1_000_000]
+
+
+def time_generation(count, repeats):
+    best = float("inf")
+    for seed in range(repeats):
+        start = time.perf_counter()
+        generate_cells("NMC", "Medium", count=count, seed=seed)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    print(f"{'cells':>10}  {'best (ms)':>10}  {'ns/cell':>8}")
+    for count in args.sizes:
+        seconds = time_generation(count, args.repeats)
+        print(f"{count:>10}  {seconds * 1e3:>10.1f}  {seconds * 1e9 / count:>8.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""Check that the headless modules import within a fixed time budget
+
+Run from the repository root:  python benchmarks/bench_import.py
+
+Each module is imported in a fresh interpreter. The run fails if the best
+of ``--repeats`` exceeds the budget, or if the import pulls in Streamlit
+or plotly.
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_MODULES = ["bms_core", "bms_cli"]
+IMPORT_BUDGET_SECONDS = 1.0
+FORBIDDEN_MODULES = ("streamlit", "plotly")
+
+_PROBE = """
+import sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+loaded = [name for name in {forbidden!r} if name in sys.modules]
+print(elapsed, ",".join(loaded))
+"""
+
+
+def time_import(module):
+    code = _PROBE.format(module=module, forbidden=FORBIDDEN_MODULES)
+    result = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True)
+    elapsed, loaded = result.stdout.split(" ", 1)
+    return float(elapsed), [name for name in loaded.strip().split(",") if name]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--modules", nargs="+", default=DEFAULT_MODULES)
+    parser.add_argument("--budget", type=float, default=IMPORT_BUDGET_SECONDS, help="seconds per module")
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    failed = False
+    print(f"{'module':>12}  {'best (ms)':>10}  {'budget (ms)':>11}  status")
+    for module in args.modules:
+        runs = [time_import(module) for _ in range(args.repeats)]
+        best = min(elapsed for elapsed, _ in runs)
+        loaded = sorted({name for _, names in runs for name in names})
+        status = "ok"
+        if best > args.budget:
+            status = "OVER BUDGET"
+        if loaded:
+            status = f"imports {', '.join(loaded)}"
+        failed |= status != "ok"
+        print(f"{module:>12}  {best * 1e3:>10.1f}  {args.budget * 1e3:>11.0f}  {status}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
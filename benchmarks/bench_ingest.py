@@ -0,0 +1,77 @@
+"""Measure sustained ingest rate and end-to-end latency of the telemetry server
+
+Run from the repository root:
+    python benchmarks/bench_ingest.py                        # saturate, binary and NDJSON
+    python benchmarks/bench_ingest.py --rate 200000          # latency at a fixed offered load
+
+The server runs in this process against a temporary TelemetryStore; the
+load generator runs in a separate process (``bms_cli.py loadgen``) so the
+two do not share an interpreter lock. Latency is measured from the
+sender's timestamp in each frame header to the moment the frame's rows
+were applied to the cell table.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from ingest import FRAME_KINDS, IngestServer  # noqa: E402
+from telemetry_store import TelemetryStore  # noqa: E402
+
+
+async def run_case(args, fmt):
+    with tempfile.TemporaryDirectory() as data_dir:
+        store = TelemetryStore(data_dir)
+        async with IngestServer(telemetry_store=store, port=0) as server:
+            command = [sys.executable, os.path.join(ROOT, "bms_cli.py"), "--data-dir", data_dir, "loadgen",
+                       "--port", str(server.port), "--cells", str(args.cells), "--types", *args.types,
+                       "--format", fmt, "--batch-rows", str(args.batch_rows),
+                       "--connections", str(args.connections), "--duration", str(args.duration)]
+            if args.rate:
+                command += ["--rate", str(args.rate)]
+            generator = await asyncio.create_subprocess_exec(*command, stdout=asyncio.subprocess.PIPE)
+            output, _ = await generator.communicate()
+            if generator.returncode:
+                raise RuntimeError(f"loadgen exited with {generator.returncode}")
+        stats = server.stats
+        return {
+            "format": fmt,
+            "sent": output.decode().strip().splitlines()[-1],
+            "rows": stats.rows_applied,
+            "rows_per_second": stats.rows_per_second,
+            "mb_per_second": stats.bytes / 2**20 / max(stats.last_applied - stats.first_frame, 1e-9)
+            if stats.first_frame and stats.last_applied else 0.0,
+            "latency": stats.latency_ms(),
+            "stalls": stats.stalls,
+            "history_rows": store.history_rows,
+        }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cells", type=int, default=100_000)
+    parser.add_argument("--types", nargs="+", default=["LFP", "NMC"])
+    parser.add_argument("--formats", nargs="+", default=list(FRAME_KINDS), choices=list(FRAME_KINDS))
+    parser.add_argument("--batch-rows", type=int, default=10_000)
+    parser.add_argument("--connections", type=int, default=2)
+    parser.add_argument("--rate", type=float, help="offered rows per second (default: saturate)")
+    parser.add_argument("--duration", type=float, default=10.0)
+    args = parser.parse_args(argv)
+
+    print(f"{'format':>7}  {'rows':>10}  {'rows/s':>10}  {'MB/s':>6}  {'p50 (ms)':>8}  {'p95 (ms)':>8}  "
+          f"{'p99 (ms)':>8}  {'stalls':>6}")
+    for fmt in args.formats:
+        result = asyncio.run(run_case(args, fmt))
+        latency = result["latency"]
+        print(f"{fmt:>7}  {result['rows']:>10,}  {result['rows_per_second']:>10,.0f}  {result['mb_per_second']:>6.1f}  "
+              f"{latency[50]:>8.1f}  {latency[95]:>8.1f}  {latency[99]:>8.1f}  {result['stalls']:>6}")
+        if result["rows"] != result["history_rows"]:
+            sys.exit(f"{fmt}: {result['rows']:,} rows applied but {result['history_rows']:,} written to history")
+
+
+if __name__ == "__main__":
+    main()
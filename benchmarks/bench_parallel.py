@@ -0,0 +1,53 @@
+"""Compare serial and process-pool generation of cells and history
+
+Run from the repository root:  python benchmarks/bench_parallel.py
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cell_generator import generate_cells  # noqa: E402
+from history import iter_historical_data  # noqa: E402
+from parallel_build import ParallelBuilder  # noqa: E402
+
+
+def run_serial(cells, hours, resolution):
+    start = time.perf_counter()
+    store = generate_cells("NMC", count=cells, seed=0)
+    rows = sum(len(frame) for frame in iter_historical_data(store, hours, resolution, seed=0))
+    return time.perf_counter() - start, rows
+
+
+def run_parallel(cells, hours, resolution, workers):
+    with ParallelBuilder(workers=workers) as builder:
+        # Warm the pool so process start-up is not counted
+        builder.build_cells("NMC", count=1, seed=0)
+        start = time.perf_counter()
+        store = builder.build_cells("NMC", count=cells, seed=0)
+        rows = sum(len(frame) for frame in builder.iter_history(store, hours, resolution, seed=0))
+        return time.perf_counter() - start, rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cells", type=int, default=200_000)
+    parser.add_argument("--hours", type=float, default=2)
+    parser.add_argument("--resolution", default="minute")
+    parser.add_argument("--workers", type=int, nargs="+",
+                        default=sorted({1, 2, 4, os.cpu_count() or 1}))
+    args = parser.parse_args(argv)
+
+    serial, rows = run_serial(args.cells, args.hours, args.resolution)
+    print(f"{args.cells:,} cells, {rows:,} history rows, {os.cpu_count()} CPUs")
+    print(f"{'mode':>12}  {'seconds':>8}  {'speedup':>7}")
+    print(f"{'serial':>12}  {serial:>8.2f}  {1.0:>7.2f}")
+    for workers in args.workers:
+        seconds, _ = run_parallel(args.cells, args.hours, args.resolution, workers)
+        print(f"{f'{workers} workers':>12}  {seconds:>8.2f}  {serial / seconds:>7.2f}")
+
+
+if __name__ == "__main__":
+    main()
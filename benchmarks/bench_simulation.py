@@ -0,0 +1,40 @@
+"""Measure how much faster than real time the pack simulator runs
+
+Run from the repository root:  python benchmarks/bench_simulation.py
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cell_generator import generate_cells  # noqa: E402
+from simulation import CC_CHARGE, PackSimulator  # noqa: E402
+
+DEFAULT_SIZES = [1_000, 10_000, 100_000]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--timestep", type=float, default=1.0)
+    parser.add_argument("--steps", type=int, default=50)
+    args = parser.parse_args(argv)
+
+    print(f"{'cells':>10}  {'ms/step':>8}  {'x real time':>11}")
+    for count in args.sizes:
+        cell_types = ["LFP", "Li-ion", "NMC", "LTO", "LiPo"] * (count // 5 + 1)
+        sim = PackSimulator(generate_cells(cell_types[:count], seed=0), timestep=args.timestep)
+        sim.set_mode(np.arange(count), CC_CHARGE, 2.0)
+        start = time.perf_counter()
+        for _ in range(args.steps):
+            sim.step()
+        per_step = (time.perf_counter() - start) / args.steps
+        print(f"{count:>10}  {per_step * 1e3:>8.2f}  {args.timestep / per_step:>11.0f}")
+
+
+if __name__ == "__main__":
+    main()
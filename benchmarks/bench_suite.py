@@ -0,0 +1,303 @@
+"""Benchmark the hot paths across network sizes and compare against a baseline
+
+Run from the repository root:
+    python benchmarks/bench_suite.py                   # compare with benchmarks/baseline.json
+    python benchmarks/bench_suite.py --save-baseline   # record a new baseline
+    python benchmarks/bench_suite.py --save-baseline --cases topology   # re-record some cases
+
+Every case runs in a fresh interpreter and is called once untimed
+first, so lazy imports and first-call caches stay out of the timings.
+For each case the suite records the median wall time over ``--repeats``
+runs, the process's peak RSS, and the peak traced allocations of one
+extra run (NumPy reports its buffers to tracemalloc). The suite exits
+non-zero if a case is slower, or uses more memory, than the baseline by
+more than ``--threshold``. It needs no display or Streamlit.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+DEFAULT_SIZES = [10, 1_000, 100_000, 1_000_000]
+DEFAULT_HORIZONS = ["1:minute", "24:hour", "24:minute"]
+DEFAULT_BASELINE = os.path.join(ROOT, "benchmarks", "baseline.json")
+# Medians still move by a third between runs on a busy single-CPU machine
+DEFAULT_THRESHOLD = 0.5
+DEFAULT_REPEATS = 5
+# Cases faster than this are reported but never fail the run (timer noise)
+MIN_COMPARED_SECONDS = 0.01
+# Per-cell dict generation is the legacy path; cap it to keep the suite short
+MAX_LEGACY_CELLS = 100_000
+MAX_HISTORY_ROWS = 30_000_000
+# Retention replays RETENTION_STEPS samples of every cell
+MAX_RETENTION_CELLS = 100_000
+RETENTION_STEPS = 720
+CELL_TYPES = ["LFP", "Li-ion", "NMC", "LTO", "LiPo"]
+
+
+# Cases -----------------------------------------------------------------
+#
+# Each case has a setup (untimed) returning state and a run timed on it.
+
+def _cells(count):
+    from cell_generator import generate_cells
+    return generate_cells((CELL_TYPES * (count // len(CELL_TYPES) + 1))[:count], seed=0)
+
+
+def _setup_none(spec):
+    return None
+
+
+def _run_create_cell_data(state, spec):
+    import numpy as np
+    from bms_core import create_cell_data
+    from cell_store import CellStore
+    rng = np.random.default_rng(0)
+    store = CellStore(capacity=spec["cells"])
+    for idx in range(spec["cells"]):
+        cell_type = CELL_TYPES[idx % len(CELL_TYPES)]
+        store.append(f"cell_{idx + 1}_{cell_type.lower()}", create_cell_data(cell_type, idx, rng))
+
+
+def _run_generate_cells(state, spec):
+    _cells(spec["cells"])
+
+
+def _run_history(state, spec):
+    from history import iter_historical_data
+    for _ in iter_historical_data(state, spec["hours"], spec["resolution"], seed=0):
+        pass
+
+
+def _setup_index(spec):
+    from cell_index import CellIndex
+    cells = _cells(spec["cells"])
+    return cells, CellIndex(cells)
+
+
+def _run_summary(state, spec):
+    import numpy as np
+    cells, _ = state
+    # Touch 1% of the cells, then read the Network Overview figures
+    rows = np.arange(0, len(cells), 100)
+    cells.update_rows(rows, temp=cells.column("temp")[rows] + 0.1)
+    cells.summary()
+
+
+def _run_filter_sort(state, spec):
+    from cell_index import CellIndex
+    cells, _ = state
+    # Cold index: the first query after the data changed
+    CellIndex(cells).query(status="Active", predicates=[("temp", ">", 30.0)], sort_by="temp")
+
+
+def _run_filter_sort_warm(state, spec):
+    _, index = state
+    index.query(status="Active", predicates=[("temp", ">", 30.0)], sort_by="temp")
+
+
+def _run_render(state, spec):
+    from cell_cards import render_cards
+    cells, index = state
+    rows = index.query(sort_by="temp", limit=24)
+    render_cards(cells, rows)
+    cells.to_frame(index.query(sort_by="health", limit=100))
+
+
+def _setup_topology(spec):
+    from topology import PackTopology, cell_state
+    cells = _cells(spec["cells"])
+    # 16s packs of as many parallel cells as fit in 20 packs per chemistry
+    parallel = max(spec["cells"] // (len(CELL_TYPES) * 20 * 16), 1)
+    return PackTopology.from_store(cells, 16, parallel), cell_state(cells)
+
+
+def _run_topology(state, spec):
+    topology, (voltage, soc, capacity_ah) = state
+    topology.pack_frame(voltage, soc, capacity_ah)
+    topology.balance(soc, capacity_ah, "active")
+
+
+def _setup_retention(spec):
+    import numpy as np
+    from retention import RETENTION_METRICS
+    cells = _cells(spec["cells"])
+    values = {metric: np.random.default_rng(0).random(spec["cells"], dtype=np.float32) for metric in RETENTION_METRICS}
+    return list(cells), values
+
+
+def _run_retention(state, spec):
+    import numpy as np
+    from retention import TieredHistory
+    keys, values = state
+    # Two hours of 10 s samples with a budget small enough to force early rollups
+    history = TieredHistory(budget_bytes=spec["cells"] * 1024)
+    start = np.datetime64("2026-01-01T00:00:00", "us")
+    for step in range(RETENTION_STEPS):
+        history.append_sample(start + np.timedelta64(10 * step, "s"), keys, values)
+    history.query(start + np.timedelta64(3600, "s"))
+
+
+CASES = {
+    "create_cell_data": (_setup_none, _run_create_cell_data),
+    "generate_cells": (_setup_none, _run_generate_cells),
+    "history": (lambda spec: _cells(spec["cells"]), _run_history),
+    "summary": (_setup_index, _run_summary),
+    "filter_sort": (_setup_index, _run_filter_sort),
+    "filter_sort_warm": (_setup_index, _run_filter_sort_warm),
+    "render": (_setup_index, _run_render),
+    "topology": (_setup_topology, _run_topology),
+    "retention": (_setup_retention, _run_retention),
+}
+
+
+def case_specs(sizes, horizons):
+    from history import history_steps
+    specs = []
+    for count in sizes:
+        if count <= MAX_LEGACY_CELLS:
+            specs.append({"case": "create_cell_data", "cells": count})
+        for case in ("generate_cells", "summary", "filter_sort", "filter_sort_warm", "render"):
+            specs.append({"case": case, "cells": count})
+        if count >= len(CELL_TYPES) * 16:
+            specs.append({"case": "topology", "cells": count})
+        if count <= MAX_RETENTION_CELLS:
+            specs.append({"case": "retention", "cells": count})
+        for horizon in horizons:
+            hours, resolution = horizon.split(":")
+            steps, _ = history_steps(int(hours), resolution)
+            if steps * count <= MAX_HISTORY_ROWS:
+                specs.append({"case": "history", "cells": count, "hours": int(hours), "resolution": resolution})
+    return specs
+
+
+def spec_name(spec):
+    name = f"{spec['case']}/cells={spec['cells']}"
+    if "hours" in spec:
+        name += f"/{spec['hours']}h@{spec['resolution']}"
+    return name
+
+
+# Worker ----------------------------------------------------------------
+
+def measure(spec, repeats):
+    """Run one case in this process and return its measurements"""
+    import resource
+    import tracemalloc
+
+    setup, run = CASES[spec["case"]]
+    state = setup(spec)
+    # Warm-up: pulls in the case's imports and fills first-call caches
+    run(state, spec)
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        run(state, spec)
+        times.append(time.perf_counter() - start)
+    tracemalloc.start()
+    run(state, spec)
+    _, alloc_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    # ru_maxrss is in KiB on Linux
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    return {"wall_s": statistics.median(times), "wall_min_s": min(times), "peak_rss_mb": peak_rss / 2**20, "alloc_peak_mb": alloc_peak / 2**20}
+
+
+def run_isolated(spec, repeats):
+    result = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--worker", json.dumps(spec), "--repeats", str(repeats)],
+        cwd=ROOT, capture_output=True, text=True,
+    )
+    if result.returncode:
+        raise RuntimeError(f"{spec_name(spec)} failed:\n{result.stderr}")
+    return json.loads(result.stdout.splitlines()[-1])
+
+
+# Baseline comparison ---------------------------------------------------
+
+def compare(results, baseline, threshold):
+    """Names of cases that regressed beyond ``threshold`` on time or memory"""
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if previous is None:
+            continue
+        slower = (current["wall_s"] > previous["wall_s"] * (1 + threshold)
+                  and current["wall_s"] >= MIN_COMPARED_SECONDS)
+        heavier = current["alloc_peak_mb"] > previous["alloc_peak_mb"] * (1 + threshold) + 1.0
+        if slower or heavier:
+            regressions.append(name)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--horizons", nargs="+", default=DEFAULT_HORIZONS, help="hours:resolution pairs")
+    parser.add_argument("--cases", nargs="+", choices=list(CASES), help="only run these cases")
+    parser.add_argument("--repeats", type=int, default=DEFAULT_REPEATS, help="timed runs per case; the median is kept")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="write results as the new baseline")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="allowed relative slowdown / allocation growth (default %(default)s)")
+    parser.add_argument("--output", help="also write this run's results as JSON")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.worker:
+        print(json.dumps(measure(json.loads(args.worker), args.repeats)))
+        return
+
+    # A run over a subset of cases or sizes only re-records that subset
+    partial = bool(args.cases) or args.sizes != DEFAULT_SIZES or args.horizons != DEFAULT_HORIZONS
+    baseline = {}
+    if os.path.exists(args.baseline) and (partial or not args.save_baseline):
+        with open(args.baseline) as fh:
+            baseline = json.load(fh)["results"]
+
+    results = {}
+    print(f"{'case':<44}  {'wall (ms)':>10}  {'vs base':>7}  {'RSS (MB)':>9}  {'alloc (MB)':>10}")
+    for spec in case_specs(args.sizes, args.horizons):
+        if args.cases and spec["case"] not in args.cases:
+            continue
+        name = spec_name(spec)
+        result = results[name] = run_isolated(spec, args.repeats)
+        previous = baseline.get(name)
+        change = f"{result['wall_s'] / previous['wall_s'] - 1:+.0%}" if previous else "new"
+        print(f"{name:<44}  {result['wall_s'] * 1e3:>10.2f}  {change:>7}  "
+              f"{result['peak_rss_mb']:>9.1f}  {result['alloc_peak_mb']:>10.1f}")
+
+    payload = {
+        "machine": {"python": platform.python_version(), "platform": platform.platform(),
+                    "cpus": os.cpu_count()},
+        "repeats": args.repeats,
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as fh:
+            json.dump(payload, fh, indent=2)
+    if args.save_baseline:
+        if partial:
+            payload["results"] = {**baseline, **results}
+        with open(args.baseline, "w") as fh:
+            json.dump(payload, fh, indent=2)
+        print(f"Baseline written to {args.baseline}")
+        return
+
+    regressions = compare(results, baseline, args.threshold)
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) beyond {args.threshold:.0%}:")
+        for name in regressions:
+            print(f"  {name}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,238 @@
+"""Generate, simulate and export battery networks without Streamlit
+
+Examples, from the repository root:
+    python bms_cli.py generate --cells 100000 --types LFP NMC --hours 24 --resolution minute --seed 7
+    python bms_cli.py simulate --seconds 3600 --mode discharge --current 2.5
+    python bms_cli.py export history --format CSV --compression gzip --columns timestamp cell_id voltage
+    python bms_cli.py packs --series 16 --parallel 100 --balance active --hours 2
+    python bms_cli.py ingest --port 9750                     # in one terminal
+    python bms_cli.py loadgen --port 9750 --rate 200000      # in another
+"""
+import argparse
+import asyncio
+import sys
+import time
+
+import numpy as np
+
+from bms_core import SIMULATION_MODES, build_network, simulate
+from cell_generator import generate_cells
+from cell_store import CELL_TYPES, PRIORITIES, CellStore
+from data_export import (COMPRESSIONS, DEFAULT_EXPORT_ROWS, EXPORT_FORMATS, ExportJob, iter_cell_chunks,
+                         iter_history_chunks, iter_task_chunks)
+from history import RESOLUTIONS
+from ingest import (DEFAULT_BATCH_ROWS, DEFAULT_HOST, DEFAULT_PORT, DEFAULT_QUEUE_FRAMES, FRAME_KINDS,
+                    IngestServer, LoadGenerator)
+from network_cache import network_key
+from telemetry_store import DEFAULT_DATA_DIR, TelemetryStore
+from topology import BALANCING_MODES, PackTopology, cell_state
+
+
+def _print_summary(cells):
+    stats = cells.summary()
+    print(f"{stats['total']:,} cells · {stats['active']:,} active · {stats['warning']:,} warning · "
+          f"avg {stats['avg_voltage']:.3f} V · avg {stats['avg_temp']:.1f} °C")
+
+
+def cmd_generate(store, args):
+    type_labels = list(np.resize(np.array(args.types, dtype=object), args.cells))
+    key = network_key(type_labels, args.priority, args.seed, args.hours, args.resolution)
+
+    def progress(done, total):
+        print(f"\rcells {done:,}/{total:,}", end="", file=sys.stderr)
+
+    started = time.perf_counter()
+    cells = build_network(store, key, type_labels, args.priority, parallel=args.parallel, progress=progress)
+    print(file=sys.stderr)
+    print(f"Built in {time.perf_counter() - started:.2f}s · {store.history_rows:,} history rows")
+    _print_summary(cells)
+
+
+def cmd_simulate(store, args):
+    cells = store.load_cells()
+    if cells is None:
+        raise SystemExit(f"No cells in {store.root}; run 'generate' first")
+    started = time.perf_counter()
+    simulate(cells, args.seconds, args.mode, args.current, args.timestep)
+    elapsed = time.perf_counter() - started
+    store.save_cells(cells)
+    # The cells no longer match the configuration they were generated from
+    store.set_network_key(None)
+    print(f"Simulated {args.seconds:,.0f}s of {args.mode} in {elapsed:.2f}s "
+          f"({args.seconds / elapsed:,.0f}x real time)")
+    _print_summary(cells)
+
+
+def cmd_export(store, args):
+    if args.dataset == "cells":
+        cells = store.load_cells()
+        if cells is None:
+            raise SystemExit(f"No cells in {store.root}")
+        chunks = iter_cell_chunks(cells, args.columns, args.chunk_rows)
+    elif args.dataset == "tasks":
+        chunks = iter_task_chunks(store.load_tasks(), args.columns, args.chunk_rows)
+    else:
+        chunks = iter_history_chunks(store, args.columns, args.start, args.end, args.chunk_rows)
+    job = ExportJob(chunks, args.format, args.compression)
+    output = args.output or f"{args.dataset}{job.extension}"
+    job.write_to(output)
+    print(f"{job.rows:,} rows · {job.raw_bytes / 1e6:.1f} MB encoded · {job.bytes_written / 1e6:.1f} MB written "
+          f"· {job.throughput:.1f} MB/s -> {output}")
+
+
+def cmd_packs(store, args):
+    cells = store.load_cells()
+    if cells is None:
+        raise SystemExit(f"No cells in {store.root}; run 'generate' first")
+    try:
+        topology = PackTopology.from_store(cells, args.series, args.parallel, args.packs)
+    except ValueError as exc:
+        raise SystemExit(str(exc))
+    voltage, soc, capacity_ah = cell_state(cells)
+    started = time.perf_counter()
+    packs = topology.pack_frame(voltage, soc, capacity_ah)
+    elapsed = time.perf_counter() - started
+    print(f"{len(topology):,} packs of {args.series}s{args.parallel}p · {topology.n_cells:,} of {len(cells):,} cells "
+          f"· reduced in {elapsed * 1000:.1f} ms")
+    print(packs.round(2).to_string())
+    if args.balance:
+        started = time.perf_counter()
+        result = topology.balance(soc, capacity_ah, args.balance, args.hours * 3600.0, args.current)
+        elapsed = time.perf_counter() - started
+        print(f"{args.balance} balancing for {args.hours:g} h: SoC spread {result.spread_before.mean() * 100:.2f}% -> "
+              f"{result.spread_after.mean() * 100:.2f}% (mean over packs) · {result.moved_ah.sum():,.1f} Ah moved · "
+              f"{result.lost_ah.sum():,.1f} Ah lost · {elapsed * 1000:.1f} ms")
+        if args.apply:
+            cells.update_rows(topology.cell_rows, soc=result.soc[topology.cell_rows] * 100.0)
+            store.save_cells(cells)
+            store.set_network_key(None)
+
+
+def _print_ingest(stats, previous_rows, interval):
+    latency = stats.latency_ms()
+    print(f"{stats.rows_applied:,} rows · {(stats.rows_applied - previous_rows) / interval:,.0f} rows/s · "
+          f"latency p50 {latency[50]:.1f} ms / p99 {latency[99]:.1f} ms · queue peak {stats.queue_peak} · "
+          f"{stats.stalls} stalls · {sum(stats.rejected.values()) + stats.frames_rejected:,} rejected")
+
+
+def cmd_ingest(store, args):
+    async def run():
+        server = IngestServer(store.load_cells() or CellStore(), store, args.host, args.port,
+                              args.queue_frames, args.batch_rows, args.default_type)
+        async with server:
+            print(f"Listening on {server.host}:{server.port}", file=sys.stderr)
+            started = time.perf_counter()
+            previous = 0
+            while args.duration is None or time.perf_counter() - started < args.duration:
+                await asyncio.sleep(args.report_every)
+                _print_ingest(server.stats, previous, args.report_every)
+                previous = server.stats.rows_applied
+        print(f"Sustained {server.stats.rows_per_second:,.0f} rows/s; "
+              f"{len(server.cells):,} cells, {store.history_rows:,} history rows stored")
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+
+
+def cmd_loadgen(store, args):
+    cells = None if args.cells else store.load_cells()
+    if cells is None:
+        type_labels = list(np.resize(np.array(args.types, dtype=object), args.cells or 1000))
+        cells = generate_cells(type_labels, seed=args.seed)
+
+    async def run():
+        generators = [LoadGenerator(cells.copy(), args.format, args.batch_rows,
+                                    args.rate / args.connections if args.rate else None, seed=args.seed + i)
+                      for i in range(args.connections)]
+        await asyncio.gather(*(g.run(args.host, args.port, args.duration, args.max_rows) for g in generators))
+        return generators
+
+    try:
+        generators = asyncio.run(run())
+    except OSError as exc:
+        raise SystemExit(f"Cannot stream to {args.host}:{args.port}: {exc}")
+    rows = sum(g.rows_sent for g in generators)
+    elapsed = max(g.elapsed for g in generators)
+    print(f"Sent {rows:,} rows from {len(cells):,} cells in {elapsed:.1f}s ({rows / elapsed:,.0f} rows/s, "
+          f"{args.format} over {args.connections} connection(s))")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--data-dir", default=DEFAULT_DATA_DIR, help="TelemetryStore directory (default: %(default)s)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    generate = commands.add_parser("generate", help="build a cell network and its history")
+    generate.add_argument("--cells", type=int, default=1000)
+    generate.add_argument("--types", nargs="+", default=["LFP"], choices=CELL_TYPES,
+                          help="cell types, repeated across the network")
+    generate.add_argument("--priority", default="Medium", choices=PRIORITIES)
+    generate.add_argument("--seed", type=int, default=0)
+    generate.add_argument("--hours", type=int, default=24, help="history horizon; 0 for no history")
+    generate.add_argument("--resolution", default="hour", choices=list(RESOLUTIONS))
+    generate.add_argument("--parallel", action="store_true", help="shard generation across processes")
+    generate.set_defaults(run=cmd_generate)
+
+    sim = commands.add_parser("simulate", help="run the stored cells through the pack simulator")
+    sim.add_argument("--seconds", type=float, default=3600.0, help="simulated seconds")
+    sim.add_argument("--mode", default="discharge", choices=list(SIMULATION_MODES))
+    sim.add_argument("--current", type=float, default=1.0, help="charge/discharge current in A")
+    sim.add_argument("--timestep", type=float, default=1.0)
+    sim.set_defaults(run=cmd_simulate)
+
+    export = commands.add_parser("export", help="stream cells, tasks or history to a file")
+    export.add_argument("dataset", choices=["cells", "tasks", "history"])
+    export.add_argument("--format", default="CSV", choices=list(EXPORT_FORMATS))
+    export.add_argument("--compression", default="none", choices=list(COMPRESSIONS))
+    export.add_argument("--columns", nargs="+")
+    export.add_argument("--start", help="history start time (ISO 8601)")
+    export.add_argument("--end", help="history end time (ISO 8601)")
+    export.add_argument("--chunk-rows", type=int, default=DEFAULT_EXPORT_ROWS)
+    export.add_argument("-o", "--output")
+    export.set_defaults(run=cmd_export)
+
+    packs = commands.add_parser("packs", help="wire the stored cells into packs and report pack state")
+    packs.add_argument("--series", type=int, default=16, help="parallel groups in series per pack")
+    packs.add_argument("--parallel", type=int, default=100, help="cells per parallel group")
+    packs.add_argument("--packs", type=int, help="at most this many packs (default: as many as fit)")
+    packs.add_argument("--balance", choices=BALANCING_MODES, help="also simulate balancing")
+    packs.add_argument("--hours", type=float, default=1.0, help="balancing time")
+    packs.add_argument("--current", type=float, help="bleed / transfer current in A per group")
+    packs.add_argument("--apply", action="store_true", help="save the balanced SoC to the stored cells")
+    packs.set_defaults(run=cmd_packs)
+
+    ingest = commands.add_parser("ingest", help="serve the local telemetry ingestion endpoint")
+    ingest.add_argument("--host", default=DEFAULT_HOST)
+    ingest.add_argument("--port", type=int, default=DEFAULT_PORT)
+    ingest.add_argument("--queue-frames", type=int, default=DEFAULT_QUEUE_FRAMES)
+    ingest.add_argument("--batch-rows", type=int, default=DEFAULT_BATCH_ROWS)
+    ingest.add_argument("--default-type", default="LFP", choices=CELL_TYPES, help="chemistry of unknown cells")
+    ingest.add_argument("--duration", type=float, help="seconds to run (default: until interrupted)")
+    ingest.add_argument("--report-every", type=float, default=5.0)
+    ingest.set_defaults(run=cmd_ingest)
+
+    loadgen = commands.add_parser("loadgen", help="stream simulated telemetry to an ingestion endpoint")
+    loadgen.add_argument("--host", default=DEFAULT_HOST)
+    loadgen.add_argument("--port", type=int, default=DEFAULT_PORT)
+    loadgen.add_argument("--cells", type=int, help="generate this many cells (default: the stored network)")
+    loadgen.add_argument("--types", nargs="+", default=["LFP"], choices=CELL_TYPES)
+    loadgen.add_argument("--seed", type=int, default=0)
+    loadgen.add_argument("--format", default="binary", choices=list(FRAME_KINDS))
+    loadgen.add_argument("--batch-rows", type=int, default=10_000, help="rows per frame")
+    loadgen.add_argument("--rate", type=float, help="total rows per second (default: as fast as accepted)")
+    loadgen.add_argument("--connections", type=int, default=1)
+    loadgen.add_argument("--duration", type=float, default=10.0)
+    loadgen.add_argument("--max-rows", type=int)
+    loadgen.set_defaults(run=cmd_loadgen)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    args.run(TelemetryStore(args.data_dir), args)
+
+
+if __name__ == "__main__":
+    main()
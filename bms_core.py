@@ -0,0 +1,83 @@
+from datetime import datetime
+
+import numpy as np
+
+from alerts import AlertEngine
+from cell_generator import CHEMISTRY_LIMITS, generate_cells
+from history import iter_historical_data
+from simulation import CC_CHARGE, CC_DISCHARGE, REST, PackSimulator
+
+# Largest history (rows) kept in memory for a single session
+MAX_SESSION_HISTORY_ROWS = 20_000_000
+
+SIMULATION_MODES = {"rest": REST, "charge": CC_CHARGE, "discharge": CC_DISCHARGE}
+# Chemistry limits by lower-cased name; unknown chemistries get the Li-ion ones
+_LIMITS_BY_NAME = {name.lower(): limits for name, limits in CHEMISTRY_LIMITS.items()}
+
+
+def create_cell_data(cell_type, idx, rng=None):
+    """Create cell data with random parameters and timestamps"""
+    rng = rng if rng is not None else np.random.default_rng()
+    voltage, min_voltage, max_voltage = _LIMITS_BY_NAME.get(cell_type.lower(), CHEMISTRY_LIMITS["Li-ion"])
+    current = round(float(rng.uniform(0.5, 2.5)), 2)
+    temp = round(float(rng.uniform(25, 40)), 1)
+    capacity = round(voltage * current, 2)
+    soc = round(float(rng.uniform(20, 100)), 1)  # State of Charge
+    health = round(float(rng.uniform(85, 100)), 1)  # Battery Health
+
+    return {
+        "voltage": voltage,
+        "current": current,
+        "temp": temp,
+        "capacity": capacity,
+        "min_voltage": min_voltage,
+        "max_voltage": max_voltage,
+        "soc": soc,
+        "health": health,
+        "status": "Active" if temp < 35 else "Warning",
+        "timestamp": datetime.now(),
+        "cell_type": cell_type
+    }
+
+
+def publish_network(store, key, cells, history_chunks=()):
+    """Replace the network in a TelemetryStore with ``cells`` and their history"""
+    store.save_cells(cells)
+    store.clear_history()
+    for chunk in history_chunks:
+        store.append_history(chunk)
+    store.set_network_key(key)
+
+
+def build_network(store, key, cell_types, priorities="Medium", parallel=False, progress=None):
+    """Generate the network described by ``key`` and publish it to ``store``
+
+    ``key`` comes from ``network_key``; its seed, horizon and resolution
+    drive the build (no history when the horizon is 0). Returns the cells.
+    """
+    if parallel:
+        from parallel_build import ParallelBuilder
+
+        with ParallelBuilder() as builder:
+            cells = builder.build_cells(cell_types, priorities, seed=key.seed, progress=progress)
+            chunks = builder.iter_history(cells, key.hours, key.resolution, seed=key.seed) if key.hours else ()
+            publish_network(store, key, cells, chunks)
+    else:
+        cells = generate_cells(cell_types, priorities, seed=key.seed, progress=progress)
+        chunks = iter_historical_data(cells, key.hours, key.resolution, seed=key.seed) if key.hours else ()
+        publish_network(store, key, cells, chunks)
+    return cells
+
+
+def simulate(cells, seconds, mode="rest", current=0.0, timestep=1.0):
+    """Run every cell in ``mode`` for ``seconds`` of simulated time and write the result back
+
+    The status column is re-evaluated against the default alert limits.
+    Returns the PackSimulator so callers can inspect the full state.
+    """
+    simulator = PackSimulator(cells, timestep=timestep)
+    simulator.set_mode(np.arange(len(simulator)), SIMULATION_MODES[mode], current)
+    simulator.advance(seconds)
+    simulator.write_to(cells)
+    AlertEngine().evaluate_store(cells)
+    return simulator
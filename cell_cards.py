@@ -0,0 +1,85 @@
+import html
+import math
+from string import Formatter
+
+import numpy as np
+
+from cell_store import CATEGORY_COLUMNS, DECIMALS
+
+CELL_CARD_TEMPLATE = """
+<div class="cell-card">
+    <h3><span class="status-indicator {status_class}"></span>{cell_id}</h3>
+    <div class="metric-card">
+        <div style="display: grid; grid-template-columns: 1fr 1fr; gap: 1rem;">
+            <div>
+                <strong>🔋 Voltage:</strong> {voltage}V<br>
+                <strong>⚡ Current:</strong> {current}A<br>
+                <strong>🌡️ Temperature:</strong> {temp}°C<br>
+                <strong>🔥 Capacity:</strong> {capacity}Wh
+            </div>
+            <div>
+                <strong>📊 State of Charge:</strong> {soc}%<br>
+                <strong>❤️ Health:</strong> {health_color} {health}%<br>
+                <strong>🎯 Priority:</strong> {priority}<br>
+                <strong>📝 Type:</strong> {cell_type}
+            </div>
+        </div>
+        <div style="margin-top: 1rem; padding-top: 1rem; border-top: 1px solid rgba(255,255,255,0.2);">
+            <strong>Range:</strong> {min_voltage}V - {max_voltage}V |
+            <strong>Status:</strong> {status}
+        </div>
+    </div>
+</div>
+"""
+
+PAGE_SIZES = [12, 24, 48, 96]
+
+
+class CardTemplate:
+    """A ``str.format`` template parsed once and rendered by concatenation"""
+
+    def __init__(self, template):
+        self._parts = [(literal, field) for literal, field, _, _ in Formatter().parse(template)]
+        self.fields = [field for _, field in self._parts if field]
+
+    def render(self, values):
+        return "".join(literal + (values[field] if field else "") for literal, field in self._parts)
+
+
+CELL_CARD = CardTemplate(CELL_CARD_TEMPLATE)
+
+
+def page_count(total, page_size):
+    return max(1, math.ceil(total / page_size))
+
+
+def page_rows(rows, page, page_size):
+    """Rows shown on a 1-based page"""
+    start = (page - 1) * page_size
+    return rows[start:start + page_size]
+
+
+def _health_colors(health):
+    return np.where(health > 90, "🟢", np.where(health > 75, "🟡", "🔴"))
+
+
+def render_cards(store, rows, template=CELL_CARD):
+    """HTML for the cards of ``rows`` only, gathered column-wise from the store"""
+    rows = np.asarray(rows, dtype=np.intp)
+    if not rows.size:
+        return ""
+    columns = {"cell_id": [key.upper() for key in store.keys_at(rows)]}
+    for name, decimals in DECIMALS.items():
+        columns[name] = [str(round(value, decimals)) for value in store.column(name)[rows].tolist()]
+    for name in CATEGORY_COLUMNS:
+        columns[name] = store.labels(name, rows).tolist()
+    columns["health_color"] = _health_colors(store.column("health")[rows]).tolist()
+    columns["status_class"] = ["status-active" if status == "Active" else "status-warning"
+                               for status in columns["status"]]
+    # Cell ids come from imported logs and ingest frames; nothing reaches the HTML unescaped
+    columns = {name: [html.escape(value) for value in values] for name, values in columns.items()}
+
+    return "".join(
+        template.render({field: columns[field][i] for field in template.fields})
+        for i in range(rows.size)
+    )
@@ -0,0 +1,92 @@
+import numpy as np
+from datetime import datetime
+
+from cell_store import CELL_TYPES, CellStore, category_code, category_codes
+from random_streams import NetworkRandom, cell_blocks
+
+# Nominal, minimum and maximum voltage per chemistry, indexed by type code
+CHEMISTRY_LIMITS = {
+    "LFP": (3.2, 2.8, 3.6),
+    "Li-ion": (3.6, 3.2, 4.0),
+    "NMC": (3.6, 3.2, 4.0),
+    "LTO": (3.6, 3.2, 4.0),
+    "LiPo": (3.6, 3.2, 4.0),
+}
+NOMINAL_VOLTAGE = np.array([CHEMISTRY_LIMITS[t][0] for t in CELL_TYPES], dtype=np.float32)
+MIN_VOLTAGE = np.array([CHEMISTRY_LIMITS[t][1] for t in CELL_TYPES], dtype=np.float32)
+MAX_VOLTAGE = np.array([CHEMISTRY_LIMITS[t][2] for t in CELL_TYPES], dtype=np.float32)
+
+WARNING_TEMP = 35.0
+
+
+def broadcast_codes(column, labels, count):
+    """Codes for one label repeated ``count`` times, or for one label per cell"""
+    if isinstance(labels, str):
+        return np.full(count, category_code(column, labels), dtype=np.int8)
+    if len(labels) != count:
+        raise ValueError(f"Expected {count} {column} labels, got {len(labels)}")
+    return category_codes(column, labels)
+
+
+def draw_cell_columns(type_codes, rng):
+    """Draw the random readings for a block of cells in one pass"""
+    count = len(type_codes)
+    voltage = NOMINAL_VOLTAGE[type_codes]
+    current = rng.uniform(0.5, 2.5, count).round(2)
+    temp = rng.uniform(25, 40, count).round(1)
+    floats = {
+        "voltage": voltage,
+        "current": current,
+        "temp": temp,
+        "capacity": (voltage * current).round(2),
+        "soc": rng.uniform(20, 100, count).round(1),
+        "health": rng.uniform(85, 100, count).round(1),
+        "min_voltage": MIN_VOLTAGE[type_codes],
+        "max_voltage": MAX_VOLTAGE[type_codes],
+    }
+    status = np.where(temp < WARNING_TEMP,
+                      category_code("status", "Active"),
+                      category_code("status", "Warning")).astype(np.int8)
+    return floats, status
+
+
+def cell_keys(type_codes, start=1):
+    """Cell keys in the ``cell_{idx}_{type}`` layout used across the app"""
+    suffixes = [label.lower() for label in CELL_TYPES]
+    return [f"cell_{idx}_{suffixes[code]}"
+            for idx, code in enumerate(type_codes.tolist(), start=start)]
+
+
+def build_cell_block(type_codes, priority_codes, streams, block, start, stop):
+    """Keys and column arrays for cells ``start:stop``, drawn from the block's own stream"""
+    block_types = type_codes[start:stop]
+    floats, status = draw_cell_columns(block_types, streams.cell_stream(block))
+    codes = {"cell_type": block_types, "status": status,
+             "priority": priority_codes[start:stop]}
+    return cell_keys(block_types, start=start + 1), floats, codes
+
+
+def generate_cells(cell_types, priorities="Medium", count=None, seed=None, progress=None):
+    """Generate a cell network as a CellStore, one vectorized block at a time
+
+    ``cell_types`` and ``priorities`` are either one label applied to every
+    cell or a sequence with one label per cell. ``seed`` is an int, a
+    NetworkRandom or None for a fresh random network. ``progress`` is called
+    as ``progress(done, total)`` after each block.
+    """
+    if count is None:
+        if isinstance(cell_types, str):
+            raise ValueError("count is required when cell_types is a single label")
+        count = len(cell_types)
+    streams = NetworkRandom(seed)
+    type_codes = broadcast_codes("cell_type", cell_types, count)
+    priority_codes = broadcast_codes("priority", priorities, count)
+
+    store = CellStore(capacity=count)
+    timestamp = np.datetime64(datetime.now(), "us")
+    for block, start, stop in cell_blocks(count):
+        keys, floats, codes = build_cell_block(type_codes, priority_codes, streams, block, start, stop)
+        store.extend(keys, floats, codes, timestamp)
+        if progress is not None:
+            progress(stop, count)
+    return store
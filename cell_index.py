@@ -0,0 +1,122 @@
+import operator
+
+import numpy as np
+
+from cell_store import CATEGORY_COLUMNS
+
+SORTABLE_COLUMNS = ("temp", "voltage", "health", "soc", "current", "capacity")
+
+PREDICATE_OPS = {
+    ">": operator.gt,
+    ">=": operator.ge,
+    "<": operator.lt,
+    "<=": operator.le,
+    "==": operator.eq,
+    "!=": operator.ne,
+}
+
+
+class CellIndex:
+    """Category bitmaps and sorted orders over a CellStore
+
+    Each index remembers the store column version it was built from and is
+    rebuilt lazily, column by column, the first time it is used after that
+    column changes. Queries combine boolean masks and walk a cached order
+    array, so the cell collection itself is never copied.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self._masks = {}
+        self._orders = {}
+
+    def _fresh(self, cache, key, column, build):
+        version = self.store.column_version(column)
+        cached = cache.get(key)
+        if cached is None or cached[0] != version:
+            cached = (version, build())
+            cache[key] = cached
+        return cached[1]
+
+    def category_mask(self, column, label):
+        """Boolean row bitmap for ``column == label``"""
+        code = CATEGORY_COLUMNS[column].index(label)
+        return self._fresh(self._masks, (column, label), column,
+                           lambda: self.store.column(column) == code)
+
+    def order(self, column, descending=True):
+        """Row order sorted by ``column``; ties keep insertion order"""
+        def build():
+            values = self.store.column(column)
+            return np.argsort(-values if descending else values, kind="stable")
+        return self._fresh(self._orders, (column, descending), column, build)
+
+    def _sorted_values(self, column):
+        return self._fresh(self._orders, (column, "values"), column,
+                           lambda: self.store.column(column)[self.order(column, descending=False)])
+
+    def range_mask(self, column, op, value):
+        """Rows satisfying ``column <op> value``, located by binary search"""
+        if op not in PREDICATE_OPS:
+            raise ValueError(f"Unsupported operator '{op}'")
+        if op in ("==", "!="):
+            return PREDICATE_OPS[op](self.store.column(column), value)
+        ascending = self.order(column, descending=False)
+        values = self._sorted_values(column)
+        value = np.float32(value)
+        if op == ">":
+            selected = ascending[np.searchsorted(values, value, side="right"):]
+        elif op == ">=":
+            selected = ascending[np.searchsorted(values, value, side="left"):]
+        elif op == "<":
+            selected = ascending[:np.searchsorted(values, value, side="left")]
+        else:
+            selected = ascending[:np.searchsorted(values, value, side="right")]
+        mask = np.zeros(len(self.store), dtype=bool)
+        mask[selected] = True
+        return mask
+
+    def query(self, status=None, predicates=(), sort_by=None, descending=True, limit=None, cell_type=None):
+        """Row numbers matching all filters, sorted and truncated to ``limit``
+
+        ``predicates`` is a sequence of ``(column, op, value)`` tuples such as
+        ``("temp", ">", 35)``. Without ``sort_by`` rows come back in table
+        order; ``limit`` truncates whatever order results (see ``top_k`` for
+        the k largest values of one column).
+        """
+        mask = self.filter_mask(status, predicates, cell_type)
+        if sort_by is None:
+            rows = np.arange(len(self.store)) if mask is None else np.flatnonzero(mask)
+        else:
+            rows = self.order(sort_by, descending)
+            if mask is not None:
+                rows = rows[mask[rows]]
+        return rows if limit is None else rows[:limit]
+
+    def filter_mask(self, status=None, predicates=(), cell_type=None):
+        """Combined row mask of the ``query`` filters, or None when nothing filters"""
+        mask = None
+        if status is not None:
+            mask = self.category_mask("status", status)
+        if cell_type is not None:
+            predicate = self.category_mask("cell_type", cell_type)
+            mask = predicate if mask is None else mask & predicate
+        for column, op, value in predicates:
+            predicate = self.range_mask(column, op, value)
+            mask = predicate if mask is None else mask & predicate
+        return mask
+
+    def top_k(self, column, k, largest=True, mask=None):
+        """The ``k`` rows with the largest (or smallest) ``column`` values
+
+        Uses ``argpartition`` so it does not need a full sort of the column.
+        """
+        values = self.store.column(column)
+        rows = np.arange(len(values)) if mask is None else np.flatnonzero(mask)
+        if k >= rows.size:
+            picked = rows
+        else:
+            keyed = -values[rows] if largest else values[rows]
+            picked = rows[np.argpartition(keyed, k)[:k]]
+        keyed = -values[picked] if largest else values[picked]
+        return picked[np.argsort(keyed, kind="stable")]
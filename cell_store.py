@@ -0,0 +1,419 @@
+import numpy as np
+import pandas as pd
+from collections.abc import Mapping
+from datetime import datetime
+
+CELL_TYPES = ["LFP", "Li-ion", "NMC", "LTO", "LiPo"]
+STATUSES = ["Active", "Warning"]
+PRIORITIES = ["High", "Medium", "Low"]
+
+FLOAT_COLUMNS = ("voltage", "current", "temp", "capacity", "soc", "health",
+                 "min_voltage", "max_voltage")
+CATEGORY_COLUMNS = {
+    "cell_type": CELL_TYPES,
+    "status": STATUSES,
+    "priority": PRIORITIES,
+}
+
+# Precision used when handing float32 values back as plain Python floats
+DECIMALS = {
+    "voltage": 2, "current": 2, "temp": 1, "capacity": 2, "soc": 1,
+    "health": 1, "min_voltage": 2, "max_voltage": 2,
+}
+
+_CODE_LOOKUP = {
+    column: {label.lower(): code for code, label in enumerate(labels)}
+    for column, labels in CATEGORY_COLUMNS.items()
+}
+
+DEFAULT_PRIORITY = "Medium"
+
+# Float columns tracked by the running aggregates
+AGGREGATE_COLUMNS = ("voltage", "current", "temp", "capacity", "soc", "health")
+
+
+def category_code(column, label):
+    """Map a categorical label (case-insensitive) to its integer code"""
+    try:
+        return _CODE_LOOKUP[column][str(label).lower()]
+    except KeyError:
+        raise ValueError(f"Unknown {column} '{label}'") from None
+
+
+def category_codes(column, labels):
+    """Map a sequence of labels to an int8 code array"""
+    return np.fromiter((category_code(column, label) for label in labels),
+                       dtype=np.int8, count=len(labels))
+
+
+class RunningAggregates:
+    """Running count, sums and min/max for the Network Overview metrics
+
+    Adding, removing or updating k cells costs O(k) and never rescans the
+    table. Sums are exact; a min or max only goes stale when the current
+    extreme value itself is removed or overwritten, in which case it is
+    recomputed with a single reduction the next time it is read.
+    """
+
+    def __init__(self, store):
+        self._store = store
+        self.reset()
+
+    def reset(self):
+        self.count = 0
+        self.status_counts = np.zeros(len(STATUSES), dtype=np.int64)
+        self.sums = dict.fromkeys(AGGREGATE_COLUMNS, 0.0)
+        self._min = dict.fromkeys(AGGREGATE_COLUMNS, np.inf)
+        self._max = dict.fromkeys(AGGREGATE_COLUMNS, -np.inf)
+        self._stale = set()
+
+    def _bincount(self, status):
+        return np.bincount(np.asarray(status, dtype=np.intp).ravel(), minlength=len(STATUSES))
+
+    def _include(self, name, values):
+        if not values.size:
+            return
+        self.sums[name] += float(values.sum(dtype=np.float64))
+        if name not in self._stale:
+            self._min[name] = min(self._min[name], float(values.min()))
+            self._max[name] = max(self._max[name], float(values.max()))
+
+    def _exclude(self, name, values):
+        if not values.size:
+            return
+        self.sums[name] -= float(values.sum(dtype=np.float64))
+        if values.min() <= self._min[name] or values.max() >= self._max[name]:
+            self._stale.add(name)
+
+    def add(self, values, status):
+        """Account for new cells; ``values`` maps column names to scalars or arrays"""
+        status = np.atleast_1d(status)
+        self.count += status.size
+        self.status_counts += self._bincount(status)
+        for name in AGGREGATE_COLUMNS:
+            self._include(name, np.atleast_1d(values[name]))
+
+    def remove(self, values, status):
+        status = np.atleast_1d(status)
+        self.count -= status.size
+        self.status_counts -= self._bincount(status)
+        if self.count == 0:
+            self.reset()
+            return
+        for name in AGGREGATE_COLUMNS:
+            self._exclude(name, np.atleast_1d(values[name]))
+
+    def update(self, old_values, new_values, old_status=None, new_status=None):
+        """Swap old readings for new ones; only the columns passed are touched"""
+        for name in old_values:
+            if name in self.sums:
+                self._exclude(name, np.atleast_1d(old_values[name]))
+                self._include(name, np.atleast_1d(new_values[name]))
+        if old_status is not None:
+            self.status_counts += self._bincount(new_status) - self._bincount(old_status)
+
+    def minimum(self, name):
+        self._refresh(name)
+        return self._min[name]
+
+    def maximum(self, name):
+        self._refresh(name)
+        return self._max[name]
+
+    def mean(self, name):
+        return self.sums[name] / self.count if self.count else 0.0
+
+    def _refresh(self, name):
+        if name not in self._stale:
+            return
+        values = self._store.column(name)
+        self._min[name] = float(values.min()) if values.size else np.inf
+        self._max[name] = float(values.max()) if values.size else -np.inf
+        self._stale.discard(name)
+
+
+class CellStore(Mapping):
+    """Struct-of-arrays cell table keyed by cell id
+
+    Each field lives in one contiguous array: float32 for the electrical and
+    thermal readings, int8 category codes for type, status and priority.
+    The store behaves like the old ``{cell_key: cell_dict}`` mapping, so
+    ``store[key]``, ``store.items()`` and ``store.values()`` still yield
+    per-cell dicts, but aggregates should go through ``summary()``.
+    """
+
+    def __init__(self, capacity=64):
+        capacity = max(int(capacity), 1)
+        self._size = 0
+        self._keys = []
+        self._index = {}
+        self._floats = {name: np.zeros(capacity, dtype=np.float32) for name in FLOAT_COLUMNS}
+        self._codes = {name: np.zeros(capacity, dtype=np.int8) for name in CATEGORY_COLUMNS}
+        self._timestamps = np.zeros(capacity, dtype="datetime64[us]")
+        self.aggregates = RunningAggregates(self)
+        self.version = 0
+        self._column_versions = {}
+
+    @classmethod
+    def from_cells(cls, cells):
+        """Build a store from a ``{cell_key: cell_dict}`` mapping"""
+        store = cls(capacity=len(cells))
+        for key, cell in cells.items():
+            store.append(key, cell)
+        return store
+
+    # Mapping protocol -------------------------------------------------
+
+    def __len__(self):
+        return self._size
+
+    def __iter__(self):
+        return iter(self._keys)
+
+    def __contains__(self, key):
+        return key in self._index
+
+    def __getitem__(self, key):
+        return self.row_dict(self._index[key])
+
+    # Storage ----------------------------------------------------------
+
+    @property
+    def capacity(self):
+        return len(self._timestamps)
+
+    @property
+    def nbytes(self):
+        """Bytes held by the column arrays (including spare capacity)"""
+        total = self._timestamps.nbytes
+        total += sum(arr.nbytes for arr in self._floats.values())
+        total += sum(arr.nbytes for arr in self._codes.values())
+        return total
+
+    def _reserve(self, needed):
+        if needed <= self.capacity:
+            return
+        new_capacity = max(needed, self.capacity * 2)
+        for columns in (self._floats, self._codes):
+            for name, arr in columns.items():
+                grown = np.zeros(new_capacity, dtype=arr.dtype)
+                grown[:self._size] = arr[:self._size]
+                columns[name] = grown
+        grown = np.zeros(new_capacity, dtype=self._timestamps.dtype)
+        grown[:self._size] = self._timestamps[:self._size]
+        self._timestamps = grown
+
+    def append(self, key, cell):
+        """Append one cell given as a dict in the ``create_cell_data`` layout"""
+        if key in self._index:
+            raise KeyError(f"Cell '{key}' already exists")
+        row = self._size
+        self._reserve(row + 1)
+        for name in FLOAT_COLUMNS:
+            self._floats[name][row] = cell[name]
+        for name in CATEGORY_COLUMNS:
+            default = DEFAULT_PRIORITY if name == "priority" else None
+            self._codes[name][row] = category_code(name, cell.get(name, default))
+        self._timestamps[row] = np.datetime64(cell.get("timestamp") or datetime.now(), "us")
+        self._keys.append(key)
+        self._index[key] = row
+        self._size += 1
+        self.aggregates.add(self._row_values(row), self._codes["status"][row])
+        self._touch()
+        return row
+
+    def extend(self, keys, floats, codes, timestamps=None):
+        """Append a block of cells given as column arrays
+
+        ``floats`` maps every name in FLOAT_COLUMNS to an array and ``codes``
+        maps every name in CATEGORY_COLUMNS to an array of integer codes.
+        Returns the row slice the block was written to.
+        """
+        keys = list(keys)
+        count = len(keys)
+        duplicates = [key for key in keys if key in self._index]
+        if duplicates or len(set(keys)) != count:
+            raise KeyError(f"Duplicate cell keys: {duplicates[:5] or 'within block'}")
+        start = self._size
+        stop = start + count
+        self._reserve(stop)
+        for name in FLOAT_COLUMNS:
+            self._floats[name][start:stop] = floats[name]
+        for name in CATEGORY_COLUMNS:
+            self._codes[name][start:stop] = codes[name]
+        if timestamps is None:
+            timestamps = np.datetime64(datetime.now(), "us")
+        self._timestamps[start:stop] = timestamps
+        self._keys.extend(keys)
+        self._index.update(zip(keys, range(start, stop)))
+        self._size = stop
+        block = slice(start, stop)
+        self.aggregates.add(self._row_values(block), self._codes["status"][block])
+        self._touch()
+        return block
+
+    def remove(self, key):
+        """Remove one cell; the last row is moved into its slot"""
+        row = self._index.pop(key)
+        self.aggregates.remove(self._row_values(row), self._codes["status"][row])
+        last = self._size - 1
+        if row != last:
+            for columns in (self._floats, self._codes):
+                for arr in columns.values():
+                    arr[row] = arr[last]
+            self._timestamps[row] = self._timestamps[last]
+            moved = self._keys[last]
+            self._keys[row] = moved
+            self._index[moved] = row
+        self._keys.pop()
+        self._size = last
+        self._touch()
+
+    def update(self, key, **fields):
+        """Overwrite fields of one cell, e.g. ``store.update(key, temp=36.5)``"""
+        self.update_rows(np.array([self._index[key]]), **fields)
+
+    def update_rows(self, rows, **fields):
+        """Overwrite columns for a block of (unique) rows
+
+        Float fields take scalars or arrays; category fields take a label,
+        a sequence of labels or an array of codes.
+        """
+        rows = np.asarray(rows, dtype=np.intp)
+        old_values, new_values = {}, {}
+        old_status = new_status = None
+        for name, value in fields.items():
+            if name in self._floats:
+                column = self._floats[name]
+                old_values[name] = column[rows].copy()
+                column[rows] = value
+                new_values[name] = column[rows]
+            elif name in self._codes:
+                codes = self._as_codes(name, value, len(rows))
+                if name == "status":
+                    old_status = self._codes[name][rows].copy()
+                    new_status = codes
+                self._codes[name][rows] = codes
+            elif name == "timestamp":
+                self._timestamps[rows] = value
+            else:
+                raise KeyError(name)
+        self.aggregates.update(old_values, new_values, old_status, new_status)
+        self._touch(fields)
+
+    def _touch(self, columns=None):
+        """Bump the store version; ``columns=None`` means every column (rows moved)"""
+        self.version += 1
+        if columns is None:
+            self._column_versions.clear()
+            self._column_versions[None] = self.version
+        else:
+            for name in columns:
+                self._column_versions[name] = self.version
+
+    def column_version(self, name):
+        """Version at which ``name`` (or the row layout) last changed"""
+        return max(self._column_versions.get(name, 0), self._column_versions.get(None, 0))
+
+    @staticmethod
+    def _as_codes(name, value, count):
+        if isinstance(value, str):
+            return np.full(count, category_code(name, value), dtype=np.int8)
+        value = np.asarray(value)
+        if value.dtype.kind in "OUS":
+            return category_codes(name, value)
+        return value.astype(np.int8, copy=False)
+
+    def _row_values(self, rows):
+        return {name: self._floats[name][rows] for name in AGGREGATE_COLUMNS}
+
+    def copy(self):
+        """Independent copy trimmed to the current size"""
+        clone = CellStore(capacity=self._size)
+        clone.extend(
+            self._keys,
+            {name: self.column(name) for name in FLOAT_COLUMNS},
+            {name: self.column(name) for name in CATEGORY_COLUMNS},
+            self.column("timestamp"),
+        )
+        return clone
+
+    def clear(self):
+        version = self.version
+        self.__init__(capacity=self.capacity)
+        self.version = version
+        self._touch()
+
+    # Column access ----------------------------------------------------
+
+    def row_of(self, key):
+        return self._index[key]
+
+    def rows_of(self, keys):
+        """Row per key as an intp array, -1 for keys not in the store"""
+        get = self._index.get
+        return np.fromiter((get(key, -1) for key in keys), dtype=np.intp, count=len(keys))
+
+    def keys_at(self, rows):
+        return [self._keys[row] for row in rows]
+
+    def column(self, name):
+        """Read-only view of a float column or a category code column"""
+        if name in self._floats:
+            view = self._floats[name][:self._size]
+        elif name in self._codes:
+            view = self._codes[name][:self._size]
+        elif name == "timestamp":
+            view = self._timestamps[:self._size]
+        else:
+            raise KeyError(name)
+        view = view.view()
+        view.flags.writeable = False
+        return view
+
+    def labels(self, name, rows=None):
+        """Decoded category labels for ``rows`` (all rows by default)"""
+        codes = self.column(name) if rows is None else self.column(name)[rows]
+        return np.asarray(CATEGORY_COLUMNS[name], dtype=object)[codes]
+
+    def row_dict(self, row):
+        """Per-cell dict view in the ``create_cell_data`` layout"""
+        if not 0 <= row < self._size:
+            raise IndexError(row)
+        cell = {name: round(float(self._floats[name][row]), DECIMALS[name]) for name in FLOAT_COLUMNS}
+        for name, labels in CATEGORY_COLUMNS.items():
+            cell[name] = labels[self._codes[name][row]]
+        cell["timestamp"] = self._timestamps[row].astype(datetime)
+        return cell
+
+    def to_frame(self, rows=None):
+        """DataFrame of the selected rows, indexed by cell key"""
+        if rows is None:
+            rows = np.arange(self._size)
+        rows = np.asarray(rows, dtype=np.intp)
+        data = {name: self._floats[name][rows].round(DECIMALS[name]) for name in FLOAT_COLUMNS}
+        for name, labels in CATEGORY_COLUMNS.items():
+            data[name] = pd.Categorical.from_codes(self._codes[name][rows], categories=labels)
+        data["timestamp"] = self._timestamps[rows]
+        return pd.DataFrame(data, index=pd.Index(self.keys_at(rows), name="cell_id"))
+
+    # Aggregates -------------------------------------------------------
+
+    def summary(self):
+        """Network Overview aggregates read from the running totals (O(1))"""
+        agg = self.aggregates
+        active = int(agg.status_counts[category_code("status", "Active")])
+        summary = {
+            "total": agg.count,
+            "active": active,
+            "warning": agg.count - active,
+            "avg_temp": agg.mean("temp"),
+            "avg_voltage": agg.mean("voltage"),
+            "total_capacity": agg.sums["capacity"],
+            "avg_health": agg.mean("health"),
+        }
+        if agg.count:
+            for name in ("temp", "voltage"):
+                summary[f"min_{name}"] = agg.minimum(name)
+                summary[f"max_{name}"] = agg.maximum(name)
+        return summary
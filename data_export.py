@@ -0,0 +1,259 @@
+import io
+import os
+import time
+import zlib
+
+import numpy as np
+import pandas as pd
+
+from cell_store import CATEGORY_COLUMNS, FLOAT_COLUMNS
+from history import HISTORY_COLUMNS
+
+EXPORT_FORMATS = {"CSV": ".csv", "NDJSON": ".ndjson", "Parquet": ".parquet"}
+COMPRESSIONS = {"none": "", "gzip": ".gz", "zstd": ".zst"}
+CELL_EXPORT_COLUMNS = ("cell_id",) + FLOAT_COLUMNS + tuple(CATEGORY_COLUMNS) + ("timestamp",)
+TASK_EXPORT_COLUMNS = ("task_id", "task_name", "task_type", "priority", "status", "cell", "target_cell",
+                       "time_seconds", "created_at", "started_at", "finished_at", "error")
+# Every task chunk is cast to these dtypes, so chunks share one schema even
+# when a field is missing or empty in some of them (other columns are strings)
+TASK_EXPORT_DTYPES = {"time_seconds": "float64", "created_at": "datetime64[us]",
+                      "started_at": "datetime64[us]", "finished_at": "datetime64[us]"}
+DEFAULT_EXPORT_ROWS = 250_000
+# Fast levels: exports are encode-bound, and higher levels cost more time than they save
+GZIP_LEVEL = 1
+ZSTD_LEVEL = 3
+
+
+# Chunk sources ---------------------------------------------------------
+#
+# Every source yields DataFrames of at most ``chunk_rows`` rows, so the
+# memory held by an export is bounded by one chunk whatever its total size.
+
+def iter_cell_chunks(store, columns=None, chunk_rows=DEFAULT_EXPORT_ROWS):
+    columns = list(columns or CELL_EXPORT_COLUMNS)
+    for first in range(0, len(store), chunk_rows):
+        frame = store.to_frame(np.arange(first, min(first + chunk_rows, len(store))))
+        yield frame.reset_index()[columns]
+
+
+def iter_task_chunks(tasks, columns=None, chunk_rows=DEFAULT_EXPORT_ROWS):
+    columns = list(columns or TASK_EXPORT_COLUMNS)
+    items = list(tasks.items())
+    for first in range(0, len(items), chunk_rows):
+        records = [{"task_id": key, **task} for key, task in items[first:first + chunk_rows]]
+        yield _task_frame(pd.DataFrame.from_records(records).reindex(columns=columns))
+
+
+def _task_frame(frame):
+    data = {}
+    for name in frame.columns:
+        dtype = TASK_EXPORT_DTYPES.get(name)
+        if dtype == "float64":
+            data[name] = pd.to_numeric(frame[name], errors="coerce").astype(dtype)
+        elif dtype is not None:
+            data[name] = pd.to_datetime(frame[name], errors="coerce").astype(dtype)
+        else:
+            data[name] = frame[name].astype(pd.StringDtype())
+    return pd.DataFrame(data, columns=frame.columns)
+
+
+def _time_window(times, start, end):
+    mask = None
+    if start is not None:
+        mask = times >= np.datetime64(start, "us")
+    if end is not None:
+        upper = times <= np.datetime64(end, "us")
+        mask = upper if mask is None else mask & upper
+    return mask
+
+
+def iter_history_chunks(source, columns=None, start=None, end=None, chunk_rows=DEFAULT_EXPORT_ROWS):
+    """History chunks from a TelemetryStore (memory-mapped partitions) or a DataFrame
+
+    Rows outside [start, end] are dropped per chunk; only the selected
+    columns are read from the partitions.
+    """
+    columns = list(columns or HISTORY_COLUMNS)
+    if isinstance(source, pd.DataFrame):
+        for first in range(0, len(source), chunk_rows):
+            chunk = source.iloc[first:first + chunk_rows]
+            mask = _time_window(chunk["timestamp"].to_numpy(), start, end)
+            yield (chunk if mask is None else chunk[mask])[columns]
+        return
+
+    cell_ids = pd.CategoricalDtype(source.history_cell_ids)
+    read = list(dict.fromkeys(["timestamp"] + columns))
+    for part in source.iter_history_partitions(read):
+        rows = len(part["timestamp"])
+        for first in range(0, rows, chunk_rows):
+            window = slice(first, min(first + chunk_rows, rows))
+            mask = _time_window(part["timestamp"][window], start, end)
+            data = {}
+            for name in columns:
+                values = part[name][window]
+                values = np.asarray(values if mask is None else values[mask])
+                if name == "cell_id":
+                    values = pd.Categorical.from_codes(values, dtype=cell_ids)
+                data[name] = values
+            chunk = pd.DataFrame(data, columns=columns)
+            if len(chunk):
+                yield chunk
+
+
+# Encoders --------------------------------------------------------------
+
+class _DrainSink(io.RawIOBase):
+    """Write-only file object whose buffered bytes are taken with ``drain``"""
+
+    def __init__(self):
+        self._parts = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        data = bytes(data)
+        self._parts.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self):
+        data = b"".join(self._parts)
+        self._parts.clear()
+        return data
+
+
+def _format_timestamps(chunk):
+    """Pre-render datetime columns with NumPy, several times faster than to_csv's formatter"""
+    dates = [name for name, dtype in chunk.dtypes.items() if dtype.kind == "M"]
+    if not dates:
+        return chunk
+    def render(values):
+        # Missing times (NaT) become empty fields, like other missing values
+        return np.where(np.isnat(values), "", np.datetime_as_string(values))
+    return chunk.assign(**{name: render(chunk[name].to_numpy()) for name in dates})
+
+
+def _encode_csv(chunks):
+    header = True
+    for chunk in chunks:
+        yield _format_timestamps(chunk).to_csv(index=False, header=header).encode()
+        header = False
+
+
+def _encode_ndjson(chunks):
+    for chunk in chunks:
+        if len(chunk):
+            yield chunk.to_json(orient="records", lines=True, date_format="iso", date_unit="us").encode()
+
+
+def _encode_parquet(chunks):
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ImportError("Parquet export requires pyarrow (pip install pyarrow)") from None
+    sink = _DrainSink()
+    writer = None
+    # One Parquet row group per chunk, drained as soon as it is written
+    for chunk in chunks:
+        table = pa.Table.from_pandas(chunk, preserve_index=False)
+        if writer is None:
+            writer = pq.ParquetWriter(sink, table.schema)
+        else:
+            # The file has one schema: the first chunk's
+            table = table.cast(writer.schema)
+        writer.write_table(table)
+        yield sink.drain()
+    if writer is not None:
+        writer.close()
+        yield sink.drain()
+
+
+_ENCODERS = {"CSV": _encode_csv, "NDJSON": _encode_ndjson, "Parquet": _encode_parquet}
+
+
+def _compressor(compression):
+    if compression in (None, "none"):
+        return None
+    if compression == "gzip":
+        return zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+    if compression == "zstd":
+        try:
+            import zstandard
+        except ImportError:
+            raise ImportError("zstd compression requires zstandard (pip install zstandard)") from None
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compressobj()
+    raise ValueError(f"Unknown compression '{compression}'")
+
+
+class ExportJob:
+    """Stream chunks out as encoded, optionally compressed bytes
+
+    Iterating yields the file contents piece by piece. ``rows``,
+    ``raw_bytes`` (encoded, before compression), ``bytes_written`` and
+    ``elapsed`` are updated as the export runs.
+    """
+
+    def __init__(self, chunks, fmt="CSV", compression="none"):
+        if fmt not in _ENCODERS:
+            raise ValueError(f"Unknown export format '{fmt}'")
+        self.chunks = chunks
+        self.fmt = fmt
+        self.compression = compression or "none"
+        self.rows = 0
+        self.raw_bytes = 0
+        self.bytes_written = 0
+        self.elapsed = 0.0
+
+    @property
+    def extension(self):
+        return EXPORT_FORMATS[self.fmt] + COMPRESSIONS[self.compression]
+
+    @property
+    def throughput(self):
+        """Encoded MB per second"""
+        return self.raw_bytes / 1e6 / self.elapsed if self.elapsed else 0.0
+
+    def _counted(self):
+        for chunk in self.chunks:
+            self.rows += len(chunk)
+            yield chunk
+
+    def __iter__(self):
+        compressor = _compressor(self.compression)
+        started = time.perf_counter()
+        try:
+            for data in _ENCODERS[self.fmt](self._counted()):
+                self.raw_bytes += len(data)
+                if compressor is not None:
+                    data = compressor.compress(data)
+                if data:
+                    self.bytes_written += len(data)
+                    self.elapsed = time.perf_counter() - started
+                    yield data
+            if compressor is not None:
+                data = compressor.flush()
+                self.bytes_written += len(data)
+                yield data
+        finally:
+            self.elapsed = time.perf_counter() - started
+
+    def write_to(self, path, progress=None):
+        """Write the export to ``path`` atomically; ``progress(job)`` runs after each piece"""
+        tmp = f"{path}.tmp"
+        try:
+            with open(tmp, "wb") as fh:
+                for data in self:
+                    fh.write(data)
+                    if progress is not None:
+                        progress(self)
+            os.replace(tmp, path)
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+        return path
@@ -0,0 +1,97 @@
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from analysis import ANALYSIS_METRICS
+from cell_cards import page_rows
+from cell_index import PREDICATE_OPS
+
+DATASHEET_PAGE_SIZES = [50, 100, 250, 500]
+HISTORY_SORTABLE_COLUMNS = ("timestamp",) + ANALYSIS_METRICS
+QUERY_CACHE_ENTRIES = 4
+
+
+def cell_page(store, rows, page, page_size, columns=None):
+    """One page of the cell table as a DataFrame, restricted to ``columns``"""
+    frame = store.to_frame(page_rows(rows, page, page_size))
+    return frame if columns is None else frame[list(columns)]
+
+
+class HistorySheet:
+    """Filtered and sorted row selections over a HistoryAnalyzer, fetched a page at a time
+
+    A query resolves to an array of row numbers into the analyzer's
+    time-ordered columns: the time range is a ``searchsorted`` slice, cell
+    and value filters are boolean masks over that slice, and sorting is one
+    stable argsort of the selected values. Results are cached per query, so
+    paging through them only gathers ``page_size`` rows into a DataFrame.
+    """
+
+    def __init__(self, analyzer):
+        self.analyzer = analyzer
+        self._queries = OrderedDict()
+        self._code_of = {cell: code for code, cell in enumerate(analyzer.cell_ids)}
+
+    def _column(self, name):
+        if name == "timestamp":
+            return self.analyzer.times
+        return self.analyzer.values[name]
+
+    def query(self, start=None, end=None, cells=(), predicates=(), sort_by=None, descending=False):
+        """Row numbers matching the filters, in sort (or time) order
+
+        ``predicates`` are ``(column, op, value)`` tuples using the
+        operators of ``cell_index.PREDICATE_OPS``.
+        """
+        key = (start, end, tuple(cells), tuple(predicates), sort_by, descending)
+        cached = self._queries.get(key)
+        if cached is not None:
+            self._queries.move_to_end(key)
+            return cached
+
+        window = self.analyzer.row_range(start, end)
+        mask = None
+        if cells:
+            codes = [self._code_of[cell] for cell in cells if cell in self._code_of]
+            mask = np.isin(self.analyzer.cell_codes[window], codes)
+        for column, op, value in predicates:
+            if op not in PREDICATE_OPS:
+                raise ValueError(f"Unsupported operator '{op}'")
+            predicate = PREDICATE_OPS[op](self._column(column)[window], value)
+            mask = predicate if mask is None else mask & predicate
+        if mask is None:
+            # Unfiltered windows stay a lazy range instead of an index array
+            rows = range(window.start, window.stop)
+        else:
+            rows = window.start + np.flatnonzero(mask)
+
+        if sort_by is not None and sort_by != "timestamp":
+            if isinstance(rows, range):
+                values = self._column(sort_by)[window]
+                order = window.start + np.argsort(-values if descending else values, kind="stable")
+            else:
+                values = self._column(sort_by)[rows]
+                order = rows[np.argsort(-values if descending else values, kind="stable")]
+            rows = order
+        elif descending:
+            rows = rows[::-1]
+
+        self._queries[key] = rows
+        if len(self._queries) > QUERY_CACHE_ENTRIES:
+            self._queries.popitem(last=False)
+        return rows
+
+    def page(self, rows, page, page_size, columns=None):
+        """Gather one page of ``rows`` into a DataFrame with the projected columns"""
+        picked = np.asarray(page_rows(rows, page, page_size), dtype=np.intp)
+        analyzer = self.analyzer
+        data = {}
+        for name in columns or ("timestamp", "cell_id") + analyzer.metrics:
+            if name == "timestamp":
+                data[name] = analyzer.times[picked].astype("datetime64[us]")
+            elif name == "cell_id":
+                data[name] = analyzer.cell_ids[analyzer.cell_codes[picked]]
+            else:
+                data[name] = analyzer.values[name][picked]
+        return pd.DataFrame(data)
@@ -0,0 +1,186 @@
+import contextvars
+import cProfile
+import functools
+import io
+import pstats
+import sys
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_HISTORY = 50
+PROFILE_TOP_FUNCTIONS = 30
+
+_active = contextvars.ContextVar("active_profiler", default=None)
+
+
+class RerunProfiler:
+    """Named block timings, grouped per script rerun
+
+    ``start_rerun`` / ``end_rerun`` bracket one run of the script and make
+    this profiler the active one for the running thread, so ``timer`` and
+    ``timed`` anywhere in the call stack record into it. Each rerun keeps
+    the total milliseconds per block name; ``stats`` accumulates counts,
+    totals and maxima across reruns. With ``capture`` set, every rerun also
+    runs under cProfile and the top functions are kept as text.
+    """
+
+    def __init__(self, history=DEFAULT_HISTORY):
+        self.reruns = 0
+        self.history = deque(maxlen=history)
+        self.stats = {}
+        self.capture = False
+        self.last_profile = None
+        self._current = None
+        self._started = None
+        self._last_mark = None
+        self._profile = None
+        self._token = None
+
+    def start_rerun(self):
+        if self._current is not None:
+            # The previous run never reached end_rerun (st.rerun or an exception)
+            self.end_rerun(interrupted=True)
+        self.reruns += 1
+        self._current = {}
+        self._started = self._last_mark = time.perf_counter()
+        self._token = _active.set(self)
+        if self.capture:
+            self._profile = cProfile.Profile()
+            try:
+                self._profile.enable()
+            except ValueError as exc:
+                # Only one profiler can run at a time (another session is capturing)
+                self._profile = None
+                self.last_profile = f"cProfile capture unavailable: {exc}"
+
+    def end_rerun(self, interrupted=False):
+        if self._current is None:
+            return
+        if self._profile is not None:
+            self._profile.disable()
+            out = io.StringIO()
+            pstats.Stats(self._profile, stream=out).sort_stats("cumulative").print_stats(PROFILE_TOP_FUNCTIONS)
+            self.last_profile = out.getvalue()
+            self._profile = None
+        # An interrupted run ends at its last timed block, not when the next one starts
+        finished = self._last_mark if interrupted else time.perf_counter()
+        total = (finished - self._started) * 1000
+        self.history.append({
+            "rerun": self.reruns,
+            "finished_at": datetime.now().isoformat(timespec="seconds"),
+            "total_ms": round(total, 3),
+            "interrupted": interrupted,
+            "timings_ms": {name: round(ms, 3) for name, ms in self._current.items()},
+        })
+        self._current = None
+        if self._token is not None:
+            try:
+                _active.reset(self._token)
+            except ValueError:
+                # Token from another context (the rerun ended on a new thread)
+                _active.set(None)
+            self._token = None
+
+    def record(self, name, ms):
+        self._last_mark = time.perf_counter()
+        if self._current is not None:
+            self._current[name] = self._current.get(name, 0.0) + ms
+        entry = self.stats.setdefault(name, {"calls": 0, "total_ms": 0.0, "max_ms": 0.0, "last_ms": 0.0})
+        entry["calls"] += 1
+        entry["total_ms"] += ms
+        entry["max_ms"] = max(entry["max_ms"], ms)
+        entry["last_ms"] = ms
+
+    @property
+    def last_rerun(self):
+        return self.history[-1] if self.history else None
+
+    def table(self):
+        """Per-block statistics as a DataFrame, slowest last rerun first"""
+        last = self.last_rerun["timings_ms"] if self.history else {}
+        rows = [{
+            "block": name,
+            "last rerun (ms)": round(last.get(name, 0.0), 2),
+            "avg (ms)": round(entry["total_ms"] / entry["calls"], 2),
+            "max (ms)": round(entry["max_ms"], 2),
+            "calls": entry["calls"],
+        } for name, entry in self.stats.items()]
+        frame = pd.DataFrame(rows, columns=["block", "last rerun (ms)", "avg (ms)", "max (ms)", "calls"])
+        return frame.sort_values("last rerun (ms)", ascending=False, ignore_index=True)
+
+    def to_json(self, session_sizes=None):
+        return {
+            "reruns": self.reruns,
+            "stats": self.stats,
+            "history": list(self.history),
+            "session_state_bytes": session_sizes or {},
+            "last_profile": self.last_profile,
+        }
+
+
+@contextmanager
+def timer(name):
+    """Time a block into the active profiler (a no-op outside a rerun)"""
+    profiler = _active.get()
+    if profiler is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        profiler.record(name, (time.perf_counter() - start) * 1000)
+
+
+def timed(name=None):
+    """Decorator form of ``timer``, named after the function by default"""
+    def decorate(fn):
+        label = name or fn.__name__
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with timer(label):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def deep_size(value, _seen=None, _depth=0):
+    """Approximate bytes held by a session-state value
+
+    Columnar objects report their buffers (``nbytes`` or pandas' deep
+    ``memory_usage``); containers are walked recursively with shared
+    objects counted once.
+    """
+    _seen = set() if _seen is None else _seen
+    if id(value) in _seen:
+        return 0
+    _seen.add(id(value))
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=True).sum())
+    if isinstance(value, (pd.Series, pd.Index)):
+        return int(value.memory_usage(deep=True))
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    nbytes = getattr(value, "nbytes", None)
+    if isinstance(nbytes, (int, np.integer)):
+        return int(nbytes)
+    size = sys.getsizeof(value)
+    if _depth > 6:
+        return size
+    if isinstance(value, dict):
+        size += sum(deep_size(k, _seen, _depth + 1) + deep_size(v, _seen, _depth + 1) for k, v in value.items())
+    elif isinstance(value, (list, tuple, set, frozenset, deque)):
+        size += sum(deep_size(item, _seen, _depth + 1) for item in value)
+    return size
+
+
+def session_sizes(state):
+    """Bytes per session-state key, largest first"""
+    sizes = {str(key): deep_size(value) for key, value in state.items()}
+    return dict(sorted(sizes.items(), key=lambda item: item[1], reverse=True))
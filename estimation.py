@@ -0,0 +1,199 @@
+import threading
+import time
+
+import numpy as np
+
+from simulation import C1, CAPACITY_AH, R0, R1, ocv_fraction, ocv_slope, soc_from_ocv, temperature_resistance
+
+# Filter tuning: process noise per second for SoC and the RC voltage,
+# voltage measurement noise (V^2) and the initial SoC variance
+SOC_PROCESS_NOISE = 1e-9
+RC_PROCESS_NOISE = 1e-7
+VOLTAGE_NOISE = 1e-4
+INITIAL_SOC_VARIANCE = 0.04
+
+# Capacity fade: a capacity sample is taken whenever the estimated SoC has
+# moved this far since the last one; older samples are down-weighted by
+# CAPACITY_FORGETTING per sample, and the prior capacity counts as
+# CAPACITY_PRIOR_WEIGHT samples of MIN_SOC_SWING. Swings only start once the
+# SoC estimate has settled below MAX_SAMPLE_SOC_STD and the last voltage
+# correction moved it by no more than MAX_SAMPLE_SOC_CORRECTION.
+MIN_SOC_SWING = 0.1
+MAX_SAMPLE_SOC_STD = 0.02
+MAX_SAMPLE_SOC_CORRECTION = 1e-3
+CAPACITY_FORGETTING = 0.95
+CAPACITY_PRIOR_WEIGHT = 2.0
+MAX_HEALTH = 110.0
+
+
+class StateEstimator:
+    """Batched SoC / SoH estimation for every cell
+
+    SoC is tracked with an extended Kalman filter per cell on the same
+    R0 + RC model as PackSimulator: the state is (SoC, RC voltage), the
+    prediction is coulomb counting, and the terminal voltage corrects it.
+    All cells advance together; the 2x2 covariance of every cell is kept
+    as three arrays (p00, p01, p11), so predict and update are
+    closed-form element-wise matrix products with no per-cell loop.
+
+    SoH comes from capacity fade. Each time a cell's estimated SoC has
+    swung by MIN_SOC_SWING, the charge counted over that swing is one
+    sample of its capacity. A recursive least-squares fit with forgetting
+    turns those samples into a capacity, and the capacity over the rated
+    capacity is the SoH. ``update`` costs O(cells) per tick, so the
+    estimate can follow a live stream; ``run`` feeds a block of samples.
+    Current is positive when charging.
+    """
+
+    def __init__(self, type_codes, min_voltage, max_voltage, voltage=None, soc=None, health=None):
+        self.lock = threading.RLock()
+        self.bind(type_codes, min_voltage, max_voltage, voltage=voltage, soc=soc, health=health)
+
+    @classmethod
+    def from_store(cls, store, health=None):
+        """Estimator over a CellStore, starting from its voltages at rest and ``health`` (new cells by default)"""
+        return cls(store.column("cell_type"), store.column("min_voltage"), store.column("max_voltage"),
+                   voltage=store.column("voltage"), health=health)
+
+    def __len__(self):
+        return len(self.type_codes)
+
+    def bind(self, type_codes, min_voltage, max_voltage, voltage=None, soc=None, health=None):
+        """(Re)start estimation for a cell layout"""
+        with self.lock:
+            self.type_codes = np.asarray(type_codes, dtype=np.intp)
+            count = len(self.type_codes)
+            self.v_min = np.asarray(min_voltage, dtype=np.float64)
+            self.v_span = np.asarray(max_voltage, dtype=np.float64) - self.v_min
+            self.rated_ah = CAPACITY_AH[self.type_codes]
+            self.r0 = R0[self.type_codes]
+            self.r1 = R1[self.type_codes]
+            self.tau = R1[self.type_codes] * C1[self.type_codes]
+
+            if soc is not None:
+                self.soc = np.clip(np.asarray(soc, dtype=np.float64), 0.0, 1.0)
+            elif voltage is not None:
+                # Assume the cells are at rest: terminal voltage = OCV
+                fraction = np.clip((np.asarray(voltage, dtype=np.float64) - self.v_min) / self.v_span, 0.0, 1.0)
+                self.soc = soc_from_ocv(self.type_codes, fraction)
+            else:
+                self.soc = np.full(count, 0.5)
+            self.v_rc = np.zeros(count)
+            self.p00 = np.full(count, INITIAL_SOC_VARIANCE)
+            self.p01 = np.zeros(count)
+            self.p11 = np.full(count, 1e-4)
+
+            health = np.full(count, 100.0) if health is None else np.asarray(health, dtype=np.float64)
+            prior = self.rated_ah * health / 100.0
+            self.capacity_ah = prior.copy()
+            self._sxx = np.full(count, CAPACITY_PRIOR_WEIGHT * MIN_SOC_SWING ** 2)
+            self._sxy = self._sxx * prior
+            self._window_ah = np.zeros(count)
+            self._window_soc = self.soc.copy()
+            self.innovation = np.zeros(count)
+            self.samples = 0
+            self.last_time = None
+            self.last_elapsed = 0.0
+
+    @property
+    def health(self):
+        """Estimated SoH in percent"""
+        return np.clip(self.capacity_ah / self.rated_ah * 100.0, 0.0, MAX_HEALTH)
+
+    @property
+    def soc_std(self):
+        """One-sigma SoC uncertainty (0..1)"""
+        return np.sqrt(np.maximum(self.p00, 0.0))
+
+    def ocv(self, soc=None):
+        soc = self.soc if soc is None else soc
+        return self.v_min + self.v_span * ocv_fraction(self.type_codes, soc)
+
+    # Estimation ---------------------------------------------------------
+
+    def update(self, current, voltage, temp=None, dt=None, now=None):
+        """Advance every cell by one sample
+
+        ``dt`` is the seconds since the previous sample; without it the
+        gap between successive ``now`` values (monotonic time by default)
+        is used. The first sample only corrects.
+        """
+        started = time.perf_counter()
+        with self.lock:
+            if dt is None:
+                now = time.monotonic() if now is None else now
+                dt = 0.0 if self.last_time is None else max(now - self.last_time, 0.0)
+                self.last_time = now
+            current = np.asarray(current, dtype=np.float64)
+            voltage = np.asarray(voltage, dtype=np.float64)
+            r0 = self.r0 if temp is None else temperature_resistance(self.r0, np.asarray(temp, dtype=np.float64))
+
+            # Predict: coulomb counting and RC relaxation, P = F P F' + Q with F = diag(1, a)
+            charge_ah = current * (dt / 3600.0)
+            if dt > 0:
+                decay = np.exp(-dt / self.tau)
+                soc = np.clip(self.soc + charge_ah / self.capacity_ah, 0.0, 1.0)
+                v_rc = self.v_rc * decay + self.r1 * (1.0 - decay) * current
+                p00 = self.p00 + SOC_PROCESS_NOISE * dt
+                p01 = self.p01 * decay
+                p11 = self.p11 * decay * decay + RC_PROCESS_NOISE * dt
+            else:
+                soc, v_rc, p00, p01, p11 = self.soc, self.v_rc, self.p00, self.p01, self.p11
+
+            # Correct with the terminal voltage, H = [dOCV/dSoC, 1]
+            slope = self.v_span * ocv_slope(self.type_codes, soc)
+            innovation = voltage - (self.ocv(soc) + v_rc + current * r0)
+            h_p0 = slope * p00 + p01
+            h_p1 = slope * p01 + p11
+            gain0 = h_p0 / (slope * h_p0 + h_p1 + VOLTAGE_NOISE)
+            gain1 = h_p1 / (slope * h_p0 + h_p1 + VOLTAGE_NOISE)
+            self.soc = np.clip(soc + gain0 * innovation, 0.0, 1.0)
+            self.v_rc = v_rc + gain1 * innovation
+            self.p00 = p00 - gain0 * h_p0
+            self.p01 = p01 - gain0 * h_p1
+            self.p11 = p11 - gain1 * h_p1
+            self.innovation = innovation
+
+            self._update_capacity(charge_ah, np.abs(gain0 * innovation))
+            self.samples += 1
+            self.last_elapsed = time.perf_counter() - started
+
+    def _update_capacity(self, charge_ah, correction):
+        self._window_ah += charge_ah
+        # Restart the window while the SoC estimate is still converging: a
+        # swing that includes the voltage corrections is not charge-driven
+        unsettled = (self.p00 > MAX_SAMPLE_SOC_STD ** 2) | (correction > MAX_SAMPLE_SOC_CORRECTION)
+        if unsettled.any():
+            self._window_ah[unsettled] = 0.0
+            self._window_soc[unsettled] = self.soc[unsettled]
+        swing = self.soc - self._window_soc
+        ready = np.abs(swing) >= MIN_SOC_SWING
+        if not ready.any():
+            return
+        rows = np.flatnonzero(ready)
+        x, y = swing[rows], self._window_ah[rows]
+        self._sxx[rows] = CAPACITY_FORGETTING * self._sxx[rows] + x * x
+        self._sxy[rows] = CAPACITY_FORGETTING * self._sxy[rows] + x * y
+        self.capacity_ah[rows] = np.clip(self._sxy[rows] / self._sxx[rows], 0.05 * self.rated_ah[rows],
+                                         MAX_HEALTH / 100.0 * self.rated_ah[rows])
+        self._window_ah[rows] = 0.0
+        self._window_soc[rows] = self.soc[rows]
+
+    def run(self, times, current, voltage, temp=None):
+        """Feed ``(steps, cells)`` sample blocks in time order; returns the SoC after every step
+
+        ``times`` holds one timestamp per step, in seconds (the same clock
+        as earlier calls) or as datetime64.
+        """
+        times = np.asarray(times)
+        if np.issubdtype(times.dtype, np.datetime64):
+            times = times.astype("datetime64[us]").astype(np.int64) / 1e6
+        estimates = np.empty((len(times), len(self)), dtype=np.float32)
+        previous = self.last_time
+        for step in range(len(times)):
+            dt = 0.0 if previous is None else float(times[step] - previous)
+            self.update(current[step], voltage[step], None if temp is None else temp[step], dt=dt)
+            previous = times[step]
+            estimates[step] = self.soc
+        self.last_time = previous
+        return estimates
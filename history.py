@@ -0,0 +1,159 @@
+import numpy as np
+import pandas as pd
+from datetime import datetime
+
+from cell_store import CellStore
+from random_streams import NetworkRandom, cell_blocks
+
+RESOLUTIONS = {"hour": 3600, "minute": 60, "second": 1}
+HISTORY_COLUMNS = ("timestamp", "cell_id", "voltage", "temperature", "current",
+                   "capacity", "soc", "health")
+DEFAULT_CHUNK_ROWS = 1_000_000
+
+# Stream id and uniform range of the jitter applied to each reading
+JITTER = {
+    "voltage": (0, -0.1, 0.1),
+    "temperature": (1, -2, 2),
+    "current": (2, -0.2, 0.2),
+    "soc": (3, -5, 5),
+}
+
+
+def _as_store(cells):
+    return cells if isinstance(cells, CellStore) else CellStore.from_cells(cells)
+
+
+def history_steps(hours, resolution):
+    """Number of samples per cell for a horizon at the given resolution"""
+    try:
+        step_seconds = RESOLUTIONS[resolution]
+    except KeyError:
+        raise ValueError(f"Unknown resolution '{resolution}'") from None
+    return int(hours * 3600 // step_seconds), step_seconds
+
+
+def empty_history(cell_ids=()):
+    """Typed, zero-row history frame"""
+    return pd.DataFrame({
+        "timestamp": np.array([], dtype="datetime64[us]"),
+        "cell_id": pd.Categorical([], categories=list(cell_ids)),
+        **{name: np.array([], dtype=np.float32) for name in HISTORY_COLUMNS[2:]},
+    })
+
+
+def jitter_generators(streams, blocks, skip_steps=0):
+    """One generator per (reading, cell block); advanced chunk by chunk
+
+    ``skip_steps`` fast-forwards every stream past that many samples (one
+    PCG64 draw per value), so a worker can start mid-horizon and still
+    produce the same numbers as a serial build.
+    """
+    generators = {}
+    for name, (stream_id, _, _) in JITTER.items():
+        generators[name] = []
+        for block, start, stop in blocks:
+            generator = streams.history_stream(stream_id, block)
+            if skip_steps:
+                generator.bit_generator.advance(skip_steps * (stop - start))
+            generators[name].append(generator)
+    return generators
+
+
+def draw_jitter(generators, blocks, steps):
+    """Next ``steps`` samples of jitter for each reading, shaped (steps, cells)
+
+    Each block draws from its own stream in time order, so the values do not
+    depend on how the horizon is chunked or how blocks are spread over workers.
+    """
+    offset = blocks[0][1]
+    count = blocks[-1][2] - offset
+    jitter = {}
+    for name, (_, low, high) in JITTER.items():
+        values = np.empty((steps, count), dtype=np.float32)
+        for generator, (_, start, stop) in zip(generators[name], blocks):
+            values[:, start - offset:stop - offset] = generator.uniform(low, high, (steps, stop - start))
+        jitter[name] = values
+    return jitter
+
+
+# Cell columns the jittered readings are derived from
+JITTER_BASE_COLUMNS = ("voltage", "min_voltage", "max_voltage", "temp", "current", "soc")
+
+
+def apply_jitter(base, jitter):
+    """Jittered readings for cells with ``base`` columns (slices of a CellStore)"""
+    voltage = base["voltage"] + jitter["voltage"]
+    np.clip(voltage, base["min_voltage"], base["max_voltage"], out=voltage)
+    return {
+        "voltage": voltage,
+        "temperature": np.maximum(20, base["temp"] + jitter["temperature"]),
+        "current": np.maximum(0, base["current"] + jitter["current"]),
+        "soc": np.clip(base["soc"] + jitter["soc"], 0, 100),
+    }
+
+
+def history_frame(store, step_times, readings):
+    """Assemble a time-major history frame from (steps, cells) reading arrays"""
+    steps = len(step_times)
+    count = len(store)
+    cell_codes = np.tile(np.arange(count, dtype=np.int32), steps)
+    return pd.DataFrame({
+        "timestamp": np.repeat(step_times, count),
+        "cell_id": pd.Categorical.from_codes(cell_codes, dtype=pd.CategoricalDtype(list(store))),
+        "voltage": readings["voltage"].ravel(),
+        "temperature": readings["temperature"].ravel(),
+        "current": readings["current"].ravel(),
+        "capacity": np.tile(store.column("capacity"), steps),
+        "soc": readings["soc"].ravel(),
+        "health": np.tile(store.column("health"), steps),
+    })
+
+
+def _history_block(store, step_times, jitter):
+    """Rows for a block of timestamps x all cells, time-major like the old list"""
+    base = {name: store.column(name) for name in JITTER_BASE_COLUMNS}
+    return history_frame(store, step_times, apply_jitter(base, jitter))
+
+
+def history_times(hours, resolution, end=None):
+    """Base timestamp and step in seconds for a horizon ending at ``end`` (now)"""
+    steps, step_seconds = history_steps(hours, resolution)
+    end = np.datetime64(end or datetime.now(), "us")
+    return end - np.timedelta64(int(hours * 3600), "s"), steps, step_seconds
+
+
+def step_timestamps(base_time, step_seconds, first, stop):
+    offsets = np.arange(first, stop, dtype=np.int64)
+    return base_time + (offsets * step_seconds).astype("timedelta64[s]")
+
+
+def iter_historical_data(cells_data, hours=24, resolution="hour",
+                         chunk_rows=DEFAULT_CHUNK_ROWS, seed=None, end=None):
+    """Yield the history as typed DataFrame chunks of about ``chunk_rows`` rows
+
+    Each chunk holds whole timestamps, so a consumer never sees a partial
+    sample for a cell. Only one chunk is alive at a time. The values depend
+    only on the cells and ``seed``, not on ``chunk_rows``.
+    """
+    store = _as_store(cells_data)
+    base_time, steps, step_seconds = history_times(hours, resolution, end)
+    if not len(store) or not steps:
+        return
+    blocks = cell_blocks(len(store))
+    generators = jitter_generators(NetworkRandom(seed), blocks)
+    steps_per_chunk = max(1, chunk_rows // len(store))
+    for first in range(0, steps, steps_per_chunk):
+        stop = min(first + steps_per_chunk, steps)
+        jitter = draw_jitter(generators, blocks, stop - first)
+        yield _history_block(store, step_timestamps(base_time, step_seconds, first, stop), jitter)
+
+
+def generate_historical_data(cells_data, hours=24, resolution="hour", seed=None, end=None):
+    """Generate historical data for trend analysis as one columnar DataFrame"""
+    store = _as_store(cells_data)
+    steps, _ = history_steps(hours, resolution)
+    chunks = list(iter_historical_data(store, hours, resolution,
+                                       chunk_rows=max(steps * len(store), 1), seed=seed, end=end))
+    if not chunks:
+        return empty_history(store)
+    return chunks[0]
@@ -0,0 +1,475 @@
+import asyncio
+import json
+import struct
+import threading
+import time
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from cell_store import CELL_TYPES, CellStore
+from log_import import REQUIRED_FIELDS, VALID_RANGES, LogImporter, coerce_chunk, history_chunk
+from simulation import CC_CHARGE, CC_DISCHARGE, PackSimulator
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 9750
+
+# Every frame is a header (kind, payload length, sender wall time in
+# seconds) followed by the payload
+FRAME_BINARY, FRAME_NDJSON = 1, 2
+FRAME_KINDS = {"binary": FRAME_BINARY, "ndjson": FRAME_NDJSON}
+HEADER = struct.Struct("<BId")
+MAX_FRAME_BYTES = 64 * 1024 * 1024
+
+# Binary payload: a uint32 length, that many bytes of newline-joined UTF-8
+# cell keys, then fixed-width records that refer to the keys by position
+_KEY_TABLE = struct.Struct("<I")
+RECORD_DTYPE = np.dtype([
+    ("cell", "<u4"), ("cell_type", "u1"), ("timestamp", "<i8"),
+    ("voltage", "<f4"), ("current", "<f4"), ("temp", "<f4"), ("soc", "<f4"), ("health", "<f4"),
+])
+READING_FIELDS = ("voltage", "current", "temp", "soc", "health")
+INGEST_FIELDS = ("timestamp", "cell_id", "cell_type") + READING_FIELDS
+
+# Frames buffered between the sockets and the decoder; connections stop
+# being read (and TCP pushes back on the sender) while the queue is full
+DEFAULT_QUEUE_FRAMES = 16
+DEFAULT_BATCH_ROWS = 250_000
+# History rows buffered before they are written out as one partition
+HISTORY_FLUSH_ROWS = 1_000_000
+SNAPSHOT_INTERVAL = 5.0
+LATENCY_SAMPLES = 10_000
+
+_TYPE_LABELS = np.asarray(CELL_TYPES, dtype=object)
+
+
+# Frames ----------------------------------------------------------------
+
+def encode_frame(kind, payload, sent_at=None):
+    return HEADER.pack(kind, len(payload), time.time() if sent_at is None else sent_at) + payload
+
+
+def encode_binary(keys, cells, type_codes, timestamps, readings):
+    """Binary payload; ``cells`` indexes ``keys`` and ``timestamps`` are datetime64"""
+    table = "\n".join(keys).encode()
+    records = np.empty(len(cells), dtype=RECORD_DTYPE)
+    records["cell"] = cells
+    records["cell_type"] = type_codes
+    records["timestamp"] = np.asarray(timestamps, dtype="datetime64[us]").astype(np.int64)
+    for name in READING_FIELDS:
+        records[name] = readings[name]
+    return _KEY_TABLE.pack(len(table)) + table + records.tobytes()
+
+
+def _table_bytes(payload):
+    """Size of a binary payload's key table, checked against the payload length"""
+    if len(payload) < _KEY_TABLE.size:
+        raise ValueError(f"Binary payload of {len(payload)} bytes is shorter than its key table header")
+    (table_bytes,) = _KEY_TABLE.unpack_from(payload)
+    if _KEY_TABLE.size + table_bytes > len(payload):
+        raise ValueError("Binary key table runs past the end of the payload")
+    return table_bytes
+
+
+def decode_binary(payload):
+    """Coerced columns (``coerce_chunk`` layout) and rejection counts for a binary payload
+
+    The payload is already typed, so only the readings are range-checked;
+    cell keys are validated once per key-table entry, not once per row.
+    """
+    table_bytes = _table_bytes(payload)
+    start = _KEY_TABLE.size
+    keys = np.array(bytes(payload[start:start + table_bytes]).decode().split("\n"), dtype=object)
+    records = np.frombuffer(payload, dtype=RECORD_DTYPE, offset=start + table_bytes)
+    if len(records) and (records["cell"].max() >= len(keys) or records["cell_type"].max() >= len(CELL_TYPES)):
+        raise ValueError("Record refers past the key or chemistry table")
+
+    rejected = Counter()
+    valid = (keys != "")[records["cell"]]
+    if not valid.all():
+        rejected["missing cell_id"] += int((~valid).sum())
+    readings = {}
+    for name in READING_FIELDS:
+        column = records[name]
+        low, high = VALID_RANGES[name]
+        with np.errstate(invalid="ignore"):
+            bad = valid & ~((column >= low) & (column <= high))
+        if bad.any():
+            rejected[f"{name} out of range"] += int(bad.sum())
+            valid &= ~bad
+        readings[name] = column
+    columns = {
+        "cell_id": keys[records["cell"][valid]],
+        "timestamp": records["timestamp"][valid].astype("datetime64[us]"),
+        "cell_type": records["cell_type"][valid].astype(np.int8),
+    }
+    for name in READING_FIELDS:
+        columns[name] = readings[name][valid]
+    columns["capacity"] = columns["voltage"] * np.abs(columns["current"])
+    return columns, rejected
+
+
+def encode_ndjson(frame):
+    """NDJSON payload, one object per row, timestamps as Unix seconds"""
+    frame = frame.copy()
+    frame["timestamp"] = frame["timestamp"].astype("datetime64[us]").astype(np.int64) / 1e6
+    return frame.to_json(orient="records", lines=True).encode()
+
+
+def decode_ndjson(payload):
+    """Raw DataFrame for an NDJSON payload, decoded as one JSON array"""
+    lines = [line for line in bytes(payload).splitlines() if line.strip()]
+    frame = pd.DataFrame.from_records(json.loads(b"[" + b",".join(lines) + b"]"))
+    if "timestamp" in frame:
+        times = frame["timestamp"]
+        if pd.api.types.is_numeric_dtype(times):
+            times = pd.to_datetime(times, unit="s", errors="coerce")
+        else:
+            times = pd.to_datetime(times, errors="coerce", format="mixed")
+        frame["timestamp"] = np.asarray(times, dtype="datetime64[us]")
+    return frame
+
+
+DECODERS = {FRAME_BINARY: decode_binary, FRAME_NDJSON: decode_ndjson}
+# Mapping for ``coerce_chunk`` and ``apply_latest``: every field is present
+INGEST_MAPPING = {field: field for field in INGEST_FIELDS}
+
+
+def frame_rows(kind, payload):
+    """Row count of a frame, read without decoding it; raises ValueError for a truncated binary frame"""
+    if kind == FRAME_BINARY:
+        table_bytes = _table_bytes(payload)
+        return (len(payload) - _KEY_TABLE.size - table_bytes) // RECORD_DTYPE.itemsize
+    return payload.count(b"\n") + (not payload.endswith(b"\n") and len(payload) > 0)
+
+
+# Server ----------------------------------------------------------------
+
+class IngestStats:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.first_frame = None
+        self.last_applied = None
+        self.frames = 0
+        self.bytes = 0
+        self.batches = 0
+        self.rows_received = 0
+        self.rows_applied = 0
+        self.cells_added = 0
+        self.frames_rejected = 0
+        self.rejected = Counter()
+        self.stalls = 0
+        self.queue_peak = 0
+        self.errors = 0
+        self.last_error = None
+        self.latencies = deque(maxlen=LATENCY_SAMPLES)
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    @property
+    def rows_per_second(self):
+        """Sustained rate: applied rows over the span from the first frame to the last apply"""
+        if self.first_frame is None or self.last_applied is None or self.last_applied <= self.first_frame:
+            return 0.0
+        return self.rows_applied / (self.last_applied - self.first_frame)
+
+    def latency_ms(self, percentiles=(50, 95, 99)):
+        """End-to-end latency percentiles (send to applied) over recent frames"""
+        if not self.latencies:
+            return {p: 0.0 for p in percentiles}
+        values = np.percentile(np.fromiter(self.latencies, dtype=np.float64), percentiles) * 1000
+        return dict(zip(percentiles, values.round(2).tolist()))
+
+    def as_dict(self):
+        return {
+            "elapsed": round(self.elapsed, 3), "frames": self.frames, "bytes": self.bytes,
+            "batches": self.batches, "rows_received": self.rows_received, "rows_applied": self.rows_applied,
+            "rows_per_second": round(self.rows_per_second, 1), "cells_added": self.cells_added,
+            "frames_rejected": self.frames_rejected, "rejected": dict(self.rejected),
+            "stalls": self.stalls, "queue_peak": self.queue_peak, "errors": self.errors,
+            "latency_ms": self.latency_ms(),
+        }
+
+
+class IngestServer:
+    """Local asyncio TCP endpoint that streams telemetry frames into a CellStore
+
+    Connection handlers only frame the byte stream and queue raw payloads.
+    A single consumer drains the queue in batches of up to ``batch_rows``
+    rows, then decodes, validates (with the log importer's ``coerce_chunk``)
+    and applies each batch on a worker thread, so the event loop keeps
+    serving sockets meanwhile. The queue is bounded: once it is full the
+    handlers stop reading, the kernel buffers fill, and senders block in
+    ``drain()``. History is buffered and written to the TelemetryStore in
+    large partitions, together with a periodic snapshot of the cells.
+    Hold ``lock`` to read ``cells`` while the server runs.
+    """
+
+    def __init__(self, cells=None, telemetry_store=None, host=DEFAULT_HOST, port=DEFAULT_PORT,
+                 queue_frames=DEFAULT_QUEUE_FRAMES, batch_rows=DEFAULT_BATCH_ROWS, default_type="LFP",
+                 snapshot_interval=SNAPSHOT_INTERVAL):
+        self.cells = cells if cells is not None else CellStore()
+        self.telemetry_store = telemetry_store
+        self.host = host
+        self.port = port
+        self.queue_frames = queue_frames
+        self.batch_rows = batch_rows
+        self.snapshot_interval = snapshot_interval
+        self.lock = threading.Lock()
+        self.stats = IngestStats()
+        self._importer = LogImporter(self.cells, default_type=default_type)
+        self._history = []
+        self._history_rows = 0
+        self._dirty = False
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ingest")
+        # Disk writes run on their own thread so they never stall decoding
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ingest-writer")
+        self._pending_write = None
+        self._server = None
+        self._tasks = []
+
+    async def start(self):
+        self._queue = asyncio.Queue(self.queue_frames)
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        # Port 0 asks the OS for a free port
+        self.port = self._server.sockets[0].getsockname()[1]
+        self.stats = IngestStats()
+        self._tasks = [asyncio.create_task(self._consume())]
+        if self.telemetry_store is not None and self.snapshot_interval:
+            self._tasks.append(asyncio.create_task(self._snapshots()))
+        return self
+
+    async def close(self):
+        """Stop accepting, apply everything already queued, then flush to the store"""
+        self._server.close()
+        await self._server.wait_closed()
+        await self._queue.join()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        await asyncio.get_running_loop().run_in_executor(self._writer, self.flush)
+        self._executor.shutdown()
+        self._writer.shutdown()
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def _handle(self, reader, writer):
+        try:
+            while True:
+                kind, length, sent_at = HEADER.unpack(await reader.readexactly(HEADER.size))
+                if kind not in DECODERS or length > MAX_FRAME_BYTES:
+                    # The stream cannot be re-synchronised after a bad header
+                    self.stats.frames_rejected += 1
+                    break
+                payload = await reader.readexactly(length)
+                if self.stats.first_frame is None:
+                    self.stats.first_frame = time.perf_counter()
+                try:
+                    rows = frame_rows(kind, payload)
+                except ValueError:
+                    # The length prefix was honoured, so the stream is still in sync
+                    self.stats.frames_rejected += 1
+                    continue
+                self.stats.frames += 1
+                self.stats.bytes += HEADER.size + length
+                self.stats.rows_received += rows
+                if self._queue.full():
+                    self.stats.stalls += 1
+                await self._queue.put((kind, payload, sent_at, rows))
+                self.stats.queue_peak = max(self.stats.queue_peak, self._queue.qsize())
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def _consume(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            rows = batch[0][3]
+            while rows < self.batch_rows and not self._queue.empty():
+                item = self._queue.get_nowait()
+                batch.append(item)
+                rows += item[3]
+            try:
+                await loop.run_in_executor(self._executor, self._apply, batch)
+            except Exception as exc:
+                self.stats.errors += 1
+                self.stats.last_error = repr(exc)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def _snapshots(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(self.snapshot_interval)
+            await loop.run_in_executor(self._writer, self.flush)
+
+    # Worker thread -----------------------------------------------------
+
+    def _decode(self, batch):
+        """Coerced columns for every frame in a batch, merged"""
+        parts, raw_frames = [], []
+        for kind, payload, _, _ in batch:
+            try:
+                if kind == FRAME_BINARY:
+                    columns, rejected = decode_binary(payload)
+                    parts.append(columns)
+                    self.stats.rejected.update(rejected)
+                else:
+                    raw_frames.append(decode_ndjson(payload))
+            except (ValueError, IndexError, KeyError, UnicodeDecodeError, struct.error):
+                self.stats.frames_rejected += 1
+        if raw_frames:
+            raw = pd.concat(raw_frames, ignore_index=True) if len(raw_frames) > 1 else raw_frames[0]
+            mapping = {field: field for field in INGEST_FIELDS if field in raw.columns}
+            missing = [field for field in REQUIRED_FIELDS if field not in mapping]
+            if missing:
+                self.stats.rejected[f"missing {', '.join(missing)}"] += len(raw)
+            else:
+                columns, rejected = coerce_chunk(raw, mapping, self._importer.default_type)
+                self.stats.rejected.update(rejected)
+                parts.append(columns)
+        if len(parts) == 1:
+            return parts[0]
+        return {name: np.concatenate([part[name] for part in parts]) for name in parts[0]} if parts else None
+
+    def _apply(self, batch):
+        columns = self._decode(batch)
+        accepted = len(columns["cell_id"]) if columns is not None else 0
+        chunks = None
+        if accepted:
+            with self.lock:
+                self.stats.cells_added += self._importer.apply_latest(columns, INGEST_MAPPING)
+                self._dirty = True
+                if self.telemetry_store is not None:
+                    self._history.append(columns)
+                    self._history_rows += accepted
+                    if self._history_rows >= HISTORY_FLUSH_ROWS:
+                        chunks = self._take_history()
+            if chunks:
+                # At most one partition write in flight; a slow disk backs up into the queue
+                if self._pending_write is not None:
+                    self._pending_write.result()
+                self._pending_write = self._writer.submit(self._write_history, chunks)
+            self.stats.rows_applied += accepted
+        applied_at = time.time()
+        self.stats.last_applied = time.perf_counter()
+        self.stats.latencies.extend(applied_at - sent_at for _, _, sent_at, _ in batch)
+        self.stats.batches += 1
+
+    def _take_history(self):
+        """Detach the buffered history chunks (call with ``lock`` held)"""
+        chunks, self._history, self._history_rows = self._history, [], 0
+        return chunks
+
+    def _write_history(self, chunks):
+        if chunks:
+            merged = {name: np.concatenate([chunk[name] for chunk in chunks]) for name in chunks[0]}
+            self.telemetry_store.append_history(history_chunk(merged))
+
+    def flush(self):
+        """Write buffered history and a snapshot of the cells to the TelemetryStore"""
+        if self.telemetry_store is None:
+            return
+        with self.lock:
+            chunks = self._take_history()
+            snapshot = self.cells.copy() if self._dirty else None
+            self._dirty = False
+        self._write_history(chunks)
+        if snapshot is not None:
+            self.telemetry_store.save_cells(snapshot)
+            # The table no longer matches the configuration it was generated from
+            self.telemetry_store.set_network_key(None)
+
+
+# Load generator --------------------------------------------------------
+
+class LoadGenerator:
+    """Stand-in for a rack: streams simulated readings for a cell network
+
+    Readings come from a PackSimulator over ``cells``, so voltages,
+    temperatures and SoC follow each chemistry's parameters. A random
+    third of the cells charge and a third discharge. Frames of
+    ``batch_rows`` cells are sent round-robin; after every full pass over
+    the network the simulator advances one ``timestep``. ``rate`` caps
+    rows per second; without it the generator sends as fast as the
+    server's backpressure allows.
+    """
+
+    def __init__(self, cells, fmt="binary", batch_rows=10_000, rate=None, timestep=1.0, seed=None):
+        self.kind = FRAME_KINDS[fmt]
+        self.batch_rows = batch_rows
+        self.rate = rate
+        self.keys = list(cells)
+        self.type_codes = cells.column("cell_type").copy()
+        self.simulator = PackSimulator(cells, timestep=timestep)
+        rng = np.random.default_rng(seed)
+        modes = rng.integers(0, 3, len(cells))
+        currents = rng.uniform(0.5, 2.0, len(cells))
+        for mode in (CC_CHARGE, CC_DISCHARGE):
+            rows = np.flatnonzero(modes == mode)
+            self.simulator.set_mode(rows, mode, currents[rows])
+        self.health = cells.column("health").copy()
+        self.rows_sent = 0
+        self.frames_sent = 0
+        self.elapsed = 0.0
+
+    def _payload(self, start, stop):
+        sim = self.simulator
+        readings = {
+            "voltage": sim.voltage[start:stop],
+            "current": sim.current[start:stop],
+            "temp": sim.temp[start:stop],
+            "soc": sim.soc[start:stop] * 100.0,
+            "health": self.health[start:stop],
+        }
+        timestamps = np.full(stop - start, np.datetime64(time.time_ns() // 1000, "us"))
+        keys = self.keys[start:stop]
+        if self.kind == FRAME_BINARY:
+            return encode_binary(keys, np.arange(stop - start), self.type_codes[start:stop], timestamps, readings)
+        frame = pd.DataFrame({"timestamp": timestamps, "cell_id": keys,
+                              "cell_type": _TYPE_LABELS[self.type_codes[start:stop]], **readings})
+        return encode_ndjson(frame)
+
+    def frames(self):
+        """Endless ``(frame bytes, rows)`` stream"""
+        count = len(self.keys)
+        while True:
+            for start in range(0, count, self.batch_rows):
+                stop = min(start + self.batch_rows, count)
+                yield encode_frame(self.kind, self._payload(start, stop)), stop - start
+            self.simulator.step()
+
+    async def run(self, host=DEFAULT_HOST, port=DEFAULT_PORT, duration=None, max_rows=None):
+        """Send until ``duration`` seconds or ``max_rows`` rows have gone out"""
+        _, writer = await asyncio.open_connection(host, port)
+        started = time.perf_counter()
+        try:
+            for frame, rows in self.frames():
+                writer.write(frame)
+                # Blocks while the server is not reading (its queue is full)
+                await writer.drain()
+                self.rows_sent += rows
+                self.frames_sent += 1
+                elapsed = time.perf_counter() - started
+                if (duration is not None and elapsed >= duration) or (max_rows is not None and self.rows_sent >= max_rows):
+                    break
+                if self.rate:
+                    delay = self.rows_sent / self.rate - elapsed
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+        finally:
+            self.elapsed = time.perf_counter() - started
+            writer.close()
+            await writer.wait_closed()
+        return self.rows_sent
@@ -0,0 +1,308 @@
+import os
+import time
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+
+from cell_generator import MAX_VOLTAGE, MIN_VOLTAGE, WARNING_TEMP
+from cell_store import CELL_TYPES, DEFAULT_PRIORITY, category_code
+
+IMPORT_FORMATS = {".csv": "CSV", ".ndjson": "NDJSON", ".jsonl": "NDJSON", ".json": "NDJSON",
+                  ".parquet": "Parquet", ".pq": "Parquet"}
+DEFAULT_IMPORT_ROWS = 500_000
+
+# Directory server-side log paths must resolve into; unset disables path imports
+IMPORT_ROOT = os.environ.get("BMS_IMPORT_ROOT")
+
+# Cell fields a log column can be mapped onto
+IMPORT_FIELDS = ("timestamp", "cell_id", "voltage", "current", "temp", "soc", "health", "capacity", "cell_type")
+REQUIRED_FIELDS = ("cell_id", "voltage")
+NUMERIC_FIELDS = ("voltage", "current", "temp", "soc", "health", "capacity")
+
+# Header names recognised by ``guess_mapping`` (compared lower-case)
+COLUMN_ALIASES = {
+    "timestamp": ("timestamp", "time", "datetime", "date_time", "test_time", "time_s"),
+    "cell_id": ("cell_id", "cell", "cell_name", "channel", "cell_key"),
+    "voltage": ("voltage", "voltage_v", "v", "volt", "cell_voltage", "ecell_v"),
+    "current": ("current", "current_a", "i", "amps", "i_a"),
+    "temp": ("temp", "temperature", "temp_c", "temperature_c", "t_cell"),
+    "soc": ("soc", "state_of_charge", "soc_pct"),
+    "health": ("health", "soh", "state_of_health"),
+    "capacity": ("capacity", "power", "power_w"),
+    "cell_type": ("cell_type", "chemistry", "type"),
+}
+
+# Accepted range per numeric field; readings outside are rejected
+VALID_RANGES = {
+    "voltage": (0.0, 6.0),
+    "current": (-1000.0, 1000.0),
+    "temp": (-40.0, 150.0),
+    "soc": (0.0, 100.0),
+    "health": (0.0, 100.0),
+    "capacity": (-1e6, 1e6),
+}
+
+# Values for optional fields a log does not provide
+FIELD_DEFAULTS = {"current": 0.0, "temp": 25.0, "soc": 50.0, "health": 100.0}
+
+_TYPE_CODES = {label.lower(): code for code, label in enumerate(CELL_TYPES)}
+
+
+def detect_format(path):
+    name = path.lower()
+    if name.endswith((".gz", ".bz2", ".zst", ".xz")):
+        name = os.path.splitext(name)[0]
+    try:
+        return IMPORT_FORMATS[os.path.splitext(name)[1]]
+    except KeyError:
+        raise ValueError(f"Cannot infer the log format of '{path}'") from None
+
+
+def resolve_import_path(path, root=IMPORT_ROOT):
+    """Real path of a server-side log, which must lie inside ``root``"""
+    if not root:
+        raise ValueError("Server-side log paths are disabled; set BMS_IMPORT_ROOT to allow them")
+    root = os.path.realpath(root)
+    resolved = os.path.realpath(os.path.join(root, path))
+    if os.path.commonpath([root, resolved]) != root:
+        raise ValueError(f"'{path}' is outside the import directory {root}")
+    return resolved
+
+
+def _parquet():
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ImportError("Parquet import requires pyarrow (pip install pyarrow)") from None
+    return pq
+
+
+def read_columns(source, fmt):
+    """Column names of a log file without reading its body"""
+    if fmt == "CSV":
+        return list(pd.read_csv(source, nrows=0).columns)
+    if fmt == "NDJSON":
+        first = next(pd.read_json(source, lines=True, chunksize=1))
+        return list(first.columns)
+    return list(_parquet().ParquetFile(source).schema_arrow.names)
+
+
+def guess_mapping(columns):
+    """``{field: column}`` for every field whose alias matches a column header"""
+    by_name = {str(column).strip().lower(): column for column in columns}
+    mapping = {}
+    for field, aliases in COLUMN_ALIASES.items():
+        for alias in aliases:
+            if alias in by_name:
+                mapping[field] = by_name[alias]
+                break
+    return mapping
+
+
+def iter_log_chunks(source, fmt, columns=None, chunk_rows=DEFAULT_IMPORT_ROWS):
+    """Raw DataFrame chunks of at most ``chunk_rows`` rows, reading only ``columns``"""
+    if fmt == "CSV":
+        yield from pd.read_csv(source, usecols=columns, chunksize=chunk_rows, low_memory=False)
+    elif fmt == "NDJSON":
+        for chunk in pd.read_json(source, lines=True, chunksize=chunk_rows, convert_dates=False):
+            yield chunk if columns is None else chunk.reindex(columns=columns)
+    elif fmt == "Parquet":
+        for batch in _parquet().ParquetFile(source).iter_batches(batch_size=chunk_rows, columns=columns):
+            yield batch.to_pandas()
+    else:
+        raise ValueError(f"Unknown log format '{fmt}'")
+
+
+def _to_times(values, time_origin):
+    if pd.api.types.is_numeric_dtype(values):
+        # Cycler test time: seconds since ``time_origin`` (the Unix epoch by default)
+        return pd.to_datetime(values, unit="s", origin=time_origin or "unix", errors="coerce")
+    return pd.to_datetime(values, errors="coerce", format="mixed")
+
+
+def coerce_chunk(raw, mapping, default_type="LFP", time_origin=None, import_time=None):
+    """Validate and coerce a raw chunk into typed cell-field columns
+
+    Every step is a whole-column operation. Returns ``(columns, rejected)``:
+    ``columns`` maps each field to an array with one entry per accepted row,
+    and ``rejected`` counts dropped rows by reason.
+    """
+    count = len(raw)
+    valid = np.ones(count, dtype=bool)
+    rejected = Counter()
+
+    def reject(bad, reason):
+        bad = bad & valid
+        if bad.any():
+            rejected[reason] += int(bad.sum())
+            valid[bad] = False
+
+    cell_ids = raw[mapping["cell_id"]].astype("string").str.strip()
+    reject(cell_ids.isna().to_numpy() | (cell_ids == "").fillna(True).to_numpy(), "missing cell_id")
+
+    values = {}
+    for field in NUMERIC_FIELDS:
+        if field not in mapping:
+            continue
+        column = pd.to_numeric(raw[mapping[field]], errors="coerce").to_numpy(dtype=np.float32)
+        reject(np.isnan(column), f"invalid {field}")
+        low, high = VALID_RANGES[field]
+        with np.errstate(invalid="ignore"):
+            reject((column < low) | (column > high), f"{field} out of range")
+        values[field] = column
+
+    if "timestamp" in mapping:
+        times = _to_times(raw[mapping["timestamp"]], time_origin)
+        times = np.asarray(times, dtype="datetime64[us]")
+        reject(np.isnat(times), "invalid timestamp")
+    else:
+        times = np.full(count, np.datetime64(import_time or pd.Timestamp.now(), "us"))
+
+    default_code = category_code("cell_type", default_type)
+    if "cell_type" in mapping:
+        labels = raw[mapping["cell_type"]].astype("string").str.strip().str.lower()
+        type_codes = labels.map(_TYPE_CODES)
+        reject((labels.notna() & type_codes.isna()).to_numpy(), "unknown cell_type")
+        type_codes = type_codes.fillna(default_code).to_numpy(dtype=np.int8)
+    else:
+        type_codes = np.full(count, default_code, dtype=np.int8)
+
+    columns = {
+        "cell_id": cell_ids.to_numpy(dtype=object)[valid],
+        "timestamp": times[valid],
+        "cell_type": type_codes[valid],
+    }
+    for field in NUMERIC_FIELDS:
+        if field in values:
+            columns[field] = values[field][valid]
+        elif field in FIELD_DEFAULTS:
+            columns[field] = np.full(int(valid.sum()), FIELD_DEFAULTS[field], dtype=np.float32)
+    if "capacity" not in columns:
+        columns["capacity"] = columns["voltage"] * np.abs(columns["current"])
+    return columns, rejected
+
+
+def history_chunk(columns):
+    """History rows (HISTORY_COLUMNS layout) from coerced import columns"""
+    codes, labels = pd.factorize(columns["cell_id"])
+    return pd.DataFrame({
+        "timestamp": columns["timestamp"],
+        "cell_id": pd.Categorical.from_codes(codes.astype(np.int32), categories=labels),
+        "voltage": columns["voltage"],
+        "temperature": columns["temp"],
+        "current": columns["current"],
+        "capacity": columns["capacity"],
+        "soc": columns["soc"],
+        "health": columns["health"],
+    })
+
+
+class ImportStats:
+    def __init__(self):
+        self.chunks = 0
+        self.rows_read = 0
+        self.rows_imported = 0
+        self.cells_added = 0
+        self.rejected = Counter()
+        self.elapsed = 0.0
+
+    @property
+    def rows_per_second(self):
+        return self.rows_read / self.elapsed if self.elapsed else 0.0
+
+    def as_dict(self):
+        return {
+            "chunks": self.chunks, "rows_read": self.rows_read, "rows_imported": self.rows_imported,
+            "cells_added": self.cells_added, "rejected": dict(self.rejected),
+            "elapsed": round(self.elapsed, 3), "rows_per_second": round(self.rows_per_second, 1),
+        }
+
+
+class LogImporter:
+    """Stream cycler/BMS logs into a CellStore and, optionally, a TelemetryStore's history
+
+    Each chunk is coerced column-wise. The chunk is appended to the
+    history as one partition. Each cell's latest reading in the chunk
+    becomes that cell's current state: new cells go in with one
+    ``extend`` call, existing ones with one ``update_rows`` call. Only one
+    chunk is in memory at a time.
+    """
+
+    def __init__(self, cells, telemetry_store=None, default_type="LFP", time_origin=None):
+        self.cells = cells
+        self.telemetry_store = telemetry_store
+        self.default_type = default_type
+        self.time_origin = time_origin
+
+    def import_file(self, source, fmt=None, mapping=None, chunk_rows=DEFAULT_IMPORT_ROWS, progress=None):
+        """Import one log; ``progress(stats)`` is called after every chunk"""
+        fmt = fmt or detect_format(source)
+        mapping = mapping or guess_mapping(read_columns(source, fmt))
+        missing = [field for field in REQUIRED_FIELDS if field not in mapping]
+        if missing:
+            raise ValueError(f"No column mapped to required field(s): {', '.join(missing)}")
+        if hasattr(source, "seek"):
+            source.seek(0)
+
+        stats = ImportStats()
+        started = time.perf_counter()
+        import_time = pd.Timestamp.now()
+        for raw in iter_log_chunks(source, fmt, list(dict.fromkeys(mapping.values())), chunk_rows):
+            columns, rejected = coerce_chunk(raw, mapping, self.default_type, self.time_origin, import_time)
+            stats.chunks += 1
+            stats.rows_read += len(raw)
+            stats.rows_imported += len(columns["cell_id"])
+            stats.rejected.update(rejected)
+            if len(columns["cell_id"]):
+                if self.telemetry_store is not None:
+                    self.telemetry_store.append_history(history_chunk(columns))
+                stats.cells_added += self.apply_latest(columns, mapping)
+            stats.elapsed = time.perf_counter() - started
+            if progress is not None:
+                progress(stats)
+        stats.elapsed = time.perf_counter() - started
+        return stats
+
+    def apply_latest(self, columns, mapping):
+        """Write each cell's latest reading in the chunk into the cell table"""
+        order = np.argsort(columns["timestamp"], kind="stable")
+        # Last occurrence per cell after the time sort = latest reading
+        latest = order[~pd.Series(columns["cell_id"][order]).duplicated(keep="last").to_numpy()]
+        keys = columns["cell_id"][latest]
+
+        rows = self.cells.rows_of(keys)
+        known = rows >= 0
+        fields = ("voltage", "current", "temp", "soc", "health", "capacity")
+        readings = {name: columns[name][latest] for name in fields}
+        readings["current"] = np.abs(readings["current"])
+
+        if known.any():
+            # Fields the log does not provide keep their current values; a
+            # capacity derived from voltage x current only counts if current was logged
+            updates = {name: readings[name][known] for name in fields
+                       if name in mapping or (name == "capacity" and "current" in mapping)}
+            if "temp" in updates:
+                updates["status"] = self._status_codes(updates["temp"])
+            self.cells.update_rows(rows[known], timestamp=columns["timestamp"][latest][known], **updates)
+
+        new = ~known
+        if new.any():
+            type_codes = columns["cell_type"][latest][new]
+            floats = {name: readings[name][new] for name in fields}
+            floats["min_voltage"] = MIN_VOLTAGE[type_codes]
+            floats["max_voltage"] = MAX_VOLTAGE[type_codes]
+            codes = {
+                "cell_type": type_codes,
+                "status": self._status_codes(floats["temp"]),
+                "priority": np.full(int(new.sum()), category_code("priority", DEFAULT_PRIORITY), dtype=np.int8),
+            }
+            self.cells.extend(keys[new].tolist(), floats, codes, columns["timestamp"][latest][new])
+        return int(new.sum())
+
+    @staticmethod
+    def _status_codes(temp):
+        return np.where(temp < WARNING_TEMP,
+                        category_code("status", "Active"),
+                        category_code("status", "Warning")).astype(np.int8)
+
@@ -0,0 +1,128 @@
+import hashlib
+import threading
+from collections import OrderedDict, namedtuple
+
+from cell_store import category_codes
+
+NetworkKey = namedtuple("NetworkKey", "digest count seed hours resolution")
+
+DEFAULT_MAX_ENTRIES = 8
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+
+def network_key(cell_types, priorities, seed, hours=0, resolution="hour"):
+    """Hashable cache key for a network configuration
+
+    The per-cell type and priority lists are reduced to a digest so that the
+    key stays small for packs with hundreds of thousands of cells.
+    """
+    count = len(cell_types)
+    if isinstance(priorities, str):
+        priorities = [priorities] * count
+    digest = hashlib.sha1()
+    digest.update(category_codes("cell_type", cell_types).tobytes())
+    digest.update(category_codes("priority", priorities).tobytes())
+    return NetworkKey(digest.hexdigest(), count, seed, hours, resolution)
+
+
+def _nbytes(value):
+    if value is None:
+        return 0
+    if hasattr(value, "memory_usage"):
+        return int(value.memory_usage(index=True).sum())
+    return int(getattr(value, "nbytes", 0))
+
+
+class CachedNetwork:
+    """Generated cell table and history for one key"""
+
+    def __init__(self, cells, history=None):
+        self.cells = cells
+        self.history = history
+
+    @property
+    def nbytes(self):
+        return _nbytes(self.cells) + _nbytes(self.history)
+
+
+class NetworkCache:
+    """Process-wide, size-bounded LRU cache of generated networks
+
+    Entries are evicted least-recently-used first once either the entry
+    count or the estimated byte size goes over budget. Cached objects are
+    shared between sessions and must be treated as read-only.
+
+    Derived aggregates such as the Network Overview metrics are not cached
+    here: ``CellStore.summary()`` reads them from running totals in O(1),
+    and each session mutates its own copy of the cells (simulation,
+    imports), so a value shared under the network key would go stale.
+    """
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def nbytes(self):
+        return sum(entry.nbytes for entry in self._entries.values())
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key, entry):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            self._evict()
+        return entry
+
+    def get_or_build(self, key, build):
+        """Return the cached entry for ``key``, calling ``build()`` on a miss"""
+        entry = self.get(key)
+        if entry is None:
+            entry = self.put(key, build())
+        return entry
+
+    def invalidate(self, key):
+        with self._lock:
+            return self._entries.pop(key, None) is not None
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def _evict(self):
+        total = self.nbytes
+        while self._entries and (len(self._entries) > self.max_entries or total > self.max_bytes):
+            _, entry = self._entries.popitem(last=False)
+            total -= entry.nbytes
+            self.evictions += 1
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self.nbytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
@@ -0,0 +1,192 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from cell_generator import broadcast_codes, cell_keys, draw_cell_columns
+from cell_store import FLOAT_COLUMNS, CellStore
+from history import (JITTER, JITTER_BASE_COLUMNS, apply_jitter, draw_jitter, history_frame,
+                     history_times, jitter_generators, step_timestamps)
+from random_streams import NetworkRandom, cell_blocks
+
+# Upper bound on history rows held in shared memory per window
+DEFAULT_WINDOW_ROWS = 8_000_000
+SHARDS_PER_WORKER = 4
+
+
+class SharedColumns:
+    """Named NumPy arrays in POSIX shared memory, owned by the creating process
+
+    Workers attach by name with ``attach_columns`` and write their slices in
+    place, so shard results never travel back through pickling.
+    """
+
+    def __init__(self, specs):
+        self._segments = []
+        self.arrays = {}
+        self.handles = {}
+        for name, (shape, dtype) in specs.items():
+            dtype = np.dtype(dtype)
+            nbytes = max(int(np.prod(shape)) * dtype.itemsize, 1)
+            segment = shared_memory.SharedMemory(create=True, size=nbytes)
+            self._segments.append(segment)
+            self.arrays[name] = np.ndarray(shape, dtype=dtype, buffer=segment.buf)
+            self.handles[name] = (segment.name, shape, dtype.str)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.arrays.clear()
+        for segment in self._segments:
+            segment.close()
+            segment.unlink()
+        self._segments.clear()
+
+
+def attach_columns(handles):
+    """Map a parent's SharedColumns into this process; returns (segments, arrays)"""
+    segments, arrays = [], {}
+    for name, (segment_name, shape, dtype) in handles.items():
+        segment = shared_memory.SharedMemory(name=segment_name)
+        segments.append(segment)
+        arrays[name] = np.ndarray(shape, dtype=dtype, buffer=segment.buf)
+    return segments, arrays
+
+
+def _detach(segments, arrays):
+    arrays.clear()
+    for segment in segments:
+        segment.close()
+
+
+def _cell_shard(handles, type_codes, offset, seed, blocks):
+    """Worker: draw the cell columns for ``blocks`` into shared memory"""
+    segments, arrays = attach_columns(handles)
+    try:
+        streams = NetworkRandom(seed)
+        for block, start, stop in blocks:
+            floats, status = draw_cell_columns(type_codes[start - offset:stop - offset],
+                                               streams.cell_stream(block))
+            for name in FLOAT_COLUMNS:
+                arrays[name][start:stop] = floats[name]
+            arrays["status"][start:stop] = status
+    finally:
+        _detach(segments, arrays)
+    return blocks[-1][2] - blocks[0][1]
+
+
+def _history_shard(base_handles, window_handles, seed, blocks, first_step, steps):
+    """Worker: draw ``steps`` history samples for ``blocks`` into the shared window"""
+    base_segments, base = attach_columns(base_handles)
+    window_segments, window = attach_columns(window_handles)
+    try:
+        lo, hi = blocks[0][1], blocks[-1][2]
+        generators = jitter_generators(NetworkRandom(seed), blocks, skip_steps=first_step)
+        jitter = draw_jitter(generators, blocks, steps)
+        readings = apply_jitter({name: base[name][lo:hi] for name in JITTER_BASE_COLUMNS}, jitter)
+        for name in JITTER:
+            window[name][:steps, lo:hi] = readings[name]
+    finally:
+        _detach(base_segments, base)
+        _detach(window_segments, window)
+    return (hi - lo) * steps
+
+
+def _shards(blocks, count):
+    """Split the block list into ``count`` contiguous runs"""
+    bounds = np.linspace(0, len(blocks), min(count, len(blocks)) + 1).astype(int)
+    return [blocks[a:b] for a, b in zip(bounds[:-1], bounds[1:]) if b > a]
+
+
+def _pool_context():
+    methods = multiprocessing.get_all_start_methods()
+    # Streamlit runs scripts in threads, so avoid plain fork
+    return multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+
+
+class ParallelBuilder:
+    """Shard cell and history generation across a ProcessPoolExecutor
+
+    Work is split on the random-stream block boundaries from
+    ``random_streams``, so the output is bit-identical to
+    ``generate_cells`` / ``iter_historical_data`` with the same seed.
+    """
+
+    def __init__(self, workers=None):
+        self.workers = workers or os.cpu_count() or 1
+        self._executor = None
+
+    def __enter__(self):
+        self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=_pool_context())
+        return self
+
+    def __exit__(self, *exc):
+        self._executor.shutdown()
+        self._executor = None
+
+    def _run(self, fn, shard_args, progress=None, total=None):
+        futures = [self._executor.submit(fn, *args) for args in shard_args]
+        done = 0
+        for future in as_completed(futures):
+            done += future.result()
+            if progress is not None:
+                progress(done, total)
+
+    def build_cells(self, cell_types, priorities="Medium", count=None, seed=None, progress=None):
+        """Parallel equivalent of ``cell_generator.generate_cells``"""
+        if count is None:
+            count = len(cell_types)
+        seed = NetworkRandom(seed).seed
+        type_codes = broadcast_codes("cell_type", cell_types, count)
+        priority_codes = broadcast_codes("priority", priorities, count)
+        specs = {name: ((count,), np.float32) for name in FLOAT_COLUMNS}
+        specs["status"] = ((count,), np.int8)
+
+        with SharedColumns(specs) as shared:
+            shard_args = []
+            for shard in _shards(cell_blocks(count), self.workers * SHARDS_PER_WORKER):
+                lo, hi = shard[0][1], shard[-1][2]
+                shard_args.append((shared.handles, type_codes[lo:hi], lo, seed, shard))
+            self._run(_cell_shard, shard_args, progress, count)
+
+            store = CellStore(capacity=count)
+            store.extend(
+                cell_keys(type_codes),
+                {name: shared.arrays[name] for name in FLOAT_COLUMNS},
+                {"cell_type": type_codes, "status": shared.arrays["status"], "priority": priority_codes},
+                np.datetime64(datetime.now(), "us"),
+            )
+        return store
+
+    def iter_history(self, store, hours=24, resolution="hour", seed=None,
+                     window_rows=DEFAULT_WINDOW_ROWS, end=None, progress=None):
+        """Parallel equivalent of ``history.iter_historical_data``, one frame per window"""
+        base_time, steps, step_seconds = history_times(hours, resolution, end)
+        count = len(store)
+        if not count or not steps:
+            return
+        seed = NetworkRandom(seed).seed
+        window_steps = max(1, min(steps, window_rows // count))
+        shards = _shards(cell_blocks(count), self.workers * SHARDS_PER_WORKER)
+
+        base_specs = {name: ((count,), np.float32) for name in JITTER_BASE_COLUMNS}
+        window_specs = {name: ((window_steps, count), np.float32) for name in JITTER}
+        with SharedColumns(base_specs) as base, SharedColumns(window_specs) as window:
+            for name in JITTER_BASE_COLUMNS:
+                base.arrays[name][:] = store.column(name)
+            for first in range(0, steps, window_steps):
+                stop = min(first + window_steps, steps)
+                shard_args = [(base.handles, window.handles, seed, shard, first, stop - first)
+                              for shard in shards]
+                self._run(_history_shard, shard_args)
+                readings = {name: window.arrays[name][:stop - first].copy() for name in JITTER}
+                yield history_frame(store, step_timestamps(base_time, step_seconds, first, stop), readings)
+                if progress is not None:
+                    progress(stop, steps)
@@ -0,0 +1,458 @@
+import threading
+
+import numpy as np
+import pandas as pd
+
+from history import HISTORY_COLUMNS
+
+RETENTION_METRICS = tuple(name for name in HISTORY_COLUMNS if name not in ("timestamp", "cell_id"))
+
+# Tiers from finest to coarsest: bucket width in seconds (0 = raw samples)
+# and how long data stays in the tier before it is rolled up into the next
+# one, or dropped from the last
+TIER_WIDTHS = {"raw": 0, "minute": 60, "hour": 3600}
+DEFAULT_RETENTION = {"raw": 3600, "minute": 24 * 3600, "hour": 30 * 24 * 3600}
+
+# Memory for all tiers together, and each tier's share of it. A tier over
+# its share hands its oldest rows to the next tier early (the last tier
+# drops them), so the total never exceeds the budget.
+DEFAULT_BUDGET_BYTES = 256 * 1024 * 1024
+TIER_BUDGET_SHARES = {"raw": 0.5, "minute": 0.3, "hour": 0.2}
+APPEND_CHUNK_ROWS = 1_000_000
+
+_US = 1_000_000
+
+
+def _tier_columns(width):
+    columns = {"time": np.int64, "cell": np.int32}
+    if width:
+        columns["count"] = np.int32
+        for metric in RETENTION_METRICS:
+            columns.update({metric: np.float32, f"{metric}_min": np.float32, f"{metric}_max": np.float32})
+    else:
+        columns.update({metric: np.float32 for metric in RETENTION_METRICS})
+    return columns
+
+
+def _floor(time_us, width):
+    return time_us - time_us % (width * _US)
+
+
+def _ceil(time_us, width):
+    return _floor(time_us + width * _US - 1, width)
+
+
+def rollup_rows(rows, width):
+    """Roll raw or rolled-up rows into ``width``-second buckets per cell
+
+    Counts add up, min/max combine (ignoring NaN) and means are weighted
+    by count. Time-major grids are reduced block by block; other layouts
+    are sorted by (bucket, cell) and reduced with ``reduceat``.
+    """
+    grid = _grid_size(rows)
+    if grid:
+        return _grid_rollup(rows, width, grid)
+    bucket = _floor(rows["time"], width)
+    # One int64 key per (bucket, cell); rows arrive in time order, so the
+    # stable sort only merges a few already-sorted runs
+    n_cells = int(rows["cell"].max()) + 1
+    key = (bucket - bucket[0]) // (width * _US) * n_cells + rows["cell"]
+    order = None if np.all(key[1:] >= key[:-1]) else np.argsort(key, kind="stable")
+    take = (lambda values: values) if order is None else (lambda values: values[order])
+    key = take(key)
+    first = np.ones(len(key), dtype=bool)
+    first[1:] = key[1:] != key[:-1]
+    starts = np.flatnonzero(first)
+    rolled = "count" in rows
+    counts = take(rows["count"]) if rolled else np.ones(len(key), dtype=np.int32)
+    out = {"time": take(bucket)[starts], "cell": take(rows["cell"])[starts]}
+    if len(starts) == len(key):
+        # Every row is already alone in its bucket
+        out["count"] = counts
+        for metric in RETENTION_METRICS:
+            out[metric] = take(rows[metric])
+            out[f"{metric}_min"] = take(rows[f"{metric}_min"]) if rolled else out[metric]
+            out[f"{metric}_max"] = take(rows[f"{metric}_max"]) if rolled else out[metric]
+        return out
+    out["count"] = np.add.reduceat(counts, starts)
+    for metric in RETENTION_METRICS:
+        mean = take(rows[metric])
+        low = take(rows[f"{metric}_min"]) if rolled else mean
+        high = take(rows[f"{metric}_max"]) if rolled else mean
+        out[f"{metric}_min"] = np.fmin.reduceat(low, starts)
+        out[f"{metric}_max"] = np.fmax.reduceat(high, starts)
+        weighted = np.add.reduceat(mean.astype(np.float64) * counts, starts)
+        out[metric] = (weighted / out["count"]).astype(np.float32)
+    return out
+
+
+def _grid_size(rows):
+    """Cells per timestamp when rows are a time-major grid (the same cells at every step), else 0"""
+    times, cells = rows["time"], rows["cell"]
+    size = int(np.searchsorted(times, times[0], side="right"))
+    if size < 2 or len(times) % size:
+        return 0
+    steps = len(times) // size
+    step_times = times.reshape(steps, size)
+    if not (np.all(step_times == step_times[:, :1]) and np.all(step_times[1:, 0] > step_times[:-1, 0])):
+        return 0
+    if not np.all(cells.reshape(steps, size) == cells[:size]):
+        return 0
+    return size
+
+
+def _grid_rollup(rows, width, size):
+    """``rollup_rows`` for a time-major grid: reduce each bucket's (steps, cells) block along the step axis
+
+    A bucket spans few steps, and a plain reduce over a contiguous block is
+    far faster than ``reduceat`` along axis 0, so buckets are looped over.
+    """
+    step_bucket = _floor(rows["time"][::size], width)
+    first = np.ones(len(step_bucket), dtype=bool)
+    first[1:] = step_bucket[1:] != step_bucket[:-1]
+    starts = np.flatnonzero(first)
+    bounds = list(zip(starts, np.append(starts[1:], len(step_bucket))))
+
+    def reduce(ufunc, values, **kwargs):
+        return np.concatenate([ufunc.reduce(values[lo:hi], axis=0, **kwargs) for lo, hi in bounds])
+
+    def grid(name):
+        return rows[name].reshape(-1, size)
+
+    rolled = "count" in rows
+    if rolled:
+        counts = reduce(np.add, grid("count"))
+    else:
+        counts = np.repeat(np.diff(np.append(starts, len(step_bucket))), size)
+    out = {
+        "time": np.repeat(step_bucket[starts], size),
+        "cell": np.tile(rows["cell"][:size], len(starts)),
+        "count": counts.astype(np.int32),
+    }
+    for metric in RETENTION_METRICS:
+        mean = grid(metric)
+        out[f"{metric}_min"] = reduce(np.fmin, grid(f"{metric}_min") if rolled else mean)
+        out[f"{metric}_max"] = reduce(np.fmax, grid(f"{metric}_max") if rolled else mean)
+        weighted = reduce(np.add, mean * grid("count") if rolled else mean, dtype=np.float64)
+        out[metric] = (weighted / counts).astype(np.float32)
+    return out
+
+
+class _Tier:
+    """Time-ordered chunks of one tier, each a dict of equal-length column arrays"""
+
+    def __init__(self, name, width):
+        self.name = name
+        self.width = width
+        self.columns = _tier_columns(width)
+        self.row_bytes = sum(np.dtype(dtype).itemsize for dtype in self.columns.values())
+        self.chunks = []
+        self.rows = 0
+
+    @property
+    def nbytes(self):
+        return self.rows * self.row_bytes
+
+    @property
+    def oldest(self):
+        return min(chunk["time"][0] for chunk in self.chunks) if self.chunks else None
+
+    @property
+    def newest(self):
+        return max(chunk["time"][-1] for chunk in self.chunks) if self.chunks else None
+
+    def append(self, chunk):
+        if len(chunk["time"]):
+            self.chunks.append({name: np.ascontiguousarray(chunk[name], dtype=dtype)
+                                for name, dtype in self.columns.items()})
+            self.rows += len(chunk["time"])
+
+    def take_before(self, cutoff):
+        """Remove and return the rows older than ``cutoff`` (None if there are none)"""
+        taken, kept = [], []
+        for chunk in self.chunks:
+            split = np.searchsorted(chunk["time"], cutoff, side="left")
+            if split:
+                taken.append({name: values[:split] for name, values in chunk.items()})
+            if not split:
+                kept.append(chunk)
+            elif split < len(chunk["time"]):
+                # Copy the remainder so it does not pin the taken rows' buffers
+                kept.append({name: values[split:].copy() for name, values in chunk.items()})
+        if not taken:
+            return None
+        self.chunks = kept
+        rows = {name: np.concatenate([chunk[name] for chunk in taken]) for name in self.columns}
+        self.rows -= len(rows["time"])
+        return rows
+
+    def time_after_rows(self, count):
+        """Timestamp such that taking everything before it removes about ``count`` rows
+
+        Exact when chunks were appended in time order, which ``compact``
+        relies on; it repeats until the tier is within its share otherwise.
+        """
+        for chunk in self.chunks:
+            if count <= len(chunk["time"]):
+                return chunk["time"][max(count, 1) - 1] + 1
+            count -= len(chunk["time"])
+        return self.newest + 1
+
+    def select(self, lo, hi, cell_mask=None):
+        """Rows with ``lo <= time <= hi`` (and, with a mask, only the masked cells)"""
+        parts = []
+        for chunk in self.chunks:
+            start = np.searchsorted(chunk["time"], lo, side="left")
+            stop = np.searchsorted(chunk["time"], hi, side="right")
+            if start >= stop:
+                continue
+            part = {name: values[start:stop] for name, values in chunk.items()}
+            if cell_mask is not None:
+                keep = cell_mask[part["cell"]]
+                part = {name: values[keep] for name, values in part.items()}
+            parts.append(part)
+        if not parts:
+            return None
+        rows = {name: np.concatenate([part[name] for part in parts]) for name in self.columns}
+        if len(parts) > 1 and np.any(np.diff(rows["time"]) < 0):
+            order = np.argsort(rows["time"], kind="stable")
+            rows = {name: values[order] for name, values in rows.items()}
+        return rows
+
+
+class TieredHistory:
+    """Bounded per-cell history: raw samples, then 1-minute and 1-hour rollups
+
+    New samples land in the raw tier. Once they are older than the raw
+    window they are rolled up per cell into 1-minute buckets
+    (min/max/mean/count), and minute buckets older than their window into
+    1-hour buckets; hour buckets older than theirs are dropped. Cut-offs
+    are aligned to the coarser tier's bucket width, so every bucket is
+    built from complete data and the tiers never overlap in time.
+
+    On top of the age limits each tier has a share of a byte budget. A tier
+    over its share rolls up (or drops) its oldest rows early, which trades
+    resolution for memory instead of losing recent data. The rows kept per
+    cell are therefore bounded by the windows and the budget, not by
+    uptime. Range queries stitch the tiers back into one frame.
+    """
+
+    def __init__(self, retention=None, budget_bytes=DEFAULT_BUDGET_BYTES, shares=None):
+        self.retention = dict(DEFAULT_RETENTION, **(retention or {}))
+        self.budget_bytes = budget_bytes
+        self.shares = dict(TIER_BUDGET_SHARES, **(shares or {}))
+        self.lock = threading.RLock()
+        self.tiers = [_Tier(name, width) for name, width in TIER_WIDTHS.items()]
+        self.version = 0
+        self.clear()
+
+    def clear(self):
+        with self.lock:
+            for tier in self.tiers:
+                tier.chunks, tier.rows = [], 0
+            self.cell_ids = pd.Index([], dtype=object)
+            self._codes_cache = (None, None)
+            self.newest = None
+            self.rolled_up = 0
+            self.evicted = 0
+            self.version += 1
+
+    def __len__(self):
+        return sum(tier.rows for tier in self.tiers)
+
+    @property
+    def nbytes(self):
+        return sum(tier.nbytes for tier in self.tiers)
+
+    @property
+    def bytes_per_cell(self):
+        return self.nbytes / len(self.cell_ids) if len(self.cell_ids) else 0.0
+
+    # Ingest ---------------------------------------------------------------
+
+    def _codes(self, labels):
+        """Codes for cell labels, registering new ones; repeated calls with the same list are free"""
+        cached_labels, cached_codes = self._codes_cache
+        if labels is cached_labels:
+            return cached_codes
+        index = pd.Index(labels)
+        codes = self.cell_ids.get_indexer(index)
+        missing = codes < 0
+        if missing.any():
+            self.cell_ids = self.cell_ids.append(pd.Index(pd.unique(index[missing])))
+            codes = self.cell_ids.get_indexer(index)
+        codes = codes.astype(np.int32)
+        self._codes_cache = (labels, codes)
+        return codes
+
+    def append(self, frame):
+        """Add a history frame (``timestamp``, ``cell_id`` and metric columns)"""
+        if not len(frame):
+            return
+        cell_ids = frame["cell_id"]
+        with self.lock:
+            if isinstance(cell_ids.dtype, pd.CategoricalDtype):
+                codes = self._codes(cell_ids.cat.categories)[cell_ids.cat.codes.to_numpy()]
+            else:
+                codes = self._codes(cell_ids.to_numpy())
+            times = frame["timestamp"].to_numpy().astype("datetime64[us]").view(np.int64)
+            values = {metric: frame[metric].to_numpy(dtype=np.float32) for metric in RETENTION_METRICS
+                      if metric in frame}
+            self._append_raw(times, codes, values)
+
+    def append_sample(self, timestamp, cell_ids, values):
+        """Add one reading per cell taken at ``timestamp``; ``values`` maps metrics to arrays"""
+        with self.lock:
+            codes = self._codes(cell_ids)
+            times = np.full(len(codes), np.datetime64(timestamp, "us").astype(np.int64))
+            self._append_raw(times, codes, values)
+
+    def replace(self, frame):
+        """Replace the contents with a history frame"""
+        with self.lock:
+            self.clear()
+            self.append(frame)
+
+    def load_store(self, store):
+        """Replace the contents with a TelemetryStore's history, one partition at a time"""
+        with self.lock:
+            self.clear()
+            labels = store.history_cell_ids
+            for part in store.iter_history_partitions():
+                codes = self._codes(labels)[np.asarray(part["cell_id"])]
+                times = np.asarray(part["timestamp"]).astype("datetime64[us]").view(np.int64)
+                self._append_raw(times, codes, {metric: part[metric] for metric in RETENTION_METRICS})
+
+    def _append_raw(self, times, codes, values):
+        if not len(times):
+            return
+        order = None
+        if np.any(times[1:] < times[:-1]):
+            order = np.argsort(times, kind="stable")
+        chunk = {"time": times, "cell": codes}
+        for metric in RETENTION_METRICS:
+            column = values.get(metric)
+            chunk[metric] = (np.full(len(times), np.nan, dtype=np.float32) if column is None
+                             else np.asarray(column, dtype=np.float32))
+        if order is not None:
+            chunk = {name: column[order] for name, column in chunk.items()}
+        # Large loads go in slices so each compaction only rolls up a slice's worth
+        for start in range(0, len(times), APPEND_CHUNK_ROWS):
+            self.tiers[0].append({name: column[start:start + APPEND_CHUNK_ROWS] for name, column in chunk.items()})
+            newest = int(chunk["time"][min(start + APPEND_CHUNK_ROWS, len(times)) - 1])
+            self.newest = newest if self.newest is None else max(self.newest, newest)
+            self.compact()
+        self.version += 1
+
+    # Retention ------------------------------------------------------------
+
+    def _promote(self, level, cutoff):
+        """Move rows older than ``cutoff`` from tier ``level`` into the next tier (or drop them)"""
+        rows = self.tiers[level].take_before(cutoff)
+        if rows is None:
+            return 0
+        taken = len(rows["time"])
+        if level + 1 < len(self.tiers):
+            self.tiers[level + 1].append(rollup_rows(rows, self.tiers[level + 1].width))
+            self.rolled_up += taken
+        else:
+            self.evicted += taken
+        return taken
+
+    def compact(self, now=None):
+        """Apply the age limits and the byte budget; ``now`` defaults to the newest sample (µs)"""
+        with self.lock:
+            now = self.newest if now is None else now
+            if now is None:
+                return
+            for level, tier in enumerate(self.tiers):
+                cutoff = now - self.retention[tier.name] * _US
+                if level + 1 < len(self.tiers):
+                    cutoff = _floor(cutoff, self.tiers[level + 1].width)
+                self._promote(level, cutoff)
+            for level, tier in enumerate(self.tiers):
+                excess = tier.nbytes - self.shares[tier.name] * self.budget_bytes
+                while excess > 0 and tier.rows:
+                    cutoff = tier.time_after_rows(int(np.ceil(excess / tier.row_bytes)))
+                    if level + 1 < len(self.tiers):
+                        cutoff = _ceil(cutoff, self.tiers[level + 1].width)
+                    if not self._promote(level, cutoff):
+                        break
+                    excess = tier.nbytes - self.shares[tier.name] * self.budget_bytes
+
+    # Queries --------------------------------------------------------------
+
+    def uniform_width(self):
+        """Narrowest bucket width (s) at which every held row has one resolution; 0 if only raw rows are held"""
+        with self.lock:
+            return max((tier.width for tier in self.tiers if tier.rows), default=0)
+
+    def query(self, start=None, end=None, cells=None, width=None, stats=False, tiers=None):
+        """History over [start, end] stitched from every tier, oldest first
+
+        Returns a history-style frame (``timestamp``, ``cell_id`` and one
+        column per metric); rolled-up rows carry their bucket's start time
+        and mean, so rows from different tiers are not equal-weight samples.
+        ``cells`` limits the result to those cell ids and ``tiers`` to the
+        named tiers; ``width`` re-buckets everything to that many seconds,
+        which makes the rows uniform (pass ``uniform_width()`` to cover
+        every tier). With ``stats`` the
+        frame also has ``resolution`` (seconds, 0 for raw), ``count`` and
+        ``<metric>_min`` / ``<metric>_max``.
+        """
+        lo = np.iinfo(np.int64).min if start is None else np.datetime64(start, "us").astype(np.int64)
+        hi = np.iinfo(np.int64).max if end is None else np.datetime64(end, "us").astype(np.int64)
+        with self.lock:
+            cell_mask = None
+            if cells is not None:
+                cell_mask = np.zeros(len(self.cell_ids), dtype=bool)
+                codes = self.cell_ids.get_indexer(pd.Index(list(cells)))
+                cell_mask[codes[codes >= 0]] = True
+            parts = []
+            for tier in reversed(self.tiers):
+                if tiers is not None and tier.name not in tiers:
+                    continue
+                rows = tier.select(lo, hi, cell_mask)
+                if rows is None:
+                    continue
+                if not tier.width:
+                    rows = dict(rows, count=np.ones(len(rows["time"]), dtype=np.int32))
+                    for metric in RETENTION_METRICS:
+                        rows[f"{metric}_min"] = rows[f"{metric}_max"] = rows[metric]
+                rows["resolution"] = np.full(len(rows["time"]), tier.width, dtype=np.int32)
+                parts.append(rows)
+            categories = self.cell_ids
+        if parts:
+            rows = {name: np.concatenate([part[name] for part in parts]) for name in parts[0]}
+        else:
+            rows = {name: np.zeros(0, dtype=dtype) for name, dtype in _tier_columns(1).items()}
+            rows["resolution"] = np.zeros(0, dtype=np.int32)
+        if width and len(rows["time"]):
+            resolution = max(width, int(rows["resolution"].max()))
+            rows = rollup_rows(rows, width)
+            rows["resolution"] = np.full(len(rows["time"]), resolution, dtype=np.int32)
+
+        frame = pd.DataFrame({
+            "timestamp": rows["time"].view("datetime64[us]"),
+            "cell_id": pd.Categorical.from_codes(rows["cell"], categories=categories),
+            **{metric: rows[metric] for metric in RETENTION_METRICS},
+        })
+        if stats:
+            frame["resolution"] = rows["resolution"]
+            frame["count"] = rows["count"]
+            for metric in RETENTION_METRICS:
+                frame[f"{metric}_min"] = rows[f"{metric}_min"]
+                frame[f"{metric}_max"] = rows[f"{metric}_max"]
+        return frame
+
+    def tier_stats(self):
+        """Rows, bytes and covered time span per tier"""
+        with self.lock:
+            return pd.DataFrame([{
+                "tier": tier.name,
+                "rows": tier.rows,
+                "mb": tier.nbytes / 2**20,
+                "budget_mb": self.shares[tier.name] * self.budget_bytes / 2**20,
+                "oldest": None if tier.oldest is None else np.datetime64(int(tier.oldest), "us"),
+                "newest": None if tier.newest is None else np.datetime64(int(tier.newest), "us"),
+            } for tier in self.tiers])
@@ -0,0 +1,107 @@
+import logging
+import threading
+
+import numpy as np
+
+RING_COLUMNS = ("voltage", "current", "temp", "soc")
+STAT_NAMES = ("mean", "min", "max")
+
+# Memory allowed for the per-cell samples; the capacity is derived from it
+DEFAULT_BUDGET_BYTES = 256 * 1024 * 1024
+# Preferred minimum window; the budget wins when it cannot hold this many
+MIN_CAPACITY = 60
+MAX_CAPACITY = 3600
+STATS_CAPACITY = 86_400
+
+logger = logging.getLogger(__name__)
+
+
+class TelemetryRing:
+    """Fixed-capacity ring buffer of per-cell samples plus fleet-wide statistics
+
+    Samples are written into preallocated ``(capacity, cells)`` float32
+    arrays, with no per-sample allocation. The per-cell capacity is sized
+    from a byte budget, which is a hard limit: very large packs get fewer
+    than ``MIN_CAPACITY`` samples (at least one) rather than overrunning
+    it. The mean/min/max across cells for every sample goes into a much
+    longer ring, so fleet-wide trends cover more time than the per-cell
+    window. ``seq`` counts every sample ever appended; readers ask
+    for the samples after the last ``seq`` they saw.
+    """
+
+    def __init__(self, n_cells, budget_bytes=DEFAULT_BUDGET_BYTES, columns=RING_COLUMNS):
+        self.columns = tuple(columns)
+        self.budget_bytes = budget_bytes
+        self.lock = threading.Lock()
+        self.reset(n_cells)
+
+    def reset(self, n_cells):
+        with self.lock:
+            self.n_cells = n_cells
+            per_sample = max(n_cells, 1) * len(self.columns) * 4
+            fits = self.budget_bytes // per_sample
+            self.capacity = int(np.clip(fits, 1, MAX_CAPACITY))
+            if self.capacity < MIN_CAPACITY:
+                logger.warning("Telemetry ring holds only %d samples per cell for %d cells within %d bytes "
+                               "(wanted at least %d)", self.capacity, n_cells, self.budget_bytes, MIN_CAPACITY)
+            self.times = np.zeros(self.capacity, dtype="datetime64[ms]")
+            self.samples = {name: np.zeros((self.capacity, n_cells), dtype=np.float32)
+                            for name in self.columns}
+            self.stat_times = np.zeros(STATS_CAPACITY, dtype="datetime64[ms]")
+            self.stats = {(name, stat): np.zeros(STATS_CAPACITY, dtype=np.float32)
+                          for name in self.columns for stat in STAT_NAMES}
+            self.seq = 0
+
+    @property
+    def nbytes(self):
+        total = self.times.nbytes + self.stat_times.nbytes
+        total += sum(arr.nbytes for arr in self.samples.values())
+        total += sum(arr.nbytes for arr in self.stats.values())
+        return total
+
+    def append(self, timestamp, values):
+        """Write one sample; ``values`` maps each column to an array of n_cells"""
+        with self.lock:
+            slot = self.seq % self.capacity
+            stat_slot = self.seq % STATS_CAPACITY
+            self.times[slot] = timestamp
+            self.stat_times[stat_slot] = timestamp
+            for name in self.columns:
+                row = self.samples[name][slot]
+                row[:] = values[name]
+                if self.n_cells:
+                    self.stats[(name, "mean")][stat_slot] = row.mean(dtype=np.float64)
+                    self.stats[(name, "min")][stat_slot] = row.min()
+                    self.stats[(name, "max")][stat_slot] = row.max()
+            self.seq += 1
+
+    def _slots(self, since, until, limit, capacity):
+        until = self.seq if until is None else min(until, self.seq)
+        if limit is not None:
+            since = max(since, until - limit)
+        first = max(since, self.seq - capacity, 0)
+        return np.arange(first, until) % capacity, until
+
+    def stats_since(self, since=0, until=None, limit=None):
+        """(times, {(column, stat): values}, seq) for fleet statistics in [since, until)"""
+        with self.lock:
+            slots, until = self._slots(since, until, limit, STATS_CAPACITY)
+            return (self.stat_times[slots],
+                    {key: arr[slots] for key, arr in self.stats.items()},
+                    until)
+
+    def cells_since(self, rows, since=0, until=None, limit=None):
+        """(times, {column: (samples, len(rows))}, seq) for selected cells in [since, until)"""
+        with self.lock:
+            slots, until = self._slots(since, until, limit, self.capacity)
+            return (self.times[slots],
+                    {name: arr[np.ix_(slots, rows)] for name, arr in self.samples.items()},
+                    until)
+
+    def latest(self):
+        """Most recent per-cell sample as ``{column: array}`` (None if empty)"""
+        with self.lock:
+            if not self.seq:
+                return None
+            slot = (self.seq - 1) % self.capacity
+            return {name: arr[slot].copy() for name, arr in self.samples.items()}
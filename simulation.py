@@ -0,0 +1,303 @@
+import re
+import threading
+import time
+
+import numpy as np
+
+from cell_store import CELL_TYPES
+from task_scheduler import TaskExecutor
+
+# Operating modes, one int8 per cell
+REST, CC_CHARGE, CV_CHARGE, CC_DISCHARGE = 0, 1, 2, 3
+
+AMBIENT_TEMP = 25.0
+DEFAULT_TIMESTEP = 1.0
+SOC_GRID = np.linspace(0.0, 1.0, 11)
+
+# Per-chemistry equivalent-circuit and thermal parameters:
+# capacity (Ah), R0 (ohm), R1 (ohm), C1 (F), heat capacity (J/K),
+# heat transfer to ambient (W/K), and the OCV curve shape over SOC_GRID
+# (0 = the cell's min_voltage, 1 = its max_voltage).
+CHEMISTRY_PARAMS = {
+    "LFP": dict(capacity_ah=3.0, r0=0.012, r1=0.008, c1=2500.0, heat_capacity=70.0, cooling=0.35,
+                ocv_shape=[0.0, 0.42, 0.55, 0.58, 0.60, 0.62, 0.64, 0.66, 0.70, 0.80, 1.0]),
+    "Li-ion": dict(capacity_ah=2.5, r0=0.030, r1=0.015, c1=1800.0, heat_capacity=45.0, cooling=0.25,
+                   ocv_shape=[0.0, 0.20, 0.32, 0.40, 0.47, 0.54, 0.62, 0.70, 0.79, 0.89, 1.0]),
+    "NMC": dict(capacity_ah=3.0, r0=0.025, r1=0.012, c1=2000.0, heat_capacity=48.0, cooling=0.25,
+                ocv_shape=[0.0, 0.22, 0.34, 0.42, 0.49, 0.56, 0.63, 0.71, 0.80, 0.90, 1.0]),
+    "LTO": dict(capacity_ah=2.0, r0=0.008, r1=0.005, c1=3000.0, heat_capacity=60.0, cooling=0.40,
+                ocv_shape=[0.0, 0.30, 0.40, 0.45, 0.49, 0.53, 0.57, 0.62, 0.69, 0.80, 1.0]),
+    "LiPo": dict(capacity_ah=1.5, r0=0.035, r1=0.020, c1=1200.0, heat_capacity=30.0, cooling=0.20,
+                 ocv_shape=[0.0, 0.18, 0.30, 0.39, 0.46, 0.53, 0.61, 0.69, 0.78, 0.88, 1.0]),
+}
+
+
+def _param_table(name):
+    return np.array([CHEMISTRY_PARAMS[t][name] for t in CELL_TYPES], dtype=np.float64)
+
+
+CAPACITY_AH = _param_table("capacity_ah")
+R0 = _param_table("r0")
+R1 = _param_table("r1")
+C1 = _param_table("c1")
+HEAT_CAPACITY = _param_table("heat_capacity")
+COOLING = _param_table("cooling")
+OCV_SHAPE = _param_table("ocv_shape")  # (chemistries, len(SOC_GRID))
+
+# CV phase ends once the current tapers below this fraction of 1C
+CV_CUTOFF_C_RATE = 0.05
+
+
+def ocv_fraction(type_codes, soc):
+    """OCV curve position (0..1) per cell, linear between the SOC_GRID points"""
+    position = np.clip(soc, 0.0, 1.0) * (len(SOC_GRID) - 1)
+    lower = np.minimum(position.astype(np.intp), len(SOC_GRID) - 2)
+    frac = position - lower
+    low = OCV_SHAPE[type_codes, lower]
+    return low + frac * (OCV_SHAPE[type_codes, lower + 1] - low)
+
+
+def ocv_slope(type_codes, soc):
+    """d(OCV curve position)/d(SoC) per cell, the slope of the segment ``soc`` falls in"""
+    position = np.clip(soc, 0.0, 1.0) * (len(SOC_GRID) - 1)
+    lower = np.minimum(position.astype(np.intp), len(SOC_GRID) - 2)
+    return (OCV_SHAPE[type_codes, lower + 1] - OCV_SHAPE[type_codes, lower]) * (len(SOC_GRID) - 1)
+
+
+def soc_from_ocv(type_codes, fraction):
+    """Inverse of ``ocv_fraction``: SoC (0..1) per cell from its OCV curve position"""
+    soc = np.empty(len(type_codes))
+    for code in np.unique(type_codes):
+        cells = type_codes == code
+        soc[cells] = np.interp(fraction[cells], OCV_SHAPE[code], SOC_GRID)
+    return soc
+
+
+def temperature_resistance(r0, temp):
+    """R0 with a simple temperature dependence (higher when cold)"""
+    return r0 * np.clip(1.0 + 0.015 * (AMBIENT_TEMP - temp), 0.5, 3.0)
+
+
+def parse_setpoint(value, voltage):
+    """Current in A from a CC/CP entry such as ``"5A"`` or ``"10W"``"""
+    match = re.fullmatch(r"\s*([0-9]*\.?[0-9]+)\s*([aAwW]?)\s*", str(value or ""))
+    if not match:
+        raise ValueError(f"Cannot parse CC/CP value '{value}'")
+    amount, unit = float(match.group(1)), match.group(2).upper()
+    return amount / voltage if unit == "W" else amount
+
+
+def task_current(task, voltage):
+    """Setpoint current of a CC_CV or CC_CD task
+
+    A CC/CP entry, when given, is the setpoint; otherwise the task's
+    numeric ``current`` is used. ``voltage`` converts a power entry.
+    """
+    if str(task.get("cc_cp") or "").strip():
+        return parse_setpoint(task["cc_cp"], voltage)
+    if task.get("current") is None:
+        raise ValueError("Task needs a CC/CP value or a current")
+    return float(task["current"])
+
+
+class PackSimulator:
+    """Equivalent-circuit (R0 + one RC pair) and lumped-thermal model for every cell
+
+    State is one float64 array per quantity. ``step`` advances all cells in
+    a single vectorized pass, including the CC -> CV switch, which is a mask
+    rather than a per-cell branch. Charge current is positive.
+    """
+
+    def __init__(self, store, timestep=DEFAULT_TIMESTEP, ambient=AMBIENT_TEMP):
+        self.timestep = timestep
+        self.ambient = ambient
+        self.lock = threading.RLock()
+        self.sim_time = 0.0
+        self.version = 0
+        self.load(store)
+
+    def load(self, store):
+        """(Re)initialise the state from a CellStore"""
+        with self.lock:
+            count = len(store)
+            self.keys = list(store)
+            self.rows = {key: row for row, key in enumerate(self.keys)}
+            self.type_codes = store.column("cell_type").astype(np.intp)
+            self.v_min = store.column("min_voltage").astype(np.float64)
+            self.v_max = store.column("max_voltage").astype(np.float64)
+            health = store.column("health").astype(np.float64) / 100.0
+            self.capacity_ah = CAPACITY_AH[self.type_codes] * health
+            self.r0 = R0[self.type_codes]
+            self.r1 = R1[self.type_codes]
+            self.tau = R1[self.type_codes] * C1[self.type_codes]
+            self.heat_capacity = HEAT_CAPACITY[self.type_codes]
+            self.cooling = COOLING[self.type_codes]
+
+            self.soc = store.column("soc").astype(np.float64) / 100.0
+            self.temp = store.column("temp").astype(np.float64)
+            self.v_rc = np.zeros(count)
+            self.current = np.zeros(count)
+            self.mode = np.zeros(count, dtype=np.int8)
+            self.setpoint = np.zeros(count)
+            self.cv_voltage = self.v_max.copy()
+            self.cutoff_voltage = self.v_min.copy()
+            self.voltage = self.ocv()
+            self.version += 1
+
+    def __len__(self):
+        return len(self.keys)
+
+    def ocv(self):
+        return self.v_min + (self.v_max - self.v_min) * ocv_fraction(self.type_codes, self.soc)
+
+    def resistance(self):
+        return temperature_resistance(self.r0, self.temp)
+
+    # Control ----------------------------------------------------------
+
+    def set_mode(self, rows, mode, current=0.0, cv_voltage=None, cutoff_voltage=None):
+        """Put ``rows`` into ``mode`` with a setpoint current magnitude in A"""
+        with self.lock:
+            rows = np.atleast_1d(rows)
+            self.mode[rows] = mode
+            self.setpoint[rows] = abs(current)
+            if cv_voltage is not None:
+                self.cv_voltage[rows] = np.minimum(cv_voltage, self.v_max[rows])
+            if cutoff_voltage is not None:
+                self.cutoff_voltage[rows] = np.maximum(cutoff_voltage, self.v_min[rows])
+
+    # Integration ------------------------------------------------------
+
+    def step(self, dt=None):
+        """Advance every cell by ``dt`` seconds"""
+        dt = self.timestep if dt is None else dt
+        with self.lock:
+            ocv = self.ocv()
+            r0 = self.resistance()
+            mode = self.mode
+
+            current = np.where(mode == CC_CHARGE, self.setpoint, 0.0)
+            current = np.where(mode == CC_DISCHARGE, -self.setpoint, current)
+            terminal = ocv + self.v_rc + current * r0
+
+            # CC -> CV once the terminal voltage reaches the CV setpoint
+            to_cv = (mode == CC_CHARGE) & (terminal >= self.cv_voltage)
+            mode[to_cv] = CV_CHARGE
+            in_cv = mode == CV_CHARGE
+            cv_current = np.clip((self.cv_voltage - ocv - self.v_rc) / r0, 0.0, self.setpoint)
+            current = np.where(in_cv, cv_current, current)
+
+            # Terminations: CV taper below C/20, discharge at the cut-off voltage
+            tapered = in_cv & (current < CV_CUTOFF_C_RATE * self.capacity_ah)
+            cut_off = (mode == CC_DISCHARGE) & (terminal <= self.cutoff_voltage)
+            empty_or_full = ((current > 0) & (self.soc >= 1.0)) | ((current < 0) & (self.soc <= 0.0))
+            stop = tapered | cut_off | empty_or_full
+            mode[stop] = REST
+            current[stop] = 0.0
+
+            decay = np.exp(-dt / self.tau)
+            self.v_rc = self.v_rc * decay + self.r1 * (1.0 - decay) * current
+            self.soc = np.clip(self.soc + current * dt / (3600.0 * self.capacity_ah), 0.0, 1.0)
+
+            heat = current * current * r0 + self.v_rc * self.v_rc / self.r1
+            steady = self.ambient + heat / self.cooling
+            self.temp = steady + (self.temp - steady) * np.exp(-dt * self.cooling / self.heat_capacity)
+
+            self.current = current
+            self.voltage = self.ocv() + self.v_rc + current * r0
+            self.sim_time += dt
+            self.version += 1
+
+    def advance(self, seconds):
+        """Advance by ``seconds`` of simulated time in ``timestep`` increments"""
+        steps = int(seconds // self.timestep)
+        for _ in range(steps):
+            self.step()
+        remainder = seconds - steps * self.timestep
+        if remainder > 1e-9:
+            self.step(remainder)
+
+    def write_to(self, store):
+        """Copy voltage, temperature and SoC into a CellStore with the same rows
+
+        Current and capacity are only written for cells under a task, so
+        resting cells keep their stored ratings.
+        """
+        with self.lock:
+            store.update_rows(np.arange(len(self)), voltage=self.voltage, temp=self.temp, soc=self.soc * 100.0)
+            active = np.flatnonzero(self.mode != REST)
+            if len(active):
+                current = np.abs(self.current[active])
+                store.update_rows(active, current=current, capacity=self.voltage[active] * current)
+
+
+class SimulationExecutor(TaskExecutor):
+    """Runs scheduler tasks by switching the target cell's simulation mode"""
+
+    def __init__(self, simulator):
+        self.simulator = simulator
+
+    def start(self, task_key, task, cell_key):
+        sim = self.simulator
+        row = sim.rows[cell_key]
+        task_type = task.get("task_type")
+        if task_type == "CC_CV":
+            current = task_current(task, task.get("cv_voltage", 3.6))
+            sim.set_mode(row, CC_CHARGE, current, cv_voltage=task.get("cv_voltage"))
+        elif task_type == "CC_CD":
+            cutoff = task.get("voltage")
+            current = task_current(task, cutoff or sim.voltage[row])
+            sim.set_mode(row, CC_DISCHARGE, current, cutoff_voltage=cutoff)
+        elif task_type == "IDLE":
+            sim.set_mode(row, REST)
+        else:
+            raise ValueError(f"Unknown task type '{task_type}'")
+        return float(task.get("time_seconds", 0))
+
+    def finish(self, task_key, task, cell_key):
+        self.simulator.set_mode(self.simulator.rows[cell_key], REST)
+        return True
+
+
+class SimulationClock:
+    """Background thread advancing a simulator ``time_scale`` times faster than wall time
+
+    Callables in ``listeners`` are called with the simulator after every
+    tick, on the clock thread.
+    """
+
+    def __init__(self, simulator, time_scale=1.0, interval=0.5):
+        self.simulator = simulator
+        self.time_scale = time_scale
+        self.interval = interval
+        self.wall_per_sim = 0.0
+        self.listeners = []
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if self.running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="simulation-clock", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _loop(self):
+        last = time.monotonic()
+        while not self._stop.wait(self.interval):
+            now = time.monotonic()
+            simulated = (now - last) * self.time_scale
+            started = time.perf_counter()
+            self.simulator.advance(simulated)
+            elapsed = time.perf_counter() - started
+            self.wall_per_sim = elapsed / simulated if simulated else 0.0
+            last = now
+            for listener in self.listeners:
+                listener(self.simulator)
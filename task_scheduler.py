@@ -0,0 +1,214 @@
+import heapq
+import itertools
+import re
+import threading
+import time
+from collections import Counter, deque
+from datetime import datetime
+
+PRIORITY_RANK = {"High": 0, "Medium": 1, "Low": 2}
+TASK_STATUSES = ("Pending", "Running", "Done", "Failed")
+TASK_KEY = re.compile(r"task_(\d+)")
+
+# Simulated task seconds per wall-clock second
+DEFAULT_TIME_SCALE = 60.0
+
+
+class TaskExecutor:
+    """Hooks called by the scheduler when a task starts and finishes on a cell
+
+    ``start`` may raise to fail the task (e.g. for bad parameters) and
+    returns the simulated duration in seconds. ``finish`` returns False to
+    mark the task Failed. The base class just holds the cell for
+    ``time_seconds``.
+    """
+
+    def start(self, task_key, task, cell_key):
+        return float(task.get("time_seconds", 0))
+
+    def finish(self, task_key, task, cell_key):
+        return True
+
+
+class TaskScheduler:
+    """Priority-queue dispatcher that runs tasks on cells in a background thread
+
+    Pending tasks wait in a heap ordered by (priority, created_at); running
+    tasks sit in a second heap ordered by finish time. Submitting, starting
+    and finishing a task are each O(log n), and one daemon thread sleeps
+    until the next finish or submission, so thousands of queued tasks cost
+    nothing on the Streamlit script thread.
+    """
+
+    def __init__(self, executor=None, time_scale=DEFAULT_TIME_SCALE):
+        self.executor = executor or TaskExecutor()
+        self.time_scale = time_scale
+        self.tasks = {}
+        self.counts = Counter()
+        self.version = 0
+        # Version last persisted by the owner (see persist_tasks in the UI)
+        self.saved_version = 0
+        self._ready = []
+        self._running = []
+        self._seq = itertools.count()
+        # Suffix of the next task_<n> key, only ever advanced under _cond
+        self._next_id = 1
+        self._idle = set()
+        self._idle_queue = deque()
+        self._cells = set()
+        self._busy = {}
+        self._waiting = {}
+        self._cond = threading.Condition()
+        self._stopped = False
+        self._thread = threading.Thread(target=self._loop, name="task-scheduler", daemon=True)
+        self._thread.start()
+
+    # Public API -------------------------------------------------------
+
+    def __len__(self):
+        return len(self.tasks)
+
+    def set_cells(self, cell_keys):
+        """Replace the pool of cells tasks can be assigned to"""
+        with self._cond:
+            cell_keys = list(cell_keys)
+            self._cells = set(cell_keys)
+            self._idle = self._cells.difference(self._busy)
+            self._idle_queue = deque(key for key in cell_keys if key in self._idle)
+            self._cond.notify()
+
+    def load(self, tasks):
+        """Adopt previously persisted tasks; unfinished ones are queued again"""
+        for key, task in tasks.items():
+            if task.get("status") in ("Pending", "Running"):
+                task["status"] = "Pending"
+                task.pop("cell", None)
+            self._add(key, task)
+
+    def submit(self, task, key=None):
+        """Queue a task dict; returns its key"""
+        task.setdefault("created_at", datetime.now())
+        task["status"] = "Pending"
+        with self._cond:
+            if key is None:
+                key = f"task_{self._next_id}"
+            self._add(key, task)
+        return key
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify()
+
+    def snapshot(self):
+        with self._cond:
+            return {key: dict(task) for key, task in self.tasks.items()}
+
+    # Internals --------------------------------------------------------
+
+    def _add(self, key, task):
+        with self._cond:
+            self.tasks[key] = task
+            match = TASK_KEY.fullmatch(key)
+            if match:
+                self._next_id = max(self._next_id, int(match.group(1)) + 1)
+            self.counts[task["status"]] += 1
+            if task["status"] == "Pending":
+                self._push_ready(key, task)
+            self.version += 1
+            self._cond.notify()
+
+    def _push_ready(self, key, task):
+        created = task["created_at"]
+        created = created.timestamp() if isinstance(created, datetime) else float(created)
+        rank = PRIORITY_RANK.get(task.get("priority"), len(PRIORITY_RANK))
+        heapq.heappush(self._ready, (rank, created, next(self._seq), key))
+
+    def _set_status(self, key, status, **fields):
+        task = self.tasks[key]
+        self.counts[task["status"]] -= 1
+        self.counts[status] += 1
+        task["status"] = status
+        task.update(fields)
+        self.version += 1
+
+    def _next_idle_cell(self):
+        while self._idle_queue:
+            cell = self._idle_queue.popleft()
+            if cell in self._idle:
+                return cell
+        return None
+
+    def _claim(self, cell, key):
+        self._idle.discard(cell)
+        self._busy[cell] = key
+
+    def _release_cell(self, cell):
+        del self._busy[cell]
+        waiting = self._waiting.get(cell)
+        if waiting:
+            key = waiting.popleft()
+            self._push_ready(key, self.tasks[key])
+            if not waiting:
+                del self._waiting[cell]
+        if cell in self._cells:
+            self._idle.add(cell)
+            self._idle_queue.append(cell)
+
+    def _fail(self, key, error):
+        self._set_status(key, "Failed", error=error, finished_at=datetime.now())
+
+    def _dispatch(self, now):
+        while self._ready:
+            key = self._ready[0][3]
+            task = self.tasks[key]
+            target = task.get("target_cell")
+            if target:
+                heapq.heappop(self._ready)
+                if target not in self._cells:
+                    self._fail(key, f"Unknown cell '{target}'")
+                    continue
+                if target in self._busy:
+                    self._waiting.setdefault(target, deque()).append(key)
+                    continue
+                cell = target
+            else:
+                cell = self._next_idle_cell()
+                if cell is None:
+                    # Every cell is busy; the head task waits for the next release
+                    break
+                heapq.heappop(self._ready)
+            try:
+                duration = self.executor.start(key, task, cell)
+            except Exception as exc:
+                self._idle_queue.appendleft(cell)
+                self._fail(key, str(exc))
+                continue
+            self._claim(cell, key)
+            self._set_status(key, "Running", cell=cell, started_at=datetime.now())
+            heapq.heappush(self._running, (now + duration / self.time_scale, next(self._seq), key))
+
+    def _finish_due(self, now):
+        while self._running and self._running[0][0] <= now:
+            _, _, key = heapq.heappop(self._running)
+            task = self.tasks[key]
+            cell = task["cell"]
+            try:
+                ok = self.executor.finish(key, task, cell)
+                error = None if ok else "Executor reported failure"
+            except Exception as exc:
+                ok, error = False, str(exc)
+            fields = {"finished_at": datetime.now()}
+            if error:
+                fields["error"] = error
+            self._set_status(key, "Done" if ok else "Failed", **fields)
+            self._release_cell(cell)
+
+    def _loop(self):
+        with self._cond:
+            while not self._stopped:
+                now = time.monotonic()
+                self._finish_due(now)
+                self._dispatch(now)
+                timeout = self._running[0][0] - time.monotonic() if self._running else None
+                self._cond.wait(timeout=None if timeout is None else max(timeout, 0))
@@ -0,0 +1,234 @@
+import json
+import os
+import shutil
+import tempfile
+import threading
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from cell_store import CATEGORY_COLUMNS, FLOAT_COLUMNS, CellStore
+from history import HISTORY_COLUMNS, empty_history
+from network_cache import NetworkKey
+
+DEFAULT_DATA_DIR = os.environ.get("BMS_DATA_DIR", "bms_data")
+
+# History columns stored as raw arrays; cell_id is stored as int32 codes
+_HISTORY_VALUE_COLUMNS = tuple(name for name in HISTORY_COLUMNS if name != "cell_id")
+
+
+def _write_json(path, payload):
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as fh:
+        json.dump(payload, fh, default=str)
+    os.replace(tmp, path)
+
+
+def _read_json(path, default=None):
+    try:
+        with open(path) as fh:
+            return json.load(fh)
+    except FileNotFoundError:
+        return default
+
+
+class TelemetryStore:
+    """On-disk home for cells, tasks and history shared by every session
+
+    Columns are written as ``.npy`` files and read back with
+    ``mmap_mode='r'``, so concurrent sessions map the same pages from the OS
+    page cache instead of each holding a private copy. History is
+    append-only: every ``append_history`` call writes one new partition
+    directory, published with an atomic rename.
+    """
+
+    def __init__(self, root=DEFAULT_DATA_DIR):
+        self.root = os.path.abspath(root)
+        self.cells_dir = os.path.join(self.root, "cells")
+        # Previous cell snapshot while a new one is being swapped in
+        self.retired_cells_dir = os.path.join(self.root, "cells.old")
+        self.history_dir = os.path.join(self.root, "history")
+        self.tasks_path = os.path.join(self.root, "tasks.json")
+        self.manifest_path = os.path.join(self.root, "manifest.json")
+        os.makedirs(self.history_dir, exist_ok=True)
+        self._lock = threading.RLock()
+
+    # Manifest ---------------------------------------------------------
+
+    def _manifest(self):
+        return _read_json(self.manifest_path, {
+            "version": 0, "history_version": 0, "partitions": [], "cell_ids": [],
+        })
+
+    def _commit_manifest(self, manifest, history=False):
+        manifest["version"] += 1
+        if history:
+            manifest["history_version"] += 1
+        _write_json(self.manifest_path, manifest)
+
+    @property
+    def version(self):
+        """Counter bumped on every write; use it as a cache key"""
+        return self._manifest()["version"]
+
+    @property
+    def history_version(self):
+        """Counter bumped only when the history changes"""
+        return self._manifest()["history_version"]
+
+    @property
+    def network_key(self):
+        """Configuration key of the network currently on disk, if recorded"""
+        key = self._manifest().get("network_key")
+        return NetworkKey(*key) if key is not None else None
+
+    def set_network_key(self, key):
+        with self._lock:
+            manifest = self._manifest()
+            manifest["network_key"] = list(key) if key is not None else None
+            self._commit_manifest(manifest)
+
+    def _stage_dir(self):
+        return tempfile.mkdtemp(prefix=".stage-", dir=self.root)
+
+    # Cells ------------------------------------------------------------
+
+    def save_cells(self, store):
+        """Replace the persisted cell table with a snapshot of ``store``
+
+        The snapshot is staged in a private directory, then, under the lock
+        that ``load_cells`` also holds, the old one is renamed aside, the
+        staged one moved in and the old one deleted. A crash at any point
+        leaves a complete table on disk, and readers never see a half swap.
+        """
+        stage = self._stage_dir()
+        for name in FLOAT_COLUMNS + tuple(CATEGORY_COLUMNS) + ("timestamp",):
+            np.save(os.path.join(stage, f"{name}.npy"), store.column(name))
+        _write_json(os.path.join(stage, "keys.json"), list(store))
+        with self._lock:
+            if os.path.exists(self.cells_dir):
+                shutil.rmtree(self.retired_cells_dir, ignore_errors=True)
+                os.replace(self.cells_dir, self.retired_cells_dir)
+            os.replace(stage, self.cells_dir)
+            self._commit_manifest(self._manifest())
+            shutil.rmtree(self.retired_cells_dir, ignore_errors=True)
+
+    def load_cells(self):
+        """Rebuild a CellStore from the memory-mapped snapshot (None if absent)
+
+        Runs under the store lock so a concurrent ``save_cells`` cannot swap
+        the directory between reading the keys and the columns. Falls back
+        to the retired snapshot if a crash interrupted a swap.
+        """
+        with self._lock:
+            if os.path.exists(self.cells_dir):
+                return self._load_cells(self.cells_dir)
+            return self._load_cells(self.retired_cells_dir)
+
+    def _load_cells(self, cells_dir):
+        keys = _read_json(os.path.join(cells_dir, "keys.json"))
+        if keys is None:
+            return None
+
+        def load(name):
+            return np.load(os.path.join(cells_dir, f"{name}.npy"), mmap_mode="r")
+
+        store = CellStore(capacity=len(keys))
+        store.extend(
+            keys,
+            {name: load(name) for name in FLOAT_COLUMNS},
+            {name: load(name) for name in CATEGORY_COLUMNS},
+            load("timestamp"),
+        )
+        return store
+
+    # Tasks ------------------------------------------------------------
+
+    def save_tasks(self, tasks):
+        with self._lock:
+            _write_json(self.tasks_path, tasks)
+            self._commit_manifest(self._manifest())
+
+    def load_tasks(self):
+        tasks = _read_json(self.tasks_path, {})
+        for task in tasks.values():
+            for field, value in task.items():
+                if field.endswith("_at") and isinstance(value, str):
+                    task[field] = datetime.fromisoformat(value)
+        return tasks
+
+    # History ----------------------------------------------------------
+
+    def append_history(self, frame):
+        """Append a history frame as a new partition"""
+        if not len(frame):
+            return
+        with self._lock:
+            manifest = self._manifest()
+            cell_ids = manifest["cell_ids"]
+            known = pd.Index(cell_ids)
+            labels = frame["cell_id"].astype(str)
+            unseen = pd.Index(labels.unique()).difference(known)
+            if len(unseen):
+                cell_ids.extend(unseen.tolist())
+                known = pd.Index(cell_ids)
+
+            stage = self._stage_dir()
+            np.save(os.path.join(stage, "cell_id.npy"), known.get_indexer(labels).astype(np.int32))
+            for name in _HISTORY_VALUE_COLUMNS:
+                values = frame[name].to_numpy()
+                if name == "timestamp":
+                    values = values.astype("datetime64[us]")
+                else:
+                    values = values.astype(np.float32, copy=False)
+                np.save(os.path.join(stage, f"{name}.npy"), values)
+
+            part = f"part-{len(manifest['partitions']):06d}"
+            os.replace(stage, os.path.join(self.history_dir, part))
+            manifest["partitions"].append({
+                "name": part,
+                "rows": len(frame),
+                "start": str(frame["timestamp"].min()),
+                "end": str(frame["timestamp"].max()),
+            })
+            self._commit_manifest(manifest, history=True)
+
+    def clear_history(self):
+        with self._lock:
+            manifest = self._manifest()
+            shutil.rmtree(self.history_dir, ignore_errors=True)
+            os.makedirs(self.history_dir, exist_ok=True)
+            manifest["partitions"] = []
+            manifest["cell_ids"] = []
+            self._commit_manifest(manifest, history=True)
+
+    @property
+    def history_cell_ids(self):
+        """Labels for the int32 cell_id codes stored in the partitions"""
+        return self._manifest()["cell_ids"]
+
+    @property
+    def history_rows(self):
+        return sum(part["rows"] for part in self._manifest()["partitions"])
+
+    def iter_history_partitions(self, columns=HISTORY_COLUMNS):
+        """Yield ``{column: memmap}`` per partition without copying any data"""
+        for part in self._manifest()["partitions"]:
+            part_dir = os.path.join(self.history_dir, part["name"])
+            yield {name: np.load(os.path.join(part_dir, f"{name}.npy"), mmap_mode="r")
+                   for name in columns}
+
+    def read_history(self, columns=HISTORY_COLUMNS):
+        """Materialize the stored history as one DataFrame"""
+        cell_ids = self.history_cell_ids
+        parts = list(self.iter_history_partitions(columns))
+        if not parts:
+            return empty_history(cell_ids)[list(columns)]
+        data = {}
+        for name in columns:
+            values = np.concatenate([part[name] for part in parts])
+            if name == "cell_id":
+                values = pd.Categorical.from_codes(values, dtype=pd.CategoricalDtype(cell_ids))
+            data[name] = values
+        return pd.DataFrame(data)
@@ -0,0 +1,15 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cell_generator import generate_cells  # noqa: E402
+
+
+@pytest.fixture
+def cells():
+    """A small mixed-chemistry cell table, the same on every run"""
+    types = ["LFP", "Li-ion", "NMC", "LTO", "LiPo"] * 40
+    return generate_cells(types, seed=0)
@@ -0,0 +1,86 @@
+import numpy as np
+import pytest
+
+from alerts import AlertEngine, apply_status
+from cell_store import category_code
+
+HOUR = 3600.0
+
+
+@pytest.fixture
+def engine():
+    engine = AlertEngine(debounce=3)
+    lfp = category_code("cell_type", "LFP")
+    engine.bind(["cell_a", "cell_b"], [lfp, lfp], [2.8, 2.8], [3.6, 3.6])
+    return engine
+
+
+def tick(engine, step, temp_a, voltage_a=3.3):
+    """One evaluation an hour after the previous, so temperature rates stay small"""
+    return engine.evaluate(np.array([voltage_a, 3.3]), np.array([temp_a, 25.0]), np.array([50.0, 50.0]),
+                           np.array([95.0, 95.0]), now=step * HOUR)
+
+
+def over_temp(engine):
+    return bool(engine.active[engine.rules.index("over_temp"), 0])
+
+
+def test_raise_after_debounce_then_clear_with_hysteresis(engine):
+    assert tick(engine, 0, 25.0) == (0, 0)
+    assert tick(engine, 1, 40.0) == (0, 0)
+    assert tick(engine, 2, 40.0) == (0, 0)
+    assert tick(engine, 3, 40.0) == (1, 0)
+    assert over_temp(engine)
+    assert engine.status_codes().tolist() == [category_code("status", "Warning"), category_code("status", "Active")]
+    # Back under the 35 °C limit but within the 2 °C hysteresis band: still active
+    assert tick(engine, 4, 34.0) == (0, 0)
+    assert over_temp(engine)
+    assert tick(engine, 5, 32.0) == (0, 1)
+    assert not over_temp(engine)
+
+
+def test_short_spike_is_debounced(engine):
+    tick(engine, 0, 25.0)
+    tick(engine, 1, 40.0)
+    tick(engine, 2, 40.0)
+    tick(engine, 3, 25.0)
+    tick(engine, 4, 40.0)
+    assert not engine.active.any()
+
+
+def test_condition_present_at_bind_raises_immediately(engine):
+    assert tick(engine, 0, 40.0) == (1, 0)
+
+
+def test_voltage_margin_and_rate_rules(engine):
+    tick(engine, 0, 25.0)
+    for step in (1, 2, 3):
+        tick(engine, step, 25.0, voltage_a=3.7)
+    assert engine.counts()["over_voltage"] == 1
+    # Three consecutive readings climbing faster than 2 °C/min trip the rate rule
+    engine.evaluate(np.array([3.3, 3.3]), np.array([25.0, 25.0]), np.array([50.0, 50.0]),
+                    np.array([95.0, 95.0]), now=10 * HOUR)
+    for second in (60, 61, 62):
+        engine.evaluate(np.array([3.3, 3.3]), np.array([35.0 + second - 60, 25.0]), np.array([50.0, 50.0]),
+                        np.array([95.0, 95.0]), now=10 * HOUR + second)
+    assert engine.active[engine.rules.index("temp_rate"), 0]
+
+
+def test_log_records_raise_and_clear(engine):
+    for step, temp in enumerate([25.0, 40.0, 40.0, 40.0, 30.0]):
+        tick(engine, step, temp)
+    log = engine.log_frame()
+    assert log["event"].tolist() == ["cleared", "raised"]
+    assert set(log["cell_id"]) == {"cell_a"}
+    assert log["threshold"].tolist() == [35.0, 35.0]
+
+
+def test_evaluate_store_writes_status(cells):
+    engine = AlertEngine(debounce=1)
+    temp = cells.column("temp").copy()
+    temp[:5] = 60.0
+    cells.update_rows(np.arange(len(cells)), temp=temp)
+    engine.evaluate_store(cells, now=0.0)
+    warning = cells.column("status") == category_code("status", "Warning")
+    assert warning[:5].all()
+    assert apply_status(cells, engine.status_codes()) == 0
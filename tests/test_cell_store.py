@@ -0,0 +1,78 @@
+import numpy as np
+import pytest
+
+from bms_core import create_cell_data
+from cell_store import FLOAT_COLUMNS, CellStore, category_code
+
+
+def rescanned_summary(store):
+    """The Network Overview figures recomputed from the columns"""
+    status = store.column("status")
+    return {
+        "total": len(store),
+        "active": int((status == category_code("status", "Active")).sum()),
+        "avg_temp": float(store.column("temp").mean()),
+        "avg_voltage": float(store.column("voltage").mean()),
+        "total_capacity": float(store.column("capacity").sum(dtype=np.float64)),
+        "avg_health": float(store.column("health").mean()),
+        "min_temp": float(store.column("temp").min()),
+        "max_temp": float(store.column("temp").max()),
+        "min_voltage": float(store.column("voltage").min()),
+        "max_voltage": float(store.column("voltage").max()),
+    }
+
+
+def assert_summary_matches(store):
+    summary = store.summary()
+    for name, expected in rescanned_summary(store).items():
+        assert summary[name] == pytest.approx(expected, rel=1e-5), name
+
+
+def test_aggregates_after_extend(cells):
+    assert_summary_matches(cells)
+    more = CellStore()
+    more.extend(["extra_1", "extra_2"],
+                {name: np.array([1.0, 2.0], dtype=np.float32) for name in FLOAT_COLUMNS},
+                {"cell_type": np.array([0, 1]), "status": np.array([0, 0]), "priority": np.array([1, 1])})
+    cells.extend(list(more), {name: more.column(name) for name in FLOAT_COLUMNS},
+                 {name: more.column(name) for name in ("cell_type", "status", "priority")})
+    assert_summary_matches(cells)
+
+
+def test_aggregates_after_update_rows(cells):
+    rows = np.arange(0, len(cells), 3)
+    cells.update_rows(rows, temp=80.0, voltage=cells.column("voltage")[rows] - 0.5, status="Warning")
+    assert_summary_matches(cells)
+    # Overwriting the current extremes must not leave a stale min/max behind
+    hottest = np.flatnonzero(cells.column("temp") == cells.column("temp").max())
+    cells.update_rows(hottest, temp=20.0)
+    assert_summary_matches(cells)
+
+
+def test_aggregates_after_append_and_remove(cells):
+    rng = np.random.default_rng(1)
+    cells.append("cell_new", create_cell_data("LFP", 0, rng))
+    assert_summary_matches(cells)
+    for key in list(cells)[:50]:
+        cells.remove(key)
+    assert_summary_matches(cells)
+    assert "cell_new" in cells
+
+
+def test_duplicate_keys_are_rejected(cells):
+    key = next(iter(cells))
+    with pytest.raises(KeyError):
+        cells.append(key, create_cell_data("LFP", 0))
+
+
+def test_copy_is_independent(cells):
+    copy = cells.copy()
+    cells.update_rows(np.arange(10), temp=99.0)
+    assert copy.column("temp")[:10].max() < 99.0
+    assert_summary_matches(copy)
+
+
+def test_empty_store_summary():
+    summary = CellStore().summary()
+    assert summary["total"] == 0
+    assert summary["total_capacity"] == 0.0
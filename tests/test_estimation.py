@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+
+from estimation import StateEstimator
+from simulation import CC_CHARGE, CC_DISCHARGE, PackSimulator
+
+STEP = 10.0
+
+
+@pytest.fixture
+def faded(cells):
+    """Every chemistry at 85% health, starting nearly full"""
+    cells.update_rows(np.arange(len(cells)), health=85.0, soc=90.0)
+    return cells
+
+
+def estimator(store, soc=0.5, health=None):
+    """An estimator that starts from a wrong SoC (and, by default, assumes new cells)"""
+    return StateEstimator(store.column("cell_type"), store.column("min_voltage"), store.column("max_voltage"),
+                          soc=np.full(len(store), soc), health=health)
+
+
+def cycle(sim, est, modes=(CC_DISCHARGE, CC_CHARGE), steps=1000):
+    rows = np.arange(len(sim))
+    for mode in modes:
+        sim.set_mode(rows, mode, 1.0)
+        for _ in range(steps):
+            sim.step(STEP)
+            est.update(sim.current, sim.voltage, sim.temp, dt=STEP)
+
+
+def test_soc_converges_from_a_wrong_start(faded):
+    sim, est = PackSimulator(faded), estimator(faded, health=faded.column("health"))
+    cycle(sim, est, modes=(CC_DISCHARGE,), steps=200)
+    np.testing.assert_allclose(est.soc, sim.soc, atol=0.01)
+    assert (est.soc_std < 0.02).all()
+
+
+def test_health_tracks_capacity_fade(faded):
+    sim, est = PackSimulator(faded), estimator(faded)
+    for _ in range(3):
+        cycle(sim, est)
+    np.testing.assert_allclose(est.health, 85.0, atol=2.0)
+
+
+def test_run_matches_sample_by_sample_updates(faded):
+    sim = PackSimulator(faded)
+    rows = np.arange(len(sim))
+    sim.set_mode(rows, CC_DISCHARGE, 2.0)
+    current, voltage = [], []
+    for _ in range(50):
+        sim.step(STEP)
+        current.append(sim.current.copy())
+        voltage.append(sim.voltage.copy())
+    current, voltage = np.array(current), np.array(voltage)
+
+    batch, single = estimator(faded), estimator(faded)
+    estimates = batch.run(np.arange(50) * STEP, current, voltage)
+    for step in range(50):
+        single.update(current[step], voltage[step], dt=0.0 if step == 0 else STEP)
+    np.testing.assert_allclose(estimates[-1], single.soc, rtol=1e-6)
+    np.testing.assert_allclose(batch.capacity_ah, single.capacity_ah)
@@ -0,0 +1,83 @@
+import io
+import os
+
+import numpy as np
+import pytest
+
+from log_import import LogImporter, guess_mapping, resolve_import_path
+
+LOG = """Time,Cell,Voltage_V,Current_A,Temperature,Chemistry
+2026-01-01 00:00:00,new_1,3.30,1.5,25.0,LFP
+2026-01-01 00:00:10,new_1,3.31,1.5,25.5,LFP
+2026-01-01 00:00:00,new_2,3.70,-2.0,30.0,NMC
+2026-01-01 00:00:00,,3.70,1.0,30.0,NMC
+2026-01-01 00:00:00,bad_v,abc,1.0,30.0,NMC
+2026-01-01 00:00:00,high_v,9.50,1.0,30.0,NMC
+2026-01-01 00:00:00,hot,3.70,1.0,400,NMC
+2026-01-01 00:00:00,odd,3.70,1.0,30.0,unobtainium
+not a time,late,3.70,1.0,30.0,NMC
+"""
+
+
+def import_csv(store, text, **kwargs):
+    return LogImporter(store, **kwargs).import_file(io.StringIO(text), fmt="CSV")
+
+
+def test_guess_mapping_matches_aliases():
+    mapping = guess_mapping(["Time", "Cell", "Voltage_V", "Current_A", "Temperature", "Chemistry", "Extra"])
+    assert mapping == {"timestamp": "Time", "cell_id": "Cell", "voltage": "Voltage_V", "current": "Current_A",
+                       "temp": "Temperature", "cell_type": "Chemistry"}
+
+
+def test_rejection_counts(cells):
+    stats = import_csv(cells, LOG)
+    assert stats.rows_read == 9
+    assert stats.rows_imported == 3
+    assert dict(stats.rejected) == {
+        "missing cell_id": 1, "invalid voltage": 1, "voltage out of range": 1,
+        "temp out of range": 1, "unknown cell_type": 1, "invalid timestamp": 1,
+    }
+    assert stats.cells_added == 2
+
+
+def test_latest_reading_wins(cells):
+    import_csv(cells, LOG)
+    row = cells.row_of("new_1")
+    assert cells.column("voltage")[row] == pytest.approx(3.31)
+    assert cells.column("temp")[row] == pytest.approx(25.5)
+    assert cells.labels("cell_type", [cells.row_of("new_2")])[0] == "NMC"
+    # Stored current is a magnitude
+    assert cells.column("current")[cells.row_of("new_2")] == pytest.approx(2.0)
+
+
+def test_voltage_only_log_keeps_other_fields(cells):
+    keys = list(cells)[:5]
+    rows = np.array([cells.row_of(key) for key in keys])
+    before = {name: cells.column(name)[rows].copy() for name in ("capacity", "current", "temp", "soc")}
+    total = cells.summary()["total_capacity"]
+    import_csv(cells, "cell_id,voltage\n" + "".join(f"{key},3.25\n" for key in keys))
+    np.testing.assert_allclose(cells.column("voltage")[rows], 3.25)
+    for name, values in before.items():
+        np.testing.assert_array_equal(cells.column(name)[rows], values, err_msg=name)
+    assert cells.summary()["total_capacity"] == pytest.approx(total)
+
+
+def test_capacity_is_derived_when_current_is_logged(cells):
+    key = next(iter(cells))
+    import_csv(cells, f"cell_id,voltage,current\n{key},3.0,-2.0\n")
+    assert cells.column("capacity")[cells.row_of(key)] == pytest.approx(6.0)
+
+
+def test_import_paths_stay_inside_the_root(tmp_path):
+    root = tmp_path / "logs"
+    root.mkdir()
+    (root / "run.csv").write_text("cell_id,voltage\n")
+    assert resolve_import_path("run.csv", str(root)) == os.path.realpath(root / "run.csv")
+    for path in ("/etc/passwd", "../outside.csv", str(tmp_path / "outside.csv")):
+        with pytest.raises(ValueError):
+            resolve_import_path(path, str(root))
+    os.symlink("/etc", root / "escape")
+    with pytest.raises(ValueError):
+        resolve_import_path("escape/passwd", str(root))
+    with pytest.raises(ValueError):
+        resolve_import_path("run.csv", None)
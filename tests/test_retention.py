@@ -0,0 +1,99 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from retention import RETENTION_METRICS, TieredHistory, rollup_rows
+
+START = np.datetime64("2024-01-01T00:00:00", "us")
+PERIOD = 10
+
+
+def raw_rows(steps, cells, seed=0):
+    """A time-major grid of raw rows: every cell once every PERIOD seconds"""
+    rng = np.random.default_rng(seed)
+    count = steps * cells
+    rows = {
+        "time": np.repeat(START.astype(np.int64) + np.arange(steps) * PERIOD * 1_000_000, cells),
+        "cell": np.tile(np.arange(cells, dtype=np.int32), steps),
+    }
+    for metric in RETENTION_METRICS:
+        rows[metric] = rng.normal(size=count).astype(np.float32)
+    return rows
+
+
+def sorted_rows(rows):
+    order = np.lexsort((rows["cell"], rows["time"]))
+    return {name: column[order] for name, column in rows.items()}
+
+
+def assert_rows_equal(left, right):
+    left, right = sorted_rows(left), sorted_rows(right)
+    assert left.keys() == right.keys()
+    for name in left:
+        np.testing.assert_allclose(left[name], right[name], rtol=1e-5, err_msg=name)
+
+
+def history(steps, cells, **kwargs):
+    rows = raw_rows(steps, cells)
+    frame = pd.DataFrame({
+        "timestamp": rows["time"].view("datetime64[us]"),
+        "cell_id": [f"cell_{cell}" for cell in rows["cell"]],
+        **{metric: rows[metric] for metric in RETENTION_METRICS},
+    })
+    store = TieredHistory(**kwargs)
+    store.append(frame)
+    return store, frame
+
+
+def test_grid_and_generic_rollups_agree():
+    rows = raw_rows(steps=30, cells=4)
+    # Reversing the cells within each step breaks the grid layout, forcing the sorted path
+    shuffled = {name: column.reshape(30, 4)[:, ::-1].ravel() for name, column in rows.items()}
+    assert_rows_equal(rollup_rows(rows, 60), rollup_rows(shuffled, 60))
+
+
+def test_rolling_up_in_stages_matches_rolling_up_directly():
+    rows = raw_rows(steps=1080, cells=3)
+    staged = rollup_rows(rollup_rows(rows, 60), 3600)
+    assert_rows_equal(staged, rollup_rows(rows, 3600))
+    np.testing.assert_array_equal(staged["count"], 360)
+
+
+def test_rollup_means_are_count_weighted():
+    rows = raw_rows(steps=6, cells=1)
+    # An uneven split: buckets of 2 and 4 raw samples
+    first = rollup_rows({name: column[:2] for name, column in rows.items()}, 20)
+    second = rollup_rows({name: column[2:] for name, column in rows.items()}, 40)
+    merged = rollup_rows({name: np.concatenate([first[name], second[name]]) for name in first}, 3600)
+    assert merged["count"].tolist() == [6]
+    for metric in RETENTION_METRICS:
+        assert merged[metric][0] == pytest.approx(rows[metric].mean(dtype=np.float64), rel=1e-5)
+        assert merged[f"{metric}_min"][0] == rows[metric].min()
+        assert merged[f"{metric}_max"][0] == rows[metric].max()
+
+
+def test_uniform_width_query_matches_raw_bucket_means():
+    store, frame = history(steps=1080, cells=3, retention={"raw": 600, "minute": 3600})
+    assert set(store.tier_stats()["rows"] > 0) == {True}
+    width = store.uniform_width()
+    assert width == 3600
+    result = store.query(width=width, stats=True)
+    assert set(result["resolution"]) == {3600}
+    expected = frame.groupby([frame["timestamp"].dt.floor("h"), "cell_id"])["voltage"].mean()
+    got = result.set_index(["timestamp", result["cell_id"].astype(str)])["voltage"]
+    np.testing.assert_allclose(got.sort_index().to_numpy(), expected.sort_index().to_numpy(), rtol=1e-5)
+
+
+def test_tier_filter_returns_one_resolution():
+    store, _ = history(steps=360, cells=2, retention={"raw": 600})
+    raw = store.query(tiers=("raw",), stats=True)
+    assert len(raw) and set(raw["resolution"]) == {0}
+    assert len(store.query(stats=True)["resolution"].unique()) > 1
+    assert set(store.query(cells=["cell_1"])["cell_id"].astype(str)) == {"cell_1"}
+
+
+def test_byte_budget_is_respected():
+    budget = 64 * 1024
+    store, _ = history(steps=2000, cells=5, budget_bytes=budget)
+    assert store.nbytes <= budget
+    assert store.rolled_up > 0
@@ -0,0 +1,86 @@
+import numpy as np
+import pytest
+
+from simulation import CC_CHARGE, CC_DISCHARGE, REST, PackSimulator, SimulationExecutor, parse_setpoint, task_current
+
+
+@pytest.fixture
+def sim(cells):
+    return PackSimulator(cells)
+
+
+def cc_cd_form_task(**fields):
+    """A CC_CD task as the task form submits it, CC/CP left blank"""
+    return dict({"task_type": "CC_CD", "cc_cp": "", "voltage": 3.2, "current": 1.0,
+                 "capacity": 100.0, "time_seconds": 3600}, **fields)
+
+
+def test_parse_setpoint():
+    assert parse_setpoint("5A", 3.6) == 5.0
+    assert parse_setpoint(" 2.5 ", 3.6) == 2.5
+    assert parse_setpoint("10W", 2.0) == 5.0
+    with pytest.raises(ValueError):
+        parse_setpoint("fast", 3.6)
+
+
+def test_task_current_prefers_cc_cp_over_current():
+    assert task_current({"cc_cp": "10W", "current": 1.0}, 2.0) == 5.0
+    assert task_current({"cc_cp": "", "current": 1.5}, 2.0) == 1.5
+    with pytest.raises(ValueError):
+        task_current({"cc_cp": ""}, 2.0)
+
+
+def test_default_cc_cd_task_starts(sim):
+    key = sim.keys[3]
+    duration = SimulationExecutor(sim).start("task_1", cc_cd_form_task(), key)
+    row = sim.rows[key]
+    assert duration == 3600.0
+    assert sim.mode[row] == CC_DISCHARGE
+    assert sim.setpoint[row] == 1.0
+
+
+def test_cc_cv_uses_typed_power_setpoint(sim):
+    key = sim.keys[0]
+    task = {"task_type": "CC_CV", "cc_cp": "10W", "cv_voltage": 2.0, "current": 1.0, "time_seconds": 60}
+    SimulationExecutor(sim).start("task_1", task, key)
+    assert sim.mode[sim.rows[key]] == CC_CHARGE
+    assert sim.setpoint[sim.rows[key]] == pytest.approx(5.0)
+
+
+def test_finish_returns_cell_to_rest(sim):
+    executor = SimulationExecutor(sim)
+    key = sim.keys[0]
+    executor.start("task_1", cc_cd_form_task(), key)
+    assert executor.finish("task_1", {}, key)
+    assert sim.mode[sim.rows[key]] == REST
+
+
+def test_write_to_keeps_capacity_of_resting_cells(cells, sim):
+    capacity = cells.column("capacity").copy()
+    current = cells.column("current").copy()
+    total = cells.summary()["total_capacity"]
+    sim.advance(60)
+    sim.write_to(cells)
+    np.testing.assert_array_equal(cells.column("capacity"), capacity)
+    np.testing.assert_array_equal(cells.column("current"), current)
+    assert cells.summary()["total_capacity"] == pytest.approx(total)
+
+    row = 5
+    sim.set_mode(row, CC_CHARGE, 2.0)
+    sim.step()
+    sim.write_to(cells)
+    assert cells.column("current")[row] == pytest.approx(2.0)
+    assert cells.column("capacity")[row] == pytest.approx(sim.voltage[row] * 2.0, rel=1e-5)
+    others = np.arange(len(cells)) != row
+    np.testing.assert_array_equal(cells.column("capacity")[others], capacity[others])
+
+
+def test_charge_is_conserved_under_constant_current(sim):
+    rows = np.arange(10)
+    sim.soc[rows] = 0.3
+    sim.set_mode(rows, CC_CHARGE, 1.0)
+    sim.advance(600)
+    expected = 0.3 + 1.0 * 600 / (3600.0 * sim.capacity_ah[rows])
+    charging = sim.mode[rows] == CC_CHARGE
+    assert charging.any()
+    np.testing.assert_allclose(sim.soc[rows][charging], expected[charging], rtol=1e-9)
@@ -0,0 +1,103 @@
+import threading
+import time
+
+import pytest
+
+from task_scheduler import TaskExecutor, TaskScheduler
+
+
+class RecordingExecutor(TaskExecutor):
+    """Records (task, cell) starts; tasks named 'bad' fail to start, 'flaky' fail to finish"""
+
+    def __init__(self):
+        self.started = []
+
+    def start(self, task_key, task, cell_key):
+        if task.get("task_name") == "bad":
+            raise ValueError("bad parameters")
+        self.started.append((task_key, cell_key))
+        return super().start(task_key, task, cell_key)
+
+    def finish(self, task_key, task, cell_key):
+        return task.get("task_name") != "flaky"
+
+
+@pytest.fixture
+def scheduler():
+    scheduler = TaskScheduler(RecordingExecutor(), time_scale=1000.0)
+    yield scheduler
+    scheduler.stop()
+
+
+def wait_settled(scheduler, timeout=5.0):
+    """Snapshot once no task is Pending or Running"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        tasks = scheduler.snapshot()
+        if all(task["status"] in ("Done", "Failed") for task in tasks.values()):
+            return tasks
+        time.sleep(0.01)
+    raise AssertionError(f"Tasks did not settle: {scheduler.snapshot()}")
+
+
+def test_runs_by_priority_then_age(scheduler):
+    for name, priority in [("low", "Low"), ("high", "High"), ("medium", "Medium"), ("high2", "High")]:
+        scheduler.submit({"task_name": name, "priority": priority, "time_seconds": 0})
+    scheduler.set_cells(["cell_1"])
+    tasks = wait_settled(scheduler)
+    order = [tasks[key]["task_name"] for key, _ in scheduler.executor.started]
+    assert order == ["high", "high2", "medium", "low"]
+    assert scheduler.counts["Done"] == 4
+
+
+def test_target_cell_waits_for_its_cell(scheduler):
+    scheduler.set_cells(["cell_1", "cell_2"])
+    first = scheduler.submit({"task_name": "a", "target_cell": "cell_2", "time_seconds": 100})
+    second = scheduler.submit({"task_name": "b", "target_cell": "cell_2", "time_seconds": 0})
+    tasks = wait_settled(scheduler)
+    assert tasks[first]["cell"] == tasks[second]["cell"] == "cell_2"
+    assert tasks[second]["started_at"] >= tasks[first]["finished_at"]
+
+
+def test_failure_paths(scheduler):
+    scheduler.set_cells(["cell_1"])
+    unknown = scheduler.submit({"task_name": "x", "target_cell": "nope", "time_seconds": 0})
+    bad = scheduler.submit({"task_name": "bad", "time_seconds": 0})
+    flaky = scheduler.submit({"task_name": "flaky", "time_seconds": 0})
+    good = scheduler.submit({"task_name": "good", "time_seconds": 0})
+    tasks = wait_settled(scheduler)
+    assert tasks[unknown]["status"] == "Failed" and "Unknown cell" in tasks[unknown]["error"]
+    assert tasks[bad]["status"] == "Failed" and tasks[bad]["error"] == "bad parameters"
+    assert tasks[flaky]["status"] == "Failed" and tasks[flaky]["error"] == "Executor reported failure"
+    # A failed start must not leak the cell
+    assert tasks[good]["status"] == "Done" and tasks[good]["cell"] == "cell_1"
+    assert scheduler.counts["Failed"] == 3
+
+
+def test_concurrent_submits_get_unique_keys(scheduler):
+    scheduler.load({"task_7": {"task_name": "old", "status": "Done", "created_at": 0}})
+    keys = []
+
+    def submit_many():
+        for _ in range(200):
+            keys.append(scheduler.submit({"time_seconds": 0}))
+
+    threads = [threading.Thread(target=submit_many) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(set(keys)) == len(keys) == 800
+    assert min(int(key.split("_")[1]) for key in keys) == 8
+
+
+def test_load_requeues_unfinished_tasks(scheduler):
+    scheduler.load({
+        "task_1": {"task_name": "was running", "status": "Running", "cell": "cell_9", "created_at": 0},
+        "task_2": {"task_name": "done", "status": "Done", "created_at": 0},
+    })
+    assert scheduler.tasks["task_1"]["status"] == "Pending" and "cell" not in scheduler.tasks["task_1"]
+    scheduler.set_cells(["cell_1"])
+    tasks = wait_settled(scheduler)
+    assert tasks["task_1"]["cell"] == "cell_1"
+    assert [key for key, _ in scheduler.executor.started] == ["task_1"]
@@ -0,0 +1,81 @@
+import numpy as np
+import pytest
+
+from cell_store import CELL_TYPES
+from topology import PackTopology, cell_state
+
+
+@pytest.fixture
+def pack_state():
+    """Two 3s2p packs over 12 cells with uneven SoC and capacity"""
+    rng = np.random.default_rng(0)
+    soc = rng.uniform(0.4, 0.9, 12)
+    capacity = rng.uniform(2.0, 3.0, 12)
+    voltage = 3.0 + soc
+    return PackTopology.regular(2, 3, 2), voltage, soc, capacity
+
+
+def test_pack_frame_matches_per_pack_loops(pack_state):
+    topology, voltage, soc, capacity = pack_state
+    frame = topology.pack_frame(voltage, soc, capacity)
+    groups = np.arange(12).reshape(2, 3, 2)
+    for pack in range(2):
+        rows = groups[pack]
+        charge = (soc[rows] * capacity[rows]).sum(axis=1)
+        group_capacity = capacity[rows].sum(axis=1)
+        row = frame.loc[pack]
+        assert row["voltage"] == pytest.approx(voltage[rows].mean(axis=1).sum())
+        assert row["capacity_ah"] == pytest.approx(group_capacity.min())
+        assert row["available_ah"] == pytest.approx(charge.min())
+        assert row["headroom_ah"] == pytest.approx((group_capacity - charge).min())
+        assert row["weakest_group"] == group_capacity.argmin()
+        assert row["soc_spread"] == pytest.approx(np.ptp(charge / group_capacity) * 100.0)
+
+
+def test_passive_balance_only_bleeds_charge(pack_state):
+    topology, _, soc, capacity = pack_state
+    result = topology.balance(soc, capacity, mode="passive", seconds=50 * 3600.0)
+    before = topology.group_sum(soc * capacity)
+    after = topology.group_sum(result.soc * capacity)
+    assert (after <= before + 1e-12).all()
+    np.testing.assert_allclose(topology.pack_reduce(np.add, before - after), result.moved_ah)
+    np.testing.assert_allclose(result.lost_ah, result.moved_ah)
+    assert (result.spread_after < result.spread_before).all()
+    assert (result.spread_after <= 0.005 + 1e-9).all()
+
+
+def test_active_balance_loses_only_the_inefficiency(pack_state):
+    topology, _, soc, capacity = pack_state
+    before = topology.pack_reduce(np.add, topology.group_sum(soc * capacity))
+    result = topology.balance(soc, capacity, mode="active", seconds=10 * 3600.0, efficiency=0.8)
+    after = topology.pack_reduce(np.add, topology.group_sum(result.soc * capacity))
+    assert (result.moved_ah > 0).all()
+    np.testing.assert_allclose(result.lost_ah, result.moved_ah * 0.2)
+    np.testing.assert_allclose(before - after, result.lost_ah)
+    assert (result.spread_after < result.spread_before).all()
+
+
+def test_balance_moves_at_most_current_times_time(pack_state):
+    topology, _, soc, capacity = pack_state
+    result = topology.balance(soc, capacity, mode="passive", seconds=60.0, current=0.1)
+    bled = topology.group_sum((soc - result.soc) * capacity)
+    assert (bled <= 0.1 * 60.0 / 3600.0 + 1e-12).all()
+
+
+def test_from_store_keeps_one_chemistry_per_pack(cells):
+    topology = PackTopology.from_store(cells, series=4, parallel=3)
+    codes = cells.column("cell_type")[topology.cell_rows].reshape(len(topology), -1)
+    assert (codes == codes[:, :1]).all()
+    assert list(topology.pack_types) == [CELL_TYPES[code] for code in codes[:, 0]]
+    # 40 cells per chemistry fill three 12-cell packs each
+    assert len(topology) == 15
+    assert len(PackTopology.from_store(cells, series=4, parallel=3, packs=7)) == 7
+    frame = topology.pack_frame(*cell_state(cells))
+    assert len(frame) == 15 and (frame["series"] == 4).all()
+
+
+def test_layout_must_cover_every_cell():
+    with pytest.raises(ValueError):
+        PackTopology(np.arange(6), [2, 2], [2])
+    with pytest.raises(ValueError):
+        PackTopology.regular(2, 3, 2, rows=np.arange(10))
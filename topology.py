@@ -0,0 +1,227 @@
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from cell_store import CELL_TYPES
+from simulation import CAPACITY_AH
+
+BALANCING_MODES = ("passive", "active")
+
+# Passive balancing bleeds each high group through a resistor at this
+# current; active balancing shuttles charge between groups at this current
+# with ACTIVE_EFFICIENCY of it arriving. Groups within BALANCE_THRESHOLD
+# (SoC, 0..1) of their target are left alone.
+DEFAULT_BLEED_CURRENT = 0.1
+DEFAULT_TRANSFER_CURRENT = 2.0
+ACTIVE_EFFICIENCY = 0.9
+BALANCE_THRESHOLD = 0.005
+
+BalanceResult = namedtuple("BalanceResult", "soc spread_before spread_after moved_ah lost_ah")
+
+
+def cell_state(store):
+    """(voltage, SoC 0..1, capacity in Ah) per cell of a CellStore, capacity from rated capacity and health"""
+    type_codes = store.column("cell_type").astype(np.intp)
+    capacity_ah = CAPACITY_AH[type_codes] * store.column("health") / 100.0
+    return store.column("voltage"), store.column("soc") / 100.0, capacity_ah
+
+
+class PackTopology:
+    """Cells wired into packs of series-connected parallel groups
+
+    The layout is three index arrays over the cell table: ``cell_rows``
+    lists the member rows group by group, ``group_starts`` is where each
+    parallel group begins in it, and ``pack_starts`` is where each pack
+    begins in the list of groups. Every pack-level figure is a segment
+    reduction (``np.add.reduceat`` and friends) over those arrays, first
+    from cells to groups and then from groups to packs, so the cost is a
+    few passes over the cells whatever the pack shape.
+
+    Parallel cells share one terminal voltage and their charge pools, so a
+    group behaves like one cell of the summed capacity. Series groups
+    carry the same current, so a pack's usable charge is limited by its
+    emptiest group and its charge headroom by its fullest.
+    """
+
+    def __init__(self, cell_rows, group_sizes, pack_groups, pack_types=None):
+        self.cell_rows = np.asarray(cell_rows, dtype=np.intp)
+        self.group_sizes = np.asarray(group_sizes, dtype=np.intp)
+        self.pack_groups = np.asarray(pack_groups, dtype=np.intp)
+        if self.group_sizes.sum() != len(self.cell_rows) or self.pack_groups.sum() != len(self.group_sizes):
+            raise ValueError("Group sizes must cover every cell row and pack sizes every group")
+        if (self.group_sizes < 1).any() or (self.pack_groups < 1).any():
+            raise ValueError("Every group and pack needs at least one member")
+        self.group_starts = np.concatenate([[0], np.cumsum(self.group_sizes)[:-1]]).astype(np.intp)
+        self.pack_starts = np.concatenate([[0], np.cumsum(self.pack_groups)[:-1]]).astype(np.intp)
+        self.group_of_cell = np.repeat(np.arange(len(self.group_sizes)), self.group_sizes)
+        self.pack_of_group = np.repeat(np.arange(len(self.pack_groups)), self.pack_groups)
+        self.pack_types = pack_types
+
+    @classmethod
+    def regular(cls, packs, series, parallel, rows=None):
+        """``packs`` identical packs of ``series`` groups of ``parallel`` cells, over ``rows`` (0.. by default)"""
+        count = packs * series * parallel
+        rows = np.arange(count) if rows is None else np.asarray(rows, dtype=np.intp)[:count]
+        if len(rows) < count:
+            raise ValueError(f"{packs} packs of {series}s{parallel}p need {count:,} cells, got {len(rows):,}")
+        return cls(rows, np.full(packs * series, parallel), np.full(packs, series))
+
+    @classmethod
+    def from_store(cls, store, series, parallel, packs=None):
+        """Fill ``series``s``parallel``p packs from a CellStore, one chemistry per pack
+
+        Cells are taken in table order within each chemistry; cells that do
+        not fill a whole pack are left out. ``packs`` caps the pack count.
+        """
+        per_pack = series * parallel
+        codes = store.column("cell_type")
+        order = np.argsort(codes, kind="stable")
+        counts = np.bincount(codes, minlength=len(CELL_TYPES))
+        full = counts // per_pack
+        if packs is not None:
+            # Hand out packs round-robin across chemistries up to the cap
+            capped = np.zeros_like(full)
+            while capped.sum() < packs and (capped < full).any():
+                room = capped < full
+                take = min(packs - capped.sum(), room.sum())
+                capped[np.flatnonzero(room)[:take]] += 1
+            full = capped
+        if not full.any():
+            raise ValueError(f"Not enough cells of one chemistry for a {series}s{parallel}p pack")
+        starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+        rows = np.concatenate([order[start:start + n * per_pack] for start, n in zip(starts, full) if n])
+        pack_types = pd.Categorical.from_codes(np.repeat(np.arange(len(CELL_TYPES)), full), categories=CELL_TYPES)
+        total = int(full.sum())
+        return cls(rows, np.full(total * series, parallel), np.full(total, series), pack_types=pack_types)
+
+    def __len__(self):
+        return len(self.pack_groups)
+
+    @property
+    def n_groups(self):
+        return len(self.group_sizes)
+
+    @property
+    def n_cells(self):
+        return len(self.cell_rows)
+
+    # Segment reductions -------------------------------------------------
+
+    def group_sum(self, values):
+        """Per-cell values (indexed by cell table row) summed per parallel group"""
+        return np.add.reduceat(np.asarray(values)[self.cell_rows], self.group_starts)
+
+    def pack_reduce(self, ufunc, group_values):
+        """Reduce per-group values per pack with ``ufunc`` (np.add, np.minimum, ...)"""
+        return ufunc.reduceat(group_values, self.pack_starts)
+
+    def pack_spread(self, group_values):
+        return self.pack_reduce(np.maximum, group_values) - self.pack_reduce(np.minimum, group_values)
+
+    def _pack_argmin(self, group_values):
+        """Group index of each pack's minimum (the first one on ties)"""
+        minimum = self.pack_reduce(np.minimum, group_values)
+        hits = np.flatnonzero(group_values == minimum[self.pack_of_group])
+        _, first = np.unique(self.pack_of_group[hits], return_index=True)
+        return hits[first]
+
+    def group_state(self, voltage, soc, capacity_ah):
+        """Voltage, capacity, stored charge and SoC of every parallel group"""
+        capacity_ah = np.asarray(capacity_ah, dtype=np.float64)
+        group_capacity = self.group_sum(capacity_ah)
+        group_charge = self.group_sum(np.asarray(soc, dtype=np.float64) * capacity_ah)
+        return {
+            "voltage": self.group_sum(np.asarray(voltage, dtype=np.float64)) / self.group_sizes,
+            "capacity_ah": group_capacity,
+            "charge_ah": group_charge,
+            "soc": group_charge / group_capacity,
+        }
+
+    def pack_frame(self, voltage, soc, capacity_ah):
+        """Pack-level state, one row per pack
+
+        ``soc`` is 0..1 per cell. ``available_ah`` is what the pack can
+        deliver before its emptiest group is empty, ``headroom_ah`` what it
+        can take before its fullest group is full; ``soc_spread`` and
+        ``voltage_spread_mv`` are the max - min over the pack's groups.
+        """
+        groups = self.group_state(voltage, soc, capacity_ah)
+        room = groups["capacity_ah"] - groups["charge_ah"]
+        pack_voltage = self.pack_reduce(np.add, groups["voltage"])
+        available = self.pack_reduce(np.minimum, groups["charge_ah"])
+        headroom = self.pack_reduce(np.minimum, room)
+        weakest = self._pack_argmin(groups["capacity_ah"])
+        frame = pd.DataFrame({
+            "series": self.pack_groups,
+            "parallel": self.pack_reduce(np.maximum, self.group_sizes),
+            "voltage": pack_voltage,
+            "capacity_ah": self.pack_reduce(np.minimum, groups["capacity_ah"]),
+            "available_ah": available,
+            "headroom_ah": headroom,
+            "soc": available / np.maximum(available + headroom, 1e-12) * 100.0,
+            "energy_wh": pack_voltage * available,
+            "soc_spread": self.pack_spread(groups["soc"]) * 100.0,
+            "voltage_spread_mv": self.pack_spread(groups["voltage"]) * 1000.0,
+            "weakest_group": weakest - self.pack_starts,
+        }, index=pd.RangeIndex(len(self), name="pack"))
+        if self.pack_types is not None:
+            frame.insert(0, "cell_type", self.pack_types)
+        return frame
+
+    # Balancing ------------------------------------------------------------
+
+    def balance(self, soc, capacity_ah, mode="passive", seconds=3600.0, current=None,
+                threshold=BALANCE_THRESHOLD, efficiency=ACTIVE_EFFICIENCY):
+        """Simulate ``seconds`` of balancing with the packs otherwise at rest
+
+        Passive balancing bleeds every group above the pack's emptiest
+        group (plus ``threshold``) down towards it. Active balancing moves
+        charge from groups above the pack's mean SoC to groups below it;
+        only ``efficiency`` of the charge taken arrives. Each group moves
+        at most ``current`` × ``seconds``. Returns a BalanceResult with
+        the new per-cell SoC (0..1, a copy) and per-pack SoC spread before
+        and after, charge moved and charge lost, in Ah.
+        """
+        if mode not in BALANCING_MODES:
+            raise ValueError(f"Unknown balancing mode '{mode}'")
+        if current is None:
+            current = DEFAULT_BLEED_CURRENT if mode == "passive" else DEFAULT_TRANSFER_CURRENT
+        soc = np.asarray(soc, dtype=np.float64)
+        capacity_ah = np.asarray(capacity_ah, dtype=np.float64)
+        group_capacity = self.group_sum(capacity_ah)
+        charge = self.group_sum(soc * capacity_ah)
+        group_soc = charge / group_capacity
+        limit = current * seconds / 3600.0
+
+        if mode == "passive":
+            floor = self.pack_reduce(np.minimum, group_soc)[self.pack_of_group] + threshold
+            taken = np.minimum(np.maximum(charge - floor * group_capacity, 0.0), limit)
+            given = np.zeros_like(taken)
+        else:
+            target = (self.pack_reduce(np.add, charge) / self.pack_reduce(np.add, group_capacity))[self.pack_of_group]
+            excess = charge - target * group_capacity
+            excess[np.abs(group_soc - target) <= threshold] = 0.0
+            offered = np.minimum(np.maximum(excess, 0.0), limit)
+            wanted = np.minimum(np.maximum(-excess, 0.0), limit)
+            pack_offered = self.pack_reduce(np.add, offered)
+            pack_wanted = self.pack_reduce(np.add, wanted)
+            # Scale both sides so what arrives is what was taken times the efficiency
+            delivered = np.minimum(pack_offered * efficiency, pack_wanted)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                take_scale = np.where(pack_offered > 0, delivered / (pack_offered * efficiency), 0.0)
+                give_scale = np.where(pack_wanted > 0, delivered / pack_wanted, 0.0)
+            taken = offered * take_scale[self.pack_of_group]
+            given = wanted * give_scale[self.pack_of_group]
+
+        new_soc_group = (charge - taken + given) / group_capacity
+        new_soc = soc.copy()
+        new_soc[self.cell_rows] = new_soc_group[self.group_of_cell]
+        moved = self.pack_reduce(np.add, taken)
+        return BalanceResult(
+            soc=new_soc,
+            spread_before=self.pack_spread(group_soc),
+            spread_after=self.pack_spread(new_soc_group),
+            moved_ah=moved,
+            lost_ah=moved - self.pack_reduce(np.add, given),
+        )